@@ -11,8 +11,78 @@ ASSETS_MAP_PATH = os.path.join(ASSETS_PATH, "map")
 DATA_PATH = os.path.join(ROOT_PATH, "data")
 DATA_CITY_PATH = os.path.join(DATA_PATH, "city")
 DATA_NETWORK_PATH = os.path.join(DATA_PATH, "network")
+POPULATION_STATS_PATH = os.path.join(DATA_PATH, "population_stats.parquet")  # 离线预计算的人口统计表
+BOUNDARY_DB_PATH = os.path.join(DATA_PATH, "boundary.sqlite")  # 离线构建的全国行政区边界库
+ADMIN_SNAPSHOT_PATH = os.path.join(DATA_PATH, "admin_snapshot.arrow")  # 编译后的行政区划快照（Arrow IPC）
+DATA_CACHE_PATH = os.path.join(DATA_PATH, "cache")
+MASK_CACHE_PATH = os.path.join(DATA_CACHE_PATH, "mask")  # 行政区边界栅格化掩膜缓存
+TILE_CACHE_PATH = os.path.join(DATA_CACHE_PATH, "tiles")  # 人口瓦片缓存
+BOUNDARY_CACHE_PATH = os.path.join(DATA_CACHE_PATH, "boundary")  # 阿里云 DataV 行政区边界缓存
 
 # 常量
+# 直辖市：城市层级与省级层级相同
+MUNICIPALITY_NAMES = ["北京市", "天津市", "上海市", "重庆市"]
+# WorldPop 人口数据
+POPULATION_YEARS = [2020, 2021, 2022, 2023, 2024]
+POPULATION_TIF_TEMPLATE = "chn_pop_{year}_CN_100m_R2025A_v1.tif"  # WorldPop 原始文件
+POPULATION_COG_TEMPLATE = "chn_pop_{year}_CN_100m_R2025A_v1_cog.tif"  # 转换后的 Cloud-Optimized GeoTIFF（优先使用）
+POPULATION_CELL_SIZE_M = 100  # 原始网格分辨率（米）
+# 人口聚合金字塔：层级名称 -> 相对原始网格的聚合倍数（块求和，各层级总人口保持一致）
+POPULATION_PYRAMID_FACTORS = {"100m": 1, "500m": 5, "1km": 10, "5km": 50, "10km": 100, "20km": 200}
+POPULATION_POINT_BUDGET = 50_000  # 单张人口地图最多渲染的网格点数量
+# 省级 / 全国人口分块并行处理
+POPULATION_CHUNK_SIZE = 2000  # 子窗口边长（像素），需为各聚合倍数的整数倍
+POPULATION_CHUNK_MIN_FACTOR = 10  # 分块处理时保留的最精细聚合倍数（1km）
+POPULATION_MAX_WORKERS = None  # 进程池大小，None 表示使用全部 CPU 核
+MASK_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 掩膜缓存大小上限（字节），超出后按 LRU 淘汰
+# GDAL 配置：在首次读取栅格之前生效（已存在的同名环境变量优先）
+GDAL_CONFIG = {
+    "GDAL_CACHEMAX": "512",  # 块缓存大小（MB），进程内所有数据集共享
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",  # 打开文件时不扫描目录，避免额外开销
+}
+RASTER_WARM_UP = True  # App 启动时预先打开人口栅格并预读金字塔分块
+# 人口瓦片（Web 墨卡托 XYZ）
+POPULATION_TILE_SIZE = 256  # 瓦片边长（像素）
+POPULATION_TILE_VMAX = 1000  # 颜色饱和时的网格人口（人/100*100m²），颜色按对数映射
+POPULATION_TILE_COLOR_RANGE = [[255, 255, 0, 20], [255, 0, 0, 255]]  # 起始颜色（黄、低透明度）与结束颜色（红）
+POPULATION_TILE_MIN_ZOOM = 3
+# 没有金字塔的原始 WorldPop 文件允许渲染的最小缩放级别（该级别单个瓦片约覆盖 1700*1700 个原始网格）；
+# 更低级别的瓦片只从 COG 渲染，未转换 COG 时省级 / 全国地图的瓦片数量可能超过 POPULATION_TILE_BUDGET
+POPULATION_TILE_RAW_MIN_ZOOM = 8
+POPULATION_TILE_MAX_ZOOM = 12  # 该级别单个瓦片像素约 30m，已细于原始网格
+POPULATION_TILE_BUDGET = 16  # 单张地图最多加载的瓦片数量
+TILE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 瓦片缓存大小上限（字节），超出后按 LRU 淘汰
+TILE_CACHE_EVICT_INTERVAL = 100  # 每写入多少张瓦片检查一次缓存大小
+# 本地瓦片服务：端口为 None 时不启动服务，瓦片以 data URI 形式直接嵌入地图
+TILE_SERVER_HOST = "127.0.0.1"
+TILE_SERVER_PORT = None
+TILE_SERVER_URL = None  # 浏览器访问瓦片服务使用的地址，None 表示 http://{TILE_SERVER_HOST}:{TILE_SERVER_PORT}
+# 行政区边界缓存
+BOUNDARY_CACHE_TTL = 30 * 24 * 3600  # 缓存有效期（秒），过期后向 DataV 发起条件请求重新验证
+BOUNDARY_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 边界缓存大小上限（字节），超出后按 LRU 淘汰
+BOUNDARY_CACHE_EVICT_INTERVAL = 20  # 每写入多少个边界文件检查一次缓存大小
+# 边界库预计算的简化层级（容差，单位：度），由精细到粗糙；地图按缩放级别选择不超过一个屏幕像素的最大容差
+BOUNDARY_SIMPLIFY_TOLERANCES = [0.0005, 0.002, 0.01, 0.05]
+BOUNDARY_TOPOLOGY_QUANTUM = 1e-6  # 边界库坐标量化步长（度，约 0.1 米），DataV 坐标精度为 6 位小数
+BOUNDARY_REQUEST_TIMEOUT = (5, 30)  # 请求超时（秒）：(连接, 读取)
+BOUNDARY_REQUEST_RETRIES = 2  # 网关错误、限流时的重试次数
+BOUNDARY_FETCH_MAX_WORKERS = 8  # 并发请求数，同时也是连接池大小
+BOUNDARY_OFFLINE_MODE = os.environ.get("BOUNDARY_OFFLINE_MODE", "0") == "1"  # 离线模式：只读取本地缓存，不访问网络
+# 路网：多种类型（drive / bike / walk）同时缺少本地缓存时，只从 OSM 下载一次 "all" 类型的原始数据，在本地筛选构建
+NETWORK_SHARED_DOWNLOAD = True
+# 路网：本地 OSM 提取文件（.osm.pbf，例如 Geofabrik 的省级提取）；设置后从该文件构建路网，不再访问 Overpass
+NETWORK_PBF_PATH = os.environ.get("NETWORK_PBF_PATH") or None
+# 页面中每个区/县第一次构建路网时都需要完整扫描一遍 PBF 文件（省级 extract 约需数十秒）；读取结果按区/县范围缓存在进程内，
+# 同一区/县的其他路网类型、重试时直接复用。需要一次处理很多区/县时，请使用 scripts/build_network_from_pbf.py 预先批量构建缓存
+NETWORK_PBF_CACHE_ENTRIES = 4  # 进程内缓存的 PBF 读取结果数量（每个约为区/县范围内节点数 * 16 字节，另加 way）
+# 批量构建（scripts/build_network_from_pbf.py）时每批最多保存的节点数量：超过时按空间顺序分批，每批读取一遍 PBF 文件
+NETWORK_PBF_MAX_NODES = 20_000_000
+# 坐标系：显示名称 -> 坐标系（OSM、WorldPop、DataV 边界为 WGS84；高德、腾讯地图为 GCJ02；百度地图为 BD09）
+COORDINATE_SYSTEM_MAP = {
+    "WGS84（GPS / OSM）": "WGS84",
+    "GCJ02（高德 / 腾讯）": "GCJ02",
+    "BD09（百度）": "BD09",
+}
 # mapbox 底图类型
 MAPBOX_STYLE_MAP = {
     "街道图": "mapbox://styles/mapbox/streets-v11",
@@ -1,19 +1,28 @@
-from .basic import plot_zone_map, generate_zone_style_widgets
-from .basic import get_city_population_from_tif, get_population_from_tif
-from .basic import plot_heatmap, plot_population_3d_map
+from .basic import plot_zone_map, generate_zone_style_widgets, prefetch_zone_boundaries
+from .basic import get_city_population_from_tif, get_population_from_tif, get_population_stack_from_tif
+from .basic import get_region_population_from_tif, get_street_population_from_tif, warm_up_population_rasters
+from .basic import get_population_map_level
+from .basic import plot_population_3d_map, plot_population_change_map
+from .basic import plot_population_tile_map, start_population_tile_server
 
-from .network import load_network_from_osm, generate_network_style_widgets, plot_network_map
+from .network import load_network_from_osm, load_networks_from_osm, export_network_edges, \
+    generate_network_style_widgets, plot_network_map
 
-from .common import custom_sidebar_pages_order, load_cities_info, select_zone
+from .common import custom_sidebar_pages_order, load_cities_info, load_admin_index, load_admin_search_index, \
+    select_zone
 
 # 控制 import * 的行为
 __all__ = [
     # basic
-    "plot_zone_map", "generate_zone_style_widgets",
-    "get_city_population_from_tif", "get_population_from_tif",
-    "plot_heatmap", "plot_population_3d_map",
+    "plot_zone_map", "generate_zone_style_widgets", "prefetch_zone_boundaries",
+    "get_city_population_from_tif", "get_population_from_tif", "get_population_stack_from_tif",
+    "get_region_population_from_tif", "get_street_population_from_tif", "warm_up_population_rasters",
+    "get_population_map_level",
+    "plot_population_3d_map", "plot_population_change_map",
+    "plot_population_tile_map", "start_population_tile_server",
     # network
-    "load_network_from_osm", "generate_network_style_widgets", "plot_network_map",
+    "load_network_from_osm", "load_networks_from_osm", "export_network_edges", "generate_network_style_widgets",
+    "plot_network_map",
     # common
-    "custom_sidebar_pages_order", "load_cities_info", "select_zone"
+    "custom_sidebar_pages_order", "load_cities_info", "load_admin_index", "load_admin_search_index", "select_zone"
 ]
@@ -1,10 +1,17 @@
-from .parent_child_zone import plot_zone_map, generate_zone_style_widgets
+from .parent_child_zone import plot_zone_map, generate_zone_style_widgets, prefetch_zone_boundaries
 from .city_population_distribution import get_city_population_from_tif, get_population_from_tif
-from .district_population_distribution import plot_heatmap, plot_population_3d_map
+from .city_population_distribution import get_population_stack_from_tif, get_region_population_from_tif
+from .city_population_distribution import get_street_population_from_tif, warm_up_population_rasters
+from .city_population_distribution import get_population_map_level
+from .district_population_distribution import plot_population_3d_map, plot_population_change_map
+from .district_population_distribution import plot_population_tile_map, start_population_tile_server
 
 # 控制 import * 的行为
 __all__ = [
-    "plot_zone_map", "generate_zone_style_widgets",
+    "plot_zone_map", "generate_zone_style_widgets", "prefetch_zone_boundaries",
     "get_city_population_from_tif", "get_population_from_tif",
-    "plot_heatmap", "plot_population_3d_map"
+    "get_population_stack_from_tif", "get_region_population_from_tif", "get_street_population_from_tif",
+    "warm_up_population_rasters",
+    "plot_population_3d_map", "plot_population_change_map",
+    "plot_population_tile_map", "start_population_tile_server"
 ]
@@ -2,146 +2,499 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import geopandas as gpd
-import rasterio
-import rasterio.mask
 import os
+import threading
+from affine import Affine
+from pyproj import Geod
 
-from utils import get_geojson_from_aliyun
-from config.settings import DATA_CITY_PATH
+from utils import load_boundary_geojson, load_boundary_geojson_batch, zonal_statistics, read_masked_window, \
+    read_masked_window_stack, find_population_tif_filepath, block_sum, chunked_population_aggregate, \
+    create_population_process_pool, open_raster, open_rasters, warm_up_rasters, get_boundary_meta, \
+    get_boundary_meta_batch, get_boundary_children
+from .district_population_distribution import points_bounds, select_pyramid_level
+from config.settings import DATA_CITY_PATH, POPULATION_TIF_TEMPLATE, POPULATION_COG_TEMPLATE, POPULATION_STATS_PATH, \
+    POPULATION_CELL_SIZE_M, POPULATION_PYRAMID_FACTORS, POPULATION_CHUNK_SIZE, POPULATION_CHUNK_MIN_FACTOR, \
+    POPULATION_MAX_WORKERS, POPULATION_YEARS, RASTER_WARM_UP, POPULATION_POINT_BUDGET
 
 
 @st.cache_data
 def get_population_from_tif(adcode, year):
     """
     使用 GeoJSON 字典从 GeoTIFF 文件中裁剪数据，并返回详细的人口统计信息。
+    地图使用的聚合层级由 get_population_map_level 单独计算与缓存，不包含在返回值中。
     Returns:
-        dict: 包含人口列表、总和、面积、密度等信息的字典。
+        dict: 包含人口网格列式数组（lon / lat / population，均为 float32）、总和、面积、密度等信息的字典。
               如果裁剪失败，返回 None。
     """
-    # 加载人口 tif 数据
-    tif_filename = f"chn_pop_{year}_CN_100m_R2025A_v1.tif"
-    tif_filepath = os.path.join(DATA_CITY_PATH, tif_filename)
-    if not os.path.exists(tif_filepath):
-        st.error(f"未找到 {year} 年的人口数据文件：{tif_filename}")
-        st.write(f"请检查路径：{tif_filepath}")
-        st.stop()
-
     # --- 步骤 1: 加载 GeoJSON 形状 ---
-    geojson_data_dict = get_geojson_from_aliyun(adcode, is_sub=False)
+    geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
     features = geojson_data_dict['features']
     gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")  # WorldPop 通常使用 'EPSG:4326' (WGS84)
 
-    # --- 步骤 2: 计算面积 ---
-    gdf_projected = gdf.to_crs(gdf.estimate_utm_crs())  # 自动选择一个合适的坐标系
-    area_m2 = gdf_projected.area.sum()
-    area_km2 = area_m2 / 1_000_000
+    # --- 步骤 2: 计算面积（如果存在离线预计算结果，直接使用其统计信息；边界库中有该区域时，直接查询预计算的面积） ---
+    precomputed_stats = lookup_population_stats([adcode], year)
+    boundary_meta = get_boundary_meta(adcode)
+    if precomputed_stats is None and boundary_meta is not None:
+        area_km2 = boundary_meta["area_km2"]
+    elif precomputed_stats is None:
+        gdf_projected = gdf.to_crs(gdf.estimate_utm_crs())  # 自动选择一个合适的坐标系
+        area_m2 = gdf_projected.area.sum()
+        area_km2 = area_m2 / 1_000_000
 
     # --- 步骤 3: 裁剪 TIF 文件 ---
-    with rasterio.open(tif_filepath) as src:
+    clipped = clip_population_tif(adcode, year, gdf)
+    if clipped is None:
+        return None
+    clipped_array, clipped_transform = clipped
+
+    # --- 步骤 4: 处理裁剪后的数据 ---
+    lon, lat, population = extract_population_cells(clipped_array, clipped_transform)
+
+    if precomputed_stats is None:
+        summary = summarize_population(population, area_km2)
+    else:
+        summary = precomputed_stats[0]
+
+    return {
+        "lon": lon,
+        "lat": lat,
+        "population": population,  # 用于统计人口信息
+        "bounds": boundary_meta["bbox"] if boundary_meta is not None else points_bounds(lon, lat),
+        **summary
+    }
+
+
+@st.cache_data(show_spinner=False)
+def get_population_map_level(adcode, year, point_budget=POPULATION_POINT_BUDGET):
+    """
+    人口 3D 图使用的聚合层级：只在绘图时计算，单独缓存，且只缓存选中的一个层级。
+    裁剪使用磁盘上缓存的掩膜，只需一次窗口读取。
+    Returns:
+        dict: build_population_map_level 返回的层级；如果裁剪失败，返回 None。
+    """
+    clipped = clip_population_tif(adcode, year)
+    if clipped is None:
+        return None
+    return build_population_map_level(*clipped, point_budget=point_budget)
+
+
+def clip_population_tif(adcode, year, gdf=None):
+    """
+    按区域边界裁剪人口栅格：只读取覆盖目标形状的分块窗口，掩膜按 adcode 缓存在磁盘上。
+    Args:
+        adcode (int): 区域 adcode
+        year (int): 年份
+        gdf (gpd.GeoDataFrame): 可选，已加载的区域边界，不提供时按 adcode 加载
+    Returns:
+        tuple: (clipped_array, clipped_transform)，目标形状之外及无数据的像素为 NaN；如果裁剪失败，返回 None。
+    """
+    tif_filepath = get_population_tif_filepath(year)
+    if gdf is None:
+        geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
+        gdf = gpd.GeoDataFrame.from_features(geojson_data_dict['features'], crs="EPSG:4326")
+
+    with open_raster(tif_filepath) as src:
         # 统一坐标系
         if gdf.crs != src.crs:
             print(f"转换坐标系：从 {gdf.crs} 转换为 {src.crs}")
             gdf = gdf.to_crs(src.crs)
-        geometries = gdf.geometry
-        # 裁剪
         try:
-            # clipped_array：3D numpy 数组 (bands, height, width)。brands 为波段，此处包含人口信息；height/width 表示像素数量
+            # clipped_array：2D numpy 数组 (height, width)，目标形状之外及无数据的像素为 NaN
             # clipped_transform：包含 6 个浮点数的数学变换矩阵，用于计算返回矩阵中每一个位置的实际经纬度
-            clipped_array, clipped_transform = rasterio.mask.mask(
-                src,  # tif 数据
-                geometries,  # 裁剪的目标形状
-                crop=True,  # True：返回恰好能覆盖目标形状的 tif 像素矩阵；False：返回全量 tif 像素矩阵（目标区域有数据，非目标区域填充 nodata 值）
-                all_touched=True,  # True：目标形状边界触及的像素均保留；False：只有当一个像素的中心点完全在目标形状内部时，才保留
-                nodata=np.nan  # 和 crop=True 协同工作，将 TIF 的 nodata 值设为 NaN
-            )
+            return read_masked_window(src, gdf.geometry, all_touched=True, cache_key=adcode)
         except ValueError as e:
             print(f"裁剪失败: {e}")
-            return []
-
-        # --- 步骤 4: 处理裁剪后的数据 ---
-        clipped_array = clipped_array[0]
-        population_data = []  # 用于绘制热力图 / 3D 图
-        population_values = []  # 用于统计人口信息
-        for r in range(clipped_array.shape[0]):
-            for c in range(clipped_array.shape[1]):
-                population = clipped_array[r, c]
-                # 过滤掉无数据 (NaN) 和人口为 0 的点
-                if not np.isnan(population) and population > 0:
-                    # 将像素坐标 (c, r) 转换为经纬度 (lon, lat)
-                    lon, lat = clipped_transform * (c, r)
-                    # 需要将 numpy 的类型转换为 python 内置类型，否则 st_folium 在 JSON 序列化时无法识别
-                    # 注意：PyDeck 需要 [lon, lat, val]
-                    population_data.append([float(lon), float(lat), float(population)])
-                    population_values.append(float(population))
-
-        return {
-            "population_data": population_data,
-            "population_values": population_values,
-            "total_population": round(sum(population_values)),
+            return None
+
+
+@st.cache_resource(show_spinner=False)
+def population_process_pool():
+    """
+    省级 / 全国分块处理使用的进程池（每个进程只创建一次，所有会话共享）
+    """
+    return create_population_process_pool(POPULATION_MAX_WORKERS)
+
+
+@st.cache_data(show_spinner=False)
+def get_region_population_from_tif(adcode, year):
+    """
+    大范围区域（省级 / 全国 100000）人口统计：将区域分块后在进程池中并行处理，每个进程内存占用有界，最后合并部分聚合结果。
+    统计信息基于原始 100m 网格精确计算；地图只使用聚合倍数不小于 POPULATION_CHUNK_MIN_FACTOR 的层级，
+    缓存中只保留其中网格点数量不超过 POPULATION_POINT_BUDGET 的一个层级，不保留原始网格。
+    Returns:
+        dict: 统计信息（与 get_population_from_tif 相同的字段）、bounds 以及地图使用的聚合层级 map_level。
+              如果区域与人口数据没有交集，或区域内没有人口，返回 None。
+    """
+    tif_filepath = get_population_tif_filepath(year)
+
+    geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
+    gdf = gpd.GeoDataFrame.from_features(geojson_data_dict['features'], crs="EPSG:4326")
+
+    factors = [factor for factor in POPULATION_PYRAMID_FACTORS.values() if factor >= POPULATION_CHUNK_MIN_FACTOR]
+    merged = chunked_population_aggregate(tif_filepath, gdf.geometry, factors, POPULATION_CHUNK_SIZE,
+                                          executor=population_process_pool())
+    if merged is None or merged["count"] == 0:
+        print(f"裁剪失败: {adcode} 与人口数据没有交集或区域内没有人口")
+        return None
+
+    pyramid = []
+    for name, factor in POPULATION_PYRAMID_FACTORS.items():
+        if factor not in merged["levels"]:
+            continue
+        rows, cols, population = merged["levels"][factor]
+        lon, lat = pixels_to_lonlat(rows, cols, merged["transform"] * Affine.scale(factor))
+        pyramid.append({
+            "name": name,
+            "cell_size_m": POPULATION_CELL_SIZE_M * factor,
+            "lon": lon,
+            "lat": lat,
+            "population": population
+        })
+    map_level = select_pyramid_level(pyramid, POPULATION_POINT_BUDGET)
+
+    precomputed_stats = lookup_population_stats([adcode], year)
+    boundary_meta = get_boundary_meta(adcode)
+    if precomputed_stats is not None:
+        summary = precomputed_stats[0]
+    else:
+        if boundary_meta is not None:
+            area_km2 = boundary_meta["area_km2"]
+        else:
+            area_km2 = abs(Geod(ellps="WGS84").geometry_area_perimeter(gdf.geometry.union_all())[0]) / 1_000_000
+        summary = {
+            "total_population": round(merged["sum"]),
             "area_km2": round(area_km2, 2),
-            "population_density": round(sum(population_values) / area_km2, 2),
-            "max_population_density": round(max(population_values), 2),
-            "min_population_density": round(min(population_values), 2)
+            "population_density": round(merged["sum"] / area_km2, 2) if area_km2 > 0 else 0.0,
+            "max_population_density": round(merged["max"], 2),
+            "min_population_density": round(merged["min"], 2)
+        }
+
+    return {
+        "map_level": map_level,  # 用于绘制 3D 图
+        "bounds": boundary_meta["bbox"] if boundary_meta is not None else points_bounds(map_level["lon"],
+                                                                                        map_level["lat"]),
+        **summary
+    }
+
+
+@st.cache_data(show_spinner=False)
+def get_population_stack_from_tif(adcode, years):
+    """
+    多年份人口对比：使用同一个窗口与掩膜，一次性裁剪所有年份的人口栅格。
+    Args:
+        adcode (int): 区域 adcode
+        years (list): 年份列表（按时间升序）
+    Returns:
+        dict: 包含以下内容的字典；如果裁剪失败，返回 None。
+            - years: 年份列表
+            - lon / lat: 网格经纬度 float32 数组 (cells,)
+            - population: 各年份网格人口 float32 数组 (years, cells)
+            - total_population: 各年份总人口列表
+            - growth_rate: 各年份相对上一年份的人口增长率列表（第一个年份为 None）
+            - change: 最后一个年份相对第一个年份的网格人口变化 float32 数组 (cells,)
+    """
+    years = sorted(years)
+    tif_filepaths = [get_population_tif_filepath(year) for year in years]
+
+    geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
+    gdf = gpd.GeoDataFrame.from_features(geojson_data_dict['features'], crs="EPSG:4326")
+
+    with open_rasters(tif_filepaths) as srcs:
+        if gdf.crs != srcs[0].crs:
+            gdf = gdf.to_crs(srcs[0].crs)
+        try:
+            stack, transform = read_masked_window_stack(srcs, gdf.geometry, all_touched=True, cache_key=adcode)
+        except ValueError as e:
+            print(f"裁剪失败: {e}")
+            return None
+
+    # 任一年份有人口的网格均保留，其余年份无数据时视为 0
+    rows, cols = np.nonzero(np.any(stack > 0, axis=0))
+    population = np.nan_to_num(stack[:, rows, cols], nan=0.0)
+    population = np.clip(population, 0, None).astype(np.float32)
+    lon, lat = pixels_to_lonlat(rows, cols, transform)
+
+    totals = population.sum(axis=1, dtype=np.float64)
+    growth_rate = [None] + [
+        round(float(cur / prev - 1), 4) if prev > 0 else None for prev, cur in zip(totals[:-1], totals[1:])
+    ]
+    return {
+        "years": years,
+        "lon": lon,
+        "lat": lat,
+        "population": population,
+        "total_population": [round(float(total)) for total in totals],
+        "growth_rate": growth_rate,
+        "change": population[-1] - population[0]
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up_population_rasters():
+    """
+    App 启动预热（每个进程只执行一次）：在后台线程中打开各年份转换后的 COG 人口栅格并预读最小一级金字塔，
+    使会话中的第一次人口数据请求无需承担打开文件的开销。由 RASTER_WARM_UP 控制是否启用；
+    只有 WorldPop 原始文件（没有金字塔）时不启动预热线程。
+    """
+    if not RASTER_WARM_UP:
+        return None
+    tif_filepaths = [
+        os.path.join(DATA_CITY_PATH, POPULATION_COG_TEMPLATE.format(year=year)) for year in POPULATION_YEARS
+    ]
+    tif_filepaths = [path for path in tif_filepaths if os.path.exists(path)]
+    if not tif_filepaths:
+        return None
+    thread = threading.Thread(target=warm_up_rasters, args=(tif_filepaths,), name="raster-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_data(show_spinner=False)
+def load_population_stats():
+    """
+    加载离线预计算的人口统计表（由 scripts/precompute_population_stats.py 生成）。
+    Returns:
+        pd.DataFrame: 以 (adcode, year) 为索引的统计表；如果文件不存在，返回 None。
+    """
+    if not os.path.exists(POPULATION_STATS_PATH):
+        return None
+    df = pd.read_parquet(POPULATION_STATS_PATH)
+    return df.set_index(["adcode", "year"]).sort_index()
+
+
+def lookup_population_stats(adcodes, year):
+    """
+    从离线预计算的人口统计表中查询一组区域的统计信息。
+    Args:
+        adcodes (list): 区域 adcode 列表
+        year (int): 年份
+    Returns:
+        list: 与 adcodes 顺序一致的统计信息字典列表；如果统计表不存在或缺少任一区域，返回 None。
+    """
+    stats_df = load_population_stats()
+    if stats_df is None:
+        return None
+    keys = [(int(adcode), int(year)) for adcode in adcodes]
+    if not all(key in stats_df.index for key in keys):
+        return None
+
+    results = []
+    for row in stats_df.loc[keys].itertuples():
+        results.append({
+            "total_population": round(row.total_population),
+            "area_km2": round(row.area_km2, 2),
+            "population_density": round(row.population_density, 2),
+            "max_population_density": round(np.nan_to_num(row.max_population_density), 2),
+            "min_population_density": round(np.nan_to_num(row.min_population_density), 2)
+        })
+    return results
+
+
+def get_population_tif_filepath(year):
+    """
+    获取指定年份人口数据文件路径：优先使用转换后的 COG 文件，否则使用 WorldPop 原始文件。
+    如果两者均不存在，提示错误并停止执行。
+    """
+    tif_filepath = find_population_tif_filepath(year)
+    if tif_filepath is None:
+        tif_filename = POPULATION_TIF_TEMPLATE.format(year=year)
+        st.error(f"未找到 {year} 年的人口数据文件：{tif_filename}")
+        st.write(f"请检查路径：{os.path.join(DATA_CITY_PATH, tif_filename)}")
+        st.stop()
+    return tif_filepath
+
+
+def extract_population_cells(clipped_array, clipped_transform):
+    """
+    向量化提取裁剪结果中的有效人口网格（过滤掉无数据 NaN 和人口为 0 的点）。
+    Args:
+        clipped_array (np.ndarray): 2D 人口矩阵 (height, width)
+        clipped_transform (Affine): 矩阵对应的仿射变换
+    Returns:
+        tuple: (lon, lat, population) 三个等长的 float32 一维数组
+    """
+    # NaN 与任何数比较均为 False，因此一次比较即可同时过滤无数据和人口为 0 的点
+    rows, cols = np.nonzero(clipped_array > 0)
+    population = clipped_array[rows, cols].astype(np.float32)
+    lon, lat = pixels_to_lonlat(rows, cols, clipped_transform)
+    return lon, lat, population
+
+
+def pixels_to_lonlat(rows, cols, transform):
+    """
+    一次性将所有像素坐标 (c, r) 转换为像素中心的经纬度 (lon, lat)。
+    Returns:
+        tuple: (lon, lat) 两个 float32 一维数组
+    """
+    a, b, c, d, e, f = transform[:6]
+    cols = cols + 0.5
+    rows = rows + 0.5
+    lon = (a * cols + b * rows + c).astype(np.float32)
+    lat = (d * cols + e * rows + f).astype(np.float32)
+    return lon, lat
+
+
+def build_population_map_level(clipped_array, clipped_transform, point_budget=POPULATION_POINT_BUDGET):
+    """
+    由原始 100m 网格块求和得到地图使用的聚合层级（层级见 POPULATION_PYRAMID_FACTORS，每个层级总人口一致）：
+    由细到粗逐级计算，返回网格点数量不超过 point_budget 的最精细层级，更粗的层级不再计算；
+    如果所有层级均超出预算，返回最粗的层级。
+    Args:
+        clipped_array (np.ndarray): 2D 人口矩阵 (height, width)
+        clipped_transform (Affine): 矩阵对应的仿射变换
+        point_budget (int): 最多渲染的网格点数量
+    Returns:
+        dict: 包含 'name', 'cell_size_m', 'lon', 'lat', 'population'
+    """
+    for name, factor in POPULATION_PYRAMID_FACTORS.items():
+        if factor == 1:
+            lon, lat, population = extract_population_cells(clipped_array, clipped_transform)
+        else:
+            aggregated = block_sum(clipped_array, factor)
+            rows, cols = np.nonzero(aggregated > 0)
+            population = aggregated[rows, cols].astype(np.float32)
+            lon, lat = pixels_to_lonlat(rows, cols, clipped_transform * Affine.scale(factor))
+        level = {
+            "name": name,
+            "cell_size_m": POPULATION_CELL_SIZE_M * factor,
+            "lon": lon,
+            "lat": lat,
+            "population": population
         }
+        if population.size <= point_budget:
+            break
+    return level
+
+
+def summarize_population(population, area_km2):
+    """
+    基于人口数组计算汇总统计信息。
+    Args:
+        population (np.ndarray): 有效网格人口数组
+        area_km2 (float): 区域面积（km²）
+    Returns:
+        dict: 总人口、面积、密度、最高/最低网格人口
+    """
+    total_population = float(population.sum(dtype=np.float64))
+    has_data = population.size > 0
+    return {
+        "total_population": round(total_population),
+        "area_km2": round(area_km2, 2),
+        "population_density": round(total_population / area_km2, 2) if area_km2 > 0 else 0.0,
+        "max_population_density": round(float(population.max()), 2) if has_data else 0.0,
+        "min_population_density": round(float(population.min()), 2) if has_data else 0.0
+    }
 
 
 @st.cache_data(show_spinner=False)
-def get_city_population_from_tif(province_name, city_adcode, district_names, adcode_df, year):
+def get_city_population_from_tif(city_adcode, districts, year):
     """
     获取一个城市下所有区/县的人口和密度数据。
+    所有区/县只读取一次栅格：在城市外包窗口内将各区/县多边形烧录为标签栅格，一次性完成分区统计。
     Args:
-        province_name (str): 选定省份名称
         city_adcode (int): 选定城市的 adcode
-        district_names (list): 选定城市的 'children' 列表
-        adcode_df (pd.DataFrame): adcode 查找表
+        districts (tuple): 选定城市下的所有区/县：(名称, adcode)，即 select_zone 返回的 'all_districts'
         year (int): 年份
     Returns:
         pd.DataFrame: 包含 '区域', '总人口', '人口密度' 的 DataFrame
     """
-    population_info_list = []
+    # --- 步骤 1: 各区/县 adcode（已由行政区划索引解析） ---
+    district_adcodes = {district_name: int(district_adcode) for district_name, district_adcode in districts}
+
+    # 如果存在离线预计算结果，直接查表返回
+    precomputed_stats = lookup_population_stats(list(district_adcodes.values()), year)
+    if precomputed_stats is not None:
+        return pd.DataFrame([
+            {"district": district_name, **{k: stats[k] for k in ("total_population", "population_density", "area_km2")}}
+            for district_name, stats in zip(district_adcodes.keys(), precomputed_stats)
+        ])
 
     # 加载人口 tif 数据
-    tif_filename = f"chn_pop_{year}_CN_100m_R2025A_v1.tif"
-    tif_filepath = os.path.join(DATA_CITY_PATH, tif_filename)
-    if not os.path.exists(tif_filepath):
-        st.error(f"未找到 {year} 年的人口数据文件：{tif_filename}")
-        st.write(f"请检查路径：{tif_filepath}")
-        st.stop()
+    tif_filepath = get_population_tif_filepath(year)
 
-    # 使用 st.progress 来显示进度
-    process_bar = st.progress(0, text=f"正在加载各区/县人口数据...")
+    # --- 步骤 2: 加载各区/县边界 ---
+    # 城市的子区域边界只需一次请求；不在其中的区/县（例如行政区划调整）再单独请求
+    city_geojson = load_boundary_geojson(city_adcode, is_sub=True)
+    features_by_adcode = {}
+    for feature in (city_geojson or {}).get("features", []):
+        adcode = feature.get("properties", {}).get("adcode")
+        if isinstance(adcode, int):
+            features_by_adcode[adcode] = feature
 
-    for i, district_name in enumerate(district_names):
-        process_bar.progress((i + 1) / len(district_names), text=f"正在处理：{district_name} 的人口数据")
+    missing_geojsons = load_boundary_geojson_batch(
+        [(adcode, False) for adcode in district_adcodes.values() if adcode not in features_by_adcode]
+    )  # 缺失的区/县并发请求
+    zone_names, zone_adcodes, zone_features = [], [], []
+    for district_name, district_adcode in district_adcodes.items():
+        feature = features_by_adcode.get(district_adcode)
+        if feature is None:
+            geojson_data_dict = missing_geojsons.get((district_adcode, False))
+            if not geojson_data_dict or not geojson_data_dict.get("features"):
+                st.warning(f"{district_name} 没有获取到边界数据，跳过处理！")
+                continue
+            feature = geojson_data_dict["features"][0]
+        zone_names.append(district_name)
+        zone_adcodes.append(district_adcode)
+        zone_features.append(feature)
 
-        try:
-            district_adcode = adcode_df.loc[district_name, "adcode"]
-        except KeyError:
-            st.warning(f"{district_name} 没有查询到对应的 adcode，跳过处理！")
-            continue
+    return zonal_population_dataframe(tif_filepath, zone_names, zone_adcodes, zone_features)
 
-        if isinstance(district_adcode, (pd.DataFrame, pd.Series)):
-            if province_name in ["北京市", "天津市", "上海市", "重庆市"]:
-                prefix = str(city_adcode)[:3]
-            else:
-                prefix = str(city_adcode)[:4]
-            count = 0
-            for name, adcode in district_adcode.items():
-                if str(adcode).startswith(prefix):
-                    district_adcode = adcode
-                    count += 1
-            if count != 1:
-                st.warning("人口信息可能存在错误！详细信息：存在重名区域未被区分，adcode 可能错误。")
-
-        data = get_population_from_tif(district_adcode, year)
-
-        population_info_list.append({
-            "district": district_name,
-            "total_population": data["total_population"],
-            "population_density": data["population_density"],
-            "area_km2": data["area_km2"]
-        })
 
-    # 完成后移除进度条
-    process_bar.empty()
-    return pd.DataFrame(population_info_list)
+@st.cache_data(show_spinner=False)
+def get_street_population_from_tif(district_adcode, streets, year):
+    """
+    获取一个区/县下所有街道（乡镇）的人口和密度数据。
+    阿里云 DataV 没有街道级边界，只统计本地边界库中存在的街道边界（构建边界库时通过 --street-boundaries 导入）。
+    Args:
+        district_adcode (int): 选定区/县的 adcode
+        streets (tuple): 选定区/县下的所有街道：(名称, 代码)，即 select_zone 返回的 'all_streets'
+        year (int): 年份
+    Returns:
+        pd.DataFrame: 与 get_city_population_from_tif 相同的列（'district' 列为街道名称）；
+                      如果本地边界库中没有该区/县的街道边界，返回 None
+    """
+    street_names = {str(code): name for name, code in streets}
+    zone_names, zone_adcodes, zone_features = [], [], []
+    for feature in get_boundary_children(district_adcode) or []:
+        code = str(feature.get("properties", {}).get("adcode"))
+        if code in street_names:
+            zone_names.append(street_names[code])
+            zone_adcodes.append(int(code))
+            zone_features.append(feature)
+    if not zone_features:
+        return None
+    return zonal_population_dataframe(get_population_tif_filepath(year), zone_names, zone_adcodes, zone_features)
+
+
+def zonal_population_dataframe(tif_filepath, zone_names, zone_adcodes, zone_features):
+    """
+    单次读取栅格，计算多个区域的总人口、面积与人口密度
+    :param tif_filepath: 人口数据文件路径
+    :param zone_names: 区域名称列表
+    :param zone_adcodes: 区域 adcode 列表（用于查询边界库中预计算的面积）
+    :param zone_features: 区域边界 GeoJSON Feature 列表
+    :return: pd.DataFrame：district、total_population、population_density、area_km2
+    """
+    if not zone_features:
+        return pd.DataFrame(columns=["district", "total_population", "population_density", "area_km2"])
+    gdf = gpd.GeoDataFrame.from_features(zone_features, crs="EPSG:4326")
+
+    # --- 步骤 3: 计算面积（优先使用边界库中预计算的面积，其余区域投影到 UTM 计算） ---
+    boundary_metas = get_boundary_meta_batch(zone_adcodes)
+    if all(adcode in boundary_metas for adcode in zone_adcodes):
+        area_km2 = np.array([boundary_metas[adcode]["area_km2"] for adcode in zone_adcodes])
+    else:
+        area_km2 = gdf.to_crs(gdf.estimate_utm_crs()).area.to_numpy() / 1_000_000
+
+    # --- 步骤 4: 单次读取栅格，计算分区统计 ---
+    stats = zonal_statistics(tif_filepath, gdf.geometry)
+
+    total_population = stats["sum"].to_numpy()
+    population_density = np.divide(total_population, area_km2,
+                                   out=np.zeros_like(total_population), where=area_km2 > 0)
+    return pd.DataFrame({
+        "district": zone_names,
+        "total_population": np.round(total_population).astype(np.int64),
+        "population_density": np.round(population_density, 2),
+        "area_km2": np.round(area_km2, 2)
+    })
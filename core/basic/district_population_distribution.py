@@ -1,81 +1,104 @@
+import streamlit as st
 import pandas as pd
 import pydeck as pdk
 import pydeck.data_utils
 import numpy as np
-from typing import cast
 
+from utils import get_population_tile_uri, tiles_for_bounds, tile_lonlat_bounds, select_tile_zoom, start_tile_server, \
+    population_tile_min_zoom
+from config.settings import POPULATION_POINT_BUDGET, POPULATION_CELL_SIZE_M, POPULATION_TILE_MAX_ZOOM, \
+    POPULATION_TILE_BUDGET, TILE_SERVER_HOST, TILE_SERVER_PORT, TILE_SERVER_URL
 
-def plot_heatmap(population_data, start_rgba=None, end_rgba=None, steps=5):
+
+@st.cache_resource(show_spinner=False)
+def start_population_tile_server():
+    """
+    启动本地人口瓦片服务（每个进程只执行一次）。由 TILE_SERVER_PORT 控制是否启用。
+    Returns:
+        str: 浏览器访问瓦片服务的地址；未启用时返回 None。
     """
-    使用 PyDeck 绘制人口密度热力图。
+    if TILE_SERVER_PORT is None:
+        return None
+    try:
+        start_tile_server(TILE_SERVER_HOST, TILE_SERVER_PORT)
+    except OSError as e:
+        # 端口已被占用时，通常是同一台机器上的其他 App 进程已经启动了瓦片服务，直接复用
+        print(f"人口瓦片服务启动失败，将使用已有服务: {e}")
+    return TILE_SERVER_URL or f"http://{TILE_SERVER_HOST}:{TILE_SERVER_PORT}"
+
+
+def plot_population_tile_map(year, bounds, opacity=0.8, tile_budget=POPULATION_TILE_BUDGET):
+    """
+    使用 PyDeck 绘制人口密度瓦片图：按视图范围选择缩放级别，每张 Web 墨卡托瓦片作为一个 BitmapLayer。
+    启用本地瓦片服务时图层只包含瓦片地址，否则嵌入瓦片 PNG；地图数据量只与瓦片数量有关，而与网格点数量无关。
     Args:
-        population_data (list): 包含 [lon, lat, population] 的列表。
+        year (int): 年份。
+        bounds (list): 经纬度外包框 [[min_lon, min_lat], [max_lon, max_lat]]。
+        opacity (float): 图层透明度。
+        tile_budget (int): 最多加载的瓦片数量。
     Returns:
         pdk.Deck: PyDeck 地图对象。
     """
-    df = pd.DataFrame(
-        population_data,
-        columns=['lon', 'lat', 'population']
-    )
+    # 只有原始文件（没有金字塔）时不使用低缩放级别，避免整省范围的降采样读取
+    zoom = select_tile_zoom(bounds, population_tile_min_zoom(year), POPULATION_TILE_MAX_ZOOM, tile_budget)
+    tile_server_url = start_population_tile_server()
 
-    # 计算色阶
-    if start_rgba is None:
-        start_rgba = [255, 255, 0, 20]  # 黄、低透明度
-    if end_rgba is None:
-        end_rgba = [255, 0, 0, 255]  # 红、高透明度
-
-    start_array = np.array(start_rgba)
-    end_array = np.array(end_rgba)
-    gradient_array = np.linspace(start_array, end_array, steps, dtype=int, retstep=False)
-    dynamic_color_range = cast(np.ndarray, gradient_array).tolist()
+    layers = []
+    for x, y in tiles_for_bounds(bounds, zoom):
+        if tile_server_url is not None:
+            image = f"{tile_server_url}/{year}/{zoom}/{x}/{y}.png"
+        else:
+            image = get_population_tile_uri(year, zoom, x, y)
+            if image is None:  # 瓦片内没有人口
+                continue
+        layers.append(pdk.Layer(
+            'BitmapLayer',
+            id=f"population-tile-{zoom}-{x}-{y}",
+            data=None,
+            image=image,
+            bounds=tile_lonlat_bounds(zoom, x, y),
+            opacity=opacity,
+            pickable=False
+        ))
 
     # 创建视图
-    all_points = df[['lon', 'lat']].values.tolist()
-    view_state = pdk.data_utils.compute_view(all_points)
-    view_state.pitch = 0  # 上下旋转角度，2D 俯视
-    view_state.bearing = 0  # 左右旋转角度
-
-    # 创建热力图层
-    layer = pdk.Layer(
-        'HeatmapLayer',
-        data=df,
-        get_position=['lon', 'lat'],
-        get_weight='population',
-        radius_pixels=50,
-        intensity=1,  # 每个数据点值的权重（乘数）
-        opacity=0.8,
-        color_range=dynamic_color_range,
-        pickable=False
-    )
+    view_state = pdk.data_utils.compute_view(bounds)
+    view_state.pitch = 0
+    view_state.bearing = 0
 
-    # 创建 PyDeck 地图对象
     r = pdk.Deck(
-        layers=[layer],
+        layers=layers,
         initial_view_state=view_state,
         map_style='mapbox://styles/mapbox/dark-v10'
     )
     return r
 
 
-def plot_population_3d_map(population_data, elevation_scale=10, radius=45, pitch=50):
+def plot_population_3d_map(lon=None, lat=None, population=None, elevation_scale=10, radius=45, pitch=50,
+                           level=None, bounds=None):
     """
     使用 PyDeck 绘制人口密度 3D 柱状图。
     Args:
-        population_data (list): 包含 [lon, lat, population] 的列表。
-        elevation_scale (int): 高度缩放因子。
-        radius (int): 柱子半径（米）。
+        lon (np.ndarray): 网格经度数组。
+        lat (np.ndarray): 网格纬度数组。
+        population (np.ndarray): 网格人口数组。
+        elevation_scale (int): 高度缩放因子。使用聚合层级时按层级的网格面积等比例缩小。
+        radius (int): 柱子半径（米）。使用聚合层级时按层级的网格大小等比例放大。
         pitch (int): 视图倾斜角度 (0-90 度)。
+        level (dict): 可选，人口聚合层级（get_population_map_level 等返回）；提供时忽略 lon/lat/population。
+        bounds (list): 可选，视图外包框 [[min_lon, min_lat], [max_lon, max_lat]]，不提供时由网格经纬度计算。
     Returns:
         pdk.Deck: PyDeck 地图对象。
     """
-    df_3d = pd.DataFrame(
-        population_data,
-        columns=['lon', 'lat', 'population']
-    )
+    if level is not None:
+        lon, lat, population = level["lon"], level["lat"], level["population"]
+        scale = level["cell_size_m"] / POPULATION_CELL_SIZE_M
+        radius = radius * scale
+        elevation_scale = elevation_scale / scale ** 2  # 柱子高度按网格面积归一化，保持与原始网格可比
+    df_3d = pd.DataFrame({'lon': lon, 'lat': lat, 'population': population})
 
     # 创建视图
-    all_points = df_3d[['lon', 'lat']].values.tolist()
-    view_state = pdk.data_utils.compute_view(all_points)
+    view_state = pdk.data_utils.compute_view(bounds if bounds is not None else points_bounds(lon, lat))
     view_state.pitch = pitch
     view_state.bearing = 0
 
@@ -110,3 +133,77 @@ def plot_population_3d_map(population_data, elevation_scale=10, radius=45, pitch
     )
     return r
 
+
+def plot_population_change_map(lon, lat, change, radius=50):
+    """
+    使用 PyDeck 绘制网格人口变化图：红色表示人口增长，蓝色表示人口减少，颜色越深变化越大。
+    Args:
+        lon (np.ndarray): 网格经度数组。
+        lat (np.ndarray): 网格纬度数组。
+        change (np.ndarray): 网格人口变化数组。
+        radius (int): 网格点半径（米）。
+    Returns:
+        pdk.Deck: PyDeck 地图对象。
+    """
+    df_change = pd.DataFrame({'lon': lon, 'lat': lat, 'change': change})
+
+    # 使用 95 分位数作为颜色饱和的阈值，避免少数极端值压缩整体色阶
+    abs_change = np.abs(df_change['change'].to_numpy())
+    scale = float(np.percentile(abs_change, 95)) if abs_change.size else 0.0
+    scale = scale if scale > 0 else 1.0
+    df_change['alpha'] = (40 + 215 * np.clip(abs_change / scale, 0, 1)).astype(np.uint8)
+
+    # 创建视图
+    view_state = pdk.data_utils.compute_view(points_bounds(lon, lat))
+    view_state.pitch = 0
+    view_state.bearing = 0
+
+    layer = pdk.Layer(
+        'ScatterplotLayer',
+        data=df_change,
+        get_position=['lon', 'lat'],
+        get_radius=radius,
+        radius_units='meters',
+        get_fill_color="[change > 0 ? 230 : 30, 60, change > 0 ? 30 : 230, alpha]",
+        pickable=True
+    )
+
+    r = pdk.Deck(
+        layers=[layer],
+        initial_view_state=view_state,
+        map_style='mapbox://styles/mapbox/dark-v10',
+        tooltip={
+            "html": "<b>人口变化:</b> {change}<br/><b>经度:</b> {lon}<br/><b>纬度:</b> {lat}",
+            "style": {
+                "backgroundColor": "#f0f2f6",
+                "color": "black",
+                "border-radius": "5px"
+            }
+        }
+    )
+    return r
+
+
+def select_pyramid_level(pyramid, point_budget=POPULATION_POINT_BUDGET):
+    """
+    选择网格点数量不超过预算的最精细层级；如果所有层级均超出预算，返回最粗的层级。
+    Args:
+        pyramid (list): 按分辨率从细到粗排列的层级列表
+        point_budget (int): 最多渲染的网格点数量
+    Returns:
+        dict: 选中的层级
+    """
+    for level in pyramid:
+        if level["population"].size <= point_budget:
+            return level
+    return pyramid[-1]
+
+
+def points_bounds(lon, lat):
+    """
+    计算经纬度数组的外包框，返回 [[min_lon, min_lat], [max_lon, max_lat]]，用于配合 PyDeck 计算视图
+    """
+    return [
+        [float(np.min(lon)), float(np.min(lat))],  # sw
+        [float(np.max(lon)), float(np.max(lat))]  # ne
+    ]
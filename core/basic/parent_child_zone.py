@@ -2,7 +2,8 @@ import streamlit as st
 import pydeck as pdk
 import pydeck.data_utils
 
-from utils import get_geojson_from_aliyun, hex_to_rgba, extract_geojson_coordinates
+from utils import load_boundary_geojson, load_boundary_outline_geojson, get_boundary_bbox, prefetch_boundaries, \
+    hex_to_rgba, extract_geojson_coordinates
 from config.settings import MAPBOX_STYLE_MAP, COLOR_MAP_HEX
 
 
@@ -14,9 +15,14 @@ def plot_zone_map(adcode, sub_adcode, map_type_url,
     - 父级行政区 adcode (仅边界)
     - 子级行政区 sub_adcode (填充)
     """
-    # 获取 GeoJSON
-    parent_geojson = get_geojson_from_aliyun(adcode, is_sub=True)
-    child_geojson = get_geojson_from_aliyun(sub_adcode, is_sub=False)
+    # 创建视图：边界库中有该区域时，直接使用空间索引中的外包框，并按视图缩放级别读取简化边界
+    bbox = get_boundary_bbox(adcode)
+    view_state = pdk.data_utils.compute_view(bbox) if bbox is not None else None
+    zoom = view_state.zoom if view_state is not None else None
+
+    # 获取 GeoJSON：父级图层只绘制边界，使用共享弧段组成的边界线，相邻区域的公共边界只传输一次
+    parent_geojson = load_boundary_outline_geojson(adcode, zoom=zoom)
+    child_geojson = load_boundary_geojson(sub_adcode, is_sub=False, zoom=zoom)
     # 颜色转换
     fill_alpha = fill_opacity if do_fill else 0.0
     fill_rgba = hex_to_rgba(fill_color_hex, fill_alpha)
@@ -48,9 +54,9 @@ def plot_zone_map(adcode, sub_adcode, map_type_url,
         pickable=False
     )
 
-    # 创建视图
-    all_points = extract_geojson_coordinates(parent_geojson)
-    view_state = pdk.data_utils.compute_view(all_points)
+    if view_state is None:
+        all_points = extract_geojson_coordinates(parent_geojson)
+        view_state = pdk.data_utils.compute_view(all_points)
     view_state.pitch = 0  # 上下旋转角度，2D 俯视
     view_state.bearing = 0  # 左右旋转角度
 
@@ -63,6 +69,26 @@ def plot_zone_map(adcode, sub_adcode, map_type_url,
     return r
 
 
+def prefetch_zone_boundaries(zone_info):
+    """
+    并发预取页面所需、但边界库中没有的行政区边界（写入本地边界缓存），之后各地图的读取均命中缓存，
+    页面的边界加载耗时由各请求耗时之和降为最慢的单个请求。
+    每个会话中同一区域只预取一次，切换控件引起的重新运行不再重复检查。
+    :param zone_info: select_zone 返回的区域信息
+    """
+    boundary_keys = (
+        (100000, True),
+        (zone_info["province_adcode"], False), (zone_info["province_adcode"], True),
+        (zone_info["city_adcode"], False), (zone_info["city_adcode"], True),
+        (zone_info["district_adcode"], False)
+    )
+    prefetched = st.session_state.setdefault("prefetched_zone_boundaries", set())
+    if boundary_keys in prefetched:
+        return
+    prefetch_boundaries(boundary_keys)
+    prefetched.add(boundary_keys)
+
+
 def generate_zone_style_widgets(key, edge_width_base):
     """
     生成一套独立的地图样式控制小部件。
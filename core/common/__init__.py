@@ -1,7 +1,7 @@
 from .sidebar_module import custom_sidebar_pages_order
-from .zone_select_module import load_cities_info, select_zone
+from .zone_select_module import load_cities_info, load_admin_index, load_admin_search_index, select_zone
 
 __all__ = [
     "custom_sidebar_pages_order",
-    "load_cities_info", "select_zone"
+    "load_cities_info", "load_admin_index", "load_admin_search_index", "select_zone"
 ]
@@ -1,102 +1,160 @@
 import streamlit as st
-import os
-import json
-import pandas as pd
 
-from config.settings import ASSETS_MAP_PATH
+from utils import read_admin_sources, load_admin_table, admin_index_from_table, build_admin_search_index, \
+    read_street_shard
+
+# 区域选择框在 session_state 中的键（搜索结果通过修改这些键跳转到对应区域）
+ZONE_SELECT_KEYS = ("zone_province_code", "zone_city_code", "zone_district_code", "zone_street_code")
 
 
 # @st.cache_data: Streamlit 提供的函数返回值缓存
 # 简单来说，这个装饰器让函数保存自己的计算结果。当同一个函数第二次被相同的参数调用时，直接返回之前缓存的结果，而不是重新计算
 @st.cache_data
 def load_cities_info():
-    """缓存加载 pca-code 和 adcode 数据"""
-    pca_code_path = os.path.join(ASSETS_MAP_PATH, "pca-code.json")
-    with open(file=pca_code_path, mode="r", encoding="utf-8") as f:
-        pca_code_data = json.load(f)
+    """缓存加载 pca-code 和 adcode 数据（直接解析源文件，较慢；区域选择使用 load_admin_index）"""
+    pca_code_data, adcode_df, _ = read_admin_sources()
+    return pca_code_data, adcode_df
+
+
+@st.cache_resource(show_spinner=False)
+def load_admin_index():
+    """
+    加载行政区划索引（进程内只构建一次，所有会话共享同一个只读对象，每次重新运行页面时不再复制与遍历）。
+    索引由编译后的行政区划快照构建，冷启动时无需解析 pca-code.json 与 xlsx；快照缺失或过期时自动重新编译。
+    """
+    return admin_index_from_table(load_admin_table())
+
+
+@st.cache_resource(show_spinner="正在构建行政区划搜索索引...")
+def load_admin_search_index():
+    """
+    加载省、市、区/县、街道名称的搜索索引（进程内只构建一次，所有会话共享；第一次搜索时才构建）
+    """
+    return build_admin_search_index(load_admin_index(), load_admin_table())
+
+
+@st.cache_resource(show_spinner=False)
+def load_street_shard(province_code):
+    """
+    按省加载街道（乡镇）列表：只在用户展开某个省的街道时读取该省的快照分片，所有会话共享
+    :return: dict：区/县代码 -> ((街道代码, 街道名称), ...)
+    """
+    load_admin_index()  # 确保快照已编译且未过期
+    streets = read_street_shard(province_code)
+    if streets is None:
+        print(f"行政区划快照读取失败，无法加载街道（乡镇）：{province_code}")
+        return {}
+    return streets
+
+
+def jump_to_search_result(results):
+    """
+    搜索结果选择框的回调：将省、市、区/县选择框设置为所选结果所在的区域（在页面重新运行、渲染选择框之前执行）
+    :param results: dict：区划代码 -> 搜索结果
+    """
+    result = results.get(st.session_state.get("zone_search_result"))
+    if result is None:
+        return
+    for key in ZONE_SELECT_KEYS:
+        st.session_state.pop(key, None)
+    for key, (code, _, _) in zip(ZONE_SELECT_KEYS, result["path"]):
+        st.session_state[key] = code
+    if result["level"] == "street":
+        st.session_state["zone_street_enabled"] = True
+    st.session_state["zone_search_query"] = ""
+    st.session_state.pop("zone_search_result", None)
 
-    adcode_path = os.path.join(ASSETS_MAP_PATH, "amap_adcode_citycode.xlsx")
-    df = pd.read_excel(adcode_path)
-    df.set_index("中文名", inplace=True)
 
-    return pca_code_data, df
+def search_zone():
+    """
+    加载区域搜索组件：输入名称片段（或拼音首字母），选择搜索结果后直接跳转到对应区域
+    """
+    query = st.text_input(
+        "搜索区域：", key="zone_search_query", placeholder="输入省、市、区/县或街道（乡镇）名称，例如：海淀、东华门"
+    )
+    if not query:
+        return
+    results = {result["code"]: result for result in load_admin_search_index().search(query, limit=20)}
+    if not results:
+        st.caption(f"没有找到与 {query} 匹配的区域")
+        return
+    st.selectbox(
+        "搜索结果：", list(results), index=None, key="zone_search_result", placeholder="请选择要跳转的区域",
+        format_func=lambda code: results[code]["full_name"], on_change=jump_to_search_result, args=(results,)
+    )
 
 
-def select_zone(pca_code_data, adcode_df):
+def select_zone(admin_index):
     """
-    加载区域选择组件。
-    :param pca_code_data: 多级行政区数据
-    :param adcode_df: adcode 查找表
-    :return: 选择的省，城市，区/县 名称 & adcode 字典
+    加载区域选择组件。选择框的选项为区划代码，按代码浏览上下级，不依赖名称查找，因此不存在重名问题。
+    :param admin_index: 行政区划索引（load_admin_index 的返回值）
+    :return: 选择的省，城市，区/县 名称 & adcode 字典；开启街道（乡镇）选择时，另外包含选择的街道代码与名称
     """
     st.markdown("##### 区域范围")
+    search_zone()
     col1, col2, col3 = st.columns(3)
 
+    def format_name(code):
+        return admin_index.get(code).name
+
+    def options_for(key, codes):
+        # 上级区域变化后，session_state 中保存的下级选择不在新的选项中，需要清除后使用默认选项
+        if st.session_state.get(key) not in codes:
+            st.session_state.pop(key, None)
+        return codes
+
     # --- 维度一：省 ---
-    province_names = [p["name"] for p in pca_code_data]
     with col1:
-        selected_province_name = st.selectbox("请选择省份（或直辖市）：", province_names)
-    selected_province_adcode = adcode_df.loc[selected_province_name, "adcode"]
-    selected_province_dict = next(
-        p for p in pca_code_data if p["name"] == selected_province_name)  # next: 从可迭代对象中返回第一个满足条件的元素
+        selected_province_code = st.selectbox(
+            "请选择省份（或直辖市）：", options_for(ZONE_SELECT_KEYS[0], [p.code for p in admin_index.provinces()]),
+            format_func=format_name, key=ZONE_SELECT_KEYS[0]
+        )
+    selected_province = admin_index.get(selected_province_code)
 
-    # --- 维度二：市 ---
-    city_names = [c["name"] for c in selected_province_dict["children"]]
+    # --- 维度二：市（直辖市、省直辖县级行政区划的 adcode 与省级相同） ---
     with col2:
-        selected_city_name = st.selectbox("请选择城市：", city_names)
-    # 特殊处理四个直辖市
-    selected_city_adcode = None
-    if selected_province_name in ["北京市", "天津市", "上海市", "重庆市"]:
-        selected_city_adcode = selected_province_adcode
-    else:
-        try:
-            selected_city_adcode = adcode_df.loc[selected_city_name, "adcode"]
-        except KeyError:
-            st.error(f"未找到 {selected_city_name} 对应的 adcode!")
-            st.stop()  # 立刻停止当前脚本的执行
-
-    selected_city_dict = next(c for c in selected_province_dict["children"] if c["name"] == selected_city_name)
+        selected_city_code = st.selectbox(
+            "请选择城市：", options_for(ZONE_SELECT_KEYS[1], selected_province.children),
+            format_func=format_name, key=ZONE_SELECT_KEYS[1]
+        )
+    selected_city = admin_index.get(selected_city_code)
 
     # --- 维度三：区 ---
-    district_names = [d["name"] for d in selected_city_dict["children"]]
-    if not district_names:
-        st.warning(f"城市 {selected_city_name} 下没有找到区/县信息！")
+    districts = admin_index.children(selected_city_code)
+    if not districts:
+        st.warning(f"城市 {selected_city.name} 下没有找到区/县信息！")
         st.stop()
     with col3:
-        selected_district_name = st.selectbox("请选择区/县：", district_names)
+        selected_district_code = st.selectbox(
+            "请选择区/县：", options_for(ZONE_SELECT_KEYS[2], selected_city.children),
+            format_func=format_name, key=ZONE_SELECT_KEYS[2]
+        )
+    selected_district = admin_index.get(selected_district_code)
 
-    selected_district_adcode = None
-    try:
-        selected_district_adcode = adcode_df.loc[selected_district_name, "adcode"]
-    except KeyError:
-        st.error(f"未找到 {selected_district_name} 对应的 adcode!")
-        st.stop()
-
-    # 处理 amap_adcode_citycode.xlsx 中的重名区域
-    if isinstance(selected_district_adcode, (pd.DataFrame, pd.Series)):
-        if selected_province_name in ["北京市", "天津市", "上海市", "重庆市"]:
-            prefix = str(selected_city_adcode)[:3]
+    # --- 维度四：街道（乡镇），只在开启时按省加载街道列表 ---
+    streets = ()
+    selected_street_code = None
+    if st.toggle("细化到街道（乡镇）", key="zone_street_enabled"):
+        streets = load_street_shard(selected_province_code).get(selected_district_code, ())
+        street_names = dict(streets)
+        if streets:
+            selected_street_code = st.selectbox(
+                "请选择街道（乡镇）：", options_for(ZONE_SELECT_KEYS[3], list(street_names)),
+                format_func=lambda code: street_names[code], key=ZONE_SELECT_KEYS[3]
+            )
         else:
-            prefix = str(selected_city_adcode)[:4]
-        count = 0
-        for name, adcode in selected_district_adcode.items():
-            if str(adcode).startswith(prefix):
-                selected_district_adcode = adcode
-                count += 1
-        if count != 1:
-            st.warning("展示的地图信息可能存在错误！详细信息：存在重名区域未被区分，adcode 可能错误。")
-            st.stop()
-
-    if selected_province_adcode is None or selected_city_adcode is None or selected_district_adcode is None:
-        st.error(f"省份/城市/区域对应 adcode 数据错误！")
-        st.stop()
+            st.caption(f"{selected_district.name} 下没有街道（乡镇）信息")
 
     return {
-        "province_name": selected_province_name,
-        "province_adcode": selected_province_adcode,
-        "city_name": selected_city_name,
-        "city_adcode": selected_city_adcode,
-        "district_name": selected_district_name,
-        "district_adcode": selected_district_adcode,
-        "all_district_names": district_names  # 城市下的所有区/县列表
+        "province_name": selected_province.name,
+        "province_adcode": selected_province.adcode,
+        "city_name": selected_city.name,
+        "city_adcode": selected_city.adcode,
+        "district_name": selected_district.name,
+        "district_adcode": selected_district.adcode,
+        "all_district_names": [d.name for d in districts],  # 城市下的所有区/县列表
+        "all_districts": tuple((d.name, d.adcode) for d in districts),  # 城市下的所有区/县：(名称, adcode)
+        "street_code": selected_street_code,  # 未开启街道选择时为 None
+        "street_name": dict(streets).get(selected_street_code),
+        "all_streets": tuple((name, code) for code, name in streets)  # 区/县下的所有街道：(名称, 代码)
     }
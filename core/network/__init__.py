@@ -1,5 +1,7 @@
-from .road_network import load_network_from_osm, generate_network_style_widgets, plot_network_map
+from .road_network import load_network_from_osm, load_networks_from_osm, export_network_edges, \
+    generate_network_style_widgets, plot_network_map
 
 __all__ = [
-    "load_network_from_osm", "generate_network_style_widgets", "plot_network_map"
+    "load_network_from_osm", "load_networks_from_osm", "export_network_edges", "generate_network_style_widgets",
+    "plot_network_map"
 ]
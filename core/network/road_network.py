@@ -7,63 +7,119 @@ import pydeck.data_utils
 import numpy as np
 import pandas as pd
 
-from config.settings import DATA_NETWORK_PATH, MAPBOX_STYLE_MAP, COLOR_MAP_HEX
+from config.settings import NETWORK_SHARED_DOWNLOAD, NETWORK_PBF_PATH, NETWORK_PBF_CACHE_ENTRIES, MAPBOX_STYLE_MAP, \
+    COLOR_MAP_HEX
 from utils import *
 
 # 关闭 osmnx 的自动缓存功能，禁止在本地生成 ./cache 文件夹
 ox.settings.use_cache = False
+# 从 PBF 文件读取时保留所有页面路网类型需要的标签，读取结果可供各类型共用
+PBF_NETWORK_TYPES = ("drive", "bike", "walk")
+
+
+def read_cached_network(adcode, network_type, coordinate_system="WGS84"):
+    """
+    读取本地缓存的路网；旧版本缓存（所有属性列都是字符串）先原地升级为带类型的列
+    :return: (gdf_nodes, gdf_edges)；没有缓存时返回 None
+    """
+    edges_file_path, nodes_file_path = network_cache_filepaths(adcode, network_type)
+    if not (os.path.exists(edges_file_path) and os.path.exists(nodes_file_path)):
+        return None
+    migrate_network_cache(edges_file_path)
+    migrate_network_cache(nodes_file_path)
+    gdf_edges = read_network_cache(ensure_converted_parquet(edges_file_path, coordinate_system))
+    gdf_nodes = read_network_cache(ensure_converted_parquet(nodes_file_path, coordinate_system))
+    return gdf_nodes, gdf_edges
+
+
+def save_network(G, adcode, network_type, coordinate_system="WGS84"):
+    """
+    将 osmnx 路网保存到本地缓存
+    :return: (gdf_nodes, gdf_edges)：按缓存的列类型整理、并转换到指定坐标系后的 gdf
+    """
+    edges_file_path, nodes_file_path = network_cache_filepaths(adcode, network_type)
+    write_network_graph(G, edges_file_path, nodes_file_path)
+    gdf_edges = read_network_cache(edges_file_path)
+    gdf_nodes = read_network_cache(nodes_file_path)
+    if coordinate_system != "WGS84":
+        gdf_nodes = convert_geodataframe(gdf_nodes, "WGS84", coordinate_system)
+        gdf_edges = convert_geodataframe(gdf_edges, "WGS84", coordinate_system)
+    return gdf_nodes, gdf_edges
+
+
+def zone_polygon(adcode):
+    """
+    区域边界多边形（无论 GeoJSON 中是一个还是多个多边形，都将它们合并）；边界无效时返回 None
+    """
+    geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
+    gdf = gpd.GeoDataFrame.from_features(geojson_data_dict['features'], crs="EPSG:4326")
+    polygon = gdf.geometry.union_all()
+    return polygon if polygon.is_valid else None
+
+
+def network_source():
+    """
+    路网数据来源说明（用于页面提示）
+    """
+    return f"本地 OSM 文件 {os.path.basename(NETWORK_PBF_PATH)}" if NETWORK_PBF_PATH else "OSM"
+
+
+@st.cache_resource(show_spinner=False, max_entries=NETWORK_PBF_CACHE_ENTRIES)
+def read_pbf_elements(filepath, mtime, bounds):
+    """
+    读取 PBF 文件中落在外包矩形内的路网数据（进程内缓存；mtime 用于文件更新后失效）
+    :param bounds: (min_lon, min_lat, max_lon, max_lat)
+    :return: read_pbf_network_elements 的返回值
+    """
+    return read_pbf_network_elements(filepath, [bounds], PBF_NETWORK_TYPES)
+
+
+def build_network_graphs(polygon, network_types):
+    """
+    构建区域内各类型的 osmnx 路网：设置了 NETWORK_PBF_PATH 时从本地 PBF 文件读取，否则从 Overpass 下载
+    （多种类型只下载一次）
+    :return: dict：路网类型 -> networkx.MultiDiGraph
+    """
+    if NETWORK_PBF_PATH:
+        poly_buff = buffer_polygon(polygon)
+        elements = read_pbf_elements(NETWORK_PBF_PATH, os.path.getmtime(NETWORK_PBF_PATH), tuple(poly_buff.bounds))
+        return graphs_from_pbf_elements(elements, polygon, poly_buff, network_types)
+    if len(network_types) == 1:
+        return {network_types[0]: ox.graph_from_polygon(polygon, network_type=network_types[0])}
+    return graphs_from_polygon(polygon, network_types)
 
 
 @st.cache_data(show_spinner=False)
-def load_network_from_osm(adcode, network_type):
+def load_network_from_osm(adcode, network_type, coordinate_system="WGS84"):
     """
     从 osm 上下载道路网数据。
     :param adcode (int): 区/县 adcode
     :param network_type (str): 需要获取的交通网络类型
+    :param coordinate_system (str): 返回数据的坐标系（WGS84 / GCJ02 / BD09），本地缓存始终为 OSM 原始的 WGS84，
+                                    其余坐标系的副本在第一次使用时转换并缓存在原文件旁边；节点的 x / y 属性列保持原样
     :return: (gdf_nodes, gdf_edges): 路网"边"/"节点"的 gdf
     """
-    adcode_dir = os.path.join(DATA_NETWORK_PATH, str(adcode))
-    if not os.path.exists(adcode_dir):
-        os.makedirs(adcode_dir)
-
-    edges_file_path = os.path.join(adcode_dir, f"{network_type}_edges.parquet")
-    nodes_file_path = os.path.join(adcode_dir, f"{network_type}_nodes.parquet")
-
     status_placeholder = st.empty()  # 创建 streamlit 提供的占位符，可以动态显示不同的内容
 
     # 优先检查本地缓存文件
-    if os.path.exists(edges_file_path) and os.path.exists(nodes_file_path):
-        status_placeholder.info(f"发现本地缓存文件，正在加载 {network_type} 路网...")
-        try:
-            gdf_edges = gpd.read_parquet(edges_file_path)
-            gdf_nodes = gpd.read_parquet(nodes_file_path)
+    try:
+        cached = read_cached_network(adcode, network_type, coordinate_system)
+        if cached is not None:
             status_placeholder.success(f"已从本地文件加载 {network_type} 路网！")
-            return gdf_nodes, gdf_edges
-        except Exception as e:
-            st.warning(f"本地文件读取失败，将尝试重新下载。原因: {e}")
+            return cached
+    except Exception as e:
+        st.warning(f"本地文件读取失败，将尝试重新下载。原因: {e}")
 
     # 如果本地不存在文件
-    status_placeholder.info(f"本地无缓存，正在从 OSM 下载 {network_type} 路网（可能需要几分钟，请稍候）...")
-    geojson_data_dict = get_geojson_from_aliyun(adcode, is_sub=False)
-    gdf = gpd.GeoDataFrame.from_features(geojson_data_dict['features'], crs="EPSG:4326")
-    polygon = gdf.geometry.union_all()  # 无论 GeoJSON 中是一个还是多个多边形，都将它们合并
-    if not polygon.is_valid:
+    status_placeholder.info(f"本地无缓存，正在从 {network_source()} 获取 {network_type} 路网（可能需要几分钟，请稍候）...")
+    polygon = zone_polygon(adcode)
+    if polygon is None:
         st.error("GeoJSON 集合要素无效，请检查！")
         return None, None
 
     try:
-        G = ox.graph_from_polygon(polygon, network_type=network_type)
-        gdf_nodes, gdf_edges = ox.graph_to_gdfs(G, nodes=True, edges=True)
-        # 格式转换：Parquet 不支持一列数据中同时有 list/non-list/non-null values，因此统一转换为字符串
-        for col in gdf_edges.columns:
-            if col != 'geometry':
-                gdf_edges[col] = gdf_edges[col].astype(str)
-        gdf_edges.to_parquet(edges_file_path)
-        for col in gdf_nodes.columns:
-            if col != 'geometry':
-                gdf_nodes[col] = gdf_nodes[col].astype(str)
-        gdf_nodes.to_parquet(nodes_file_path)
-
+        G = build_network_graphs(polygon, [network_type])[network_type]
+        gdf_nodes, gdf_edges = save_network(G, adcode, network_type, coordinate_system)
         status_placeholder.success(f"{network_type} 类型路网下载并构建完成，并成功保存到本地！")
         return gdf_nodes, gdf_edges
     except Exception as e:
@@ -71,6 +127,67 @@ def load_network_from_osm(adcode, network_type):
         return None, None
 
 
+@st.cache_data(show_spinner=False)
+def load_networks_from_osm(adcode, network_types, coordinate_system="WGS84"):
+    """
+    加载多种类型的道路网数据：本地没有缓存的类型只从 OSM 下载一次（"all" 类型的原始数据）或只读取一次本地 PBF 文件，
+    再在本地按各类型的筛选条件构建路网，结果与单独下载相同，保存到相同的本地缓存。
+    NETWORK_SHARED_DOWNLOAD 为 False、或只缺少一种类型时，逐个调用 load_network_from_osm。
+    :param adcode (int): 区/县 adcode
+    :param network_types (tuple): 需要获取的交通网络类型，例如 ("drive", "bike", "walk")
+    :param coordinate_system (str): 返回数据的坐标系（WGS84 / GCJ02 / BD09）
+    :return: dict：路网类型 -> (gdf_nodes, gdf_edges)，下载或构建失败的类型为 (None, None)
+    """
+    networks = {}
+    for network_type in network_types:
+        try:
+            cached = read_cached_network(adcode, network_type, coordinate_system)
+        except Exception as e:
+            st.warning(f"本地 {network_type} 路网读取失败，将尝试重新下载。原因: {e}")
+            cached = None
+        if cached is not None:
+            networks[network_type] = cached
+
+    missing_types = [network_type for network_type in network_types if network_type not in networks]
+    if not NETWORK_SHARED_DOWNLOAD or len(missing_types) <= 1:
+        for network_type in missing_types:
+            networks[network_type] = load_network_from_osm(adcode, network_type, coordinate_system)
+        return {network_type: networks[network_type] for network_type in network_types}
+
+    status_placeholder = st.empty()
+    status_placeholder.info(f"本地无缓存，正在从 {network_source()} 获取 {'、'.join(missing_types)} 路网"
+                            f"（只读取一次，可能需要几分钟，请稍候）...")
+    polygon = zone_polygon(adcode)
+    if polygon is None:
+        st.error("GeoJSON 集合要素无效，请检查！")
+        return {network_type: networks.get(network_type, (None, None)) for network_type in network_types}
+
+    try:
+        graphs = build_network_graphs(polygon, missing_types)
+        for network_type, G in graphs.items():
+            networks[network_type] = save_network(G, adcode, network_type, coordinate_system)
+        status_placeholder.success(f"{'、'.join(missing_types)} 路网下载并构建完成，并成功保存到本地！")
+    except Exception as e:
+        st.error(f"OSM 下载或构建失败: {e}")
+    return {network_type: networks.get(network_type, (None, None)) for network_type in network_types}
+
+
+def export_network_edges(adcode, network_type, coordinate_system="WGS84"):
+    """
+    导出本地缓存的路网"边"（GeoParquet），非 WGS84 坐标系时使用转换后的缓存副本
+    :param adcode (int): 区/县 adcode
+    :param network_type (str): 交通网络类型
+    :param coordinate_system (str): 导出的坐标系（WGS84 / GCJ02 / BD09）
+    :return: (文件名, 文件内容 bytes)；本地没有缓存时返回 None
+    """
+    edges_file_path, _ = network_cache_filepaths(adcode, network_type)
+    if not os.path.exists(edges_file_path):
+        return None
+    export_file_path = ensure_converted_parquet(edges_file_path, coordinate_system)
+    with open(export_file_path, mode="rb") as f:
+        return f"{adcode}_{os.path.basename(export_file_path)}", f.read()
+
+
 def generate_network_style_widgets(key):
     """
     生成路网地图的样式控制组件
@@ -166,8 +283,6 @@ def plot_network_map(nodes_gdf, edges_gdf, config_dict):
     # 创建图层
     layers = []
     if config_dict["show_edges"] and edges_gdf is not None:
-        edges_gdf["length"] = edges_gdf["length"].astype(float)  # 转换格式
-
         if config_dict["use_gradient_edges"]:
             edges_gdf["render_color"] = calculate_gradient_color(
                 values=edges_gdf["length"], start_rgba=[255, 230, 0, 150], end_rgba=[255, 0, 0, 255])  # 计算颜色列
@@ -5,6 +5,137 @@ import altair as alt
 
 from core.basic import *
 from core.common import *
+from config.settings import POPULATION_YEARS
+
+def population_metrics_view(population_data):
+    """
+    展示人口基本指标
+    :param population_data: get_population_from_tif / get_region_population_from_tif 返回的人口数据
+    """
+    pop_val = f"{population_data['total_population']:,}"
+    density_val = f"{population_data['population_density']:,}"
+    area_val = f"{population_data['area_km2']:,}"
+    max_density_val = f"{population_data['max_population_density']:,}"
+    min_density_val = f"{population_data['min_population_density']:,}"
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        with st.container(border=True):
+            st.markdown(f"**总人口 (人): {pop_val}**")
+    with col2:
+        with st.container(border=True):
+            st.markdown(f"**人口密度 (人/km²): {density_val}**")
+    with col3:
+        with st.container(border=True):
+            st.markdown(f"**面积 (km²): {area_val}**")
+    with col4:
+        with st.container(border=True):
+            st.markdown(f"**最高密度点 (人/100*100m²): {max_density_val}**")
+    with col5:
+        with st.container(border=True):
+            st.markdown(f"**最低密度点 (人/100*100m²): {min_density_val}**")
+
+
+def population_maps_view(zone_name, population_data, year, map_level):
+    """
+    展示人口密度热力图与 3D 图
+    :param zone_name: 区域名称
+    :param population_data: get_population_from_tif / get_region_population_from_tif 返回的人口数据
+    :param year: 年份（热力图按年份加载人口瓦片）
+    :param map_level: 3D 图使用的人口聚合层级
+    """
+    col1, col2 = st.columns(2)
+    # 人口分布热力图
+    with col1:
+        st.markdown(
+            f"<h5 style='text-align: center;'>{zone_name}人口密度热力图</h5>",
+            unsafe_allow_html=True
+        )
+        r = plot_population_tile_map(year, population_data['bounds'])
+        st.pydeck_chart(r, use_container_width=True)
+
+    # 人口分布3D图
+    with col2:
+        st.markdown(
+            f"<h5 style='text-align: center;'>{zone_name}人口密度3D图</h5>",
+            unsafe_allow_html=True
+        )
+        r = plot_population_3d_map(level=map_level, bounds=population_data['bounds'])
+        st.pydeck_chart(r, use_container_width=True)
+
+
+def zone_population_charts(zone_name, population_df):
+    """
+    展示下级区域的人口、人口密度与面积条形图
+    :param zone_name: 上级区域名称
+    :param population_df: get_city_population_from_tif / get_street_population_from_tif 返回的统计表
+    """
+    col1, col2, col3 = st.columns(3)
+    brush = alt.selection_interval(encodings=['y'])  # 用于鼠标交互，用户可以在 y 轴方向选择数据
+    # 总人口条形图
+    with col1:
+        st.markdown(
+            f"<h5 style='text-align: center;'>{zone_name}各区域人口分布</h5>",
+            unsafe_allow_html=True
+        )
+        chart = alt.Chart(population_df).mark_bar().encode(
+            y=alt.Y("district:N", title="区域"),
+            x=alt.X("total_population:Q", title="人口"),
+            tooltip=["district", "total_population"],  # 鼠标悬停时展示的信息
+            color=alt.condition(
+                brush,
+                if_true=alt.value("orange"),  # 选中时的颜色
+                if_false=alt.value("steelblue")  # 默认颜色
+            )
+        ).properties(
+        ).add_params(
+            brush
+        ).interactive()  # 允许缩放和滚动
+
+        st.altair_chart(chart, use_container_width=True)
+
+    with col2:
+        st.markdown(
+            f"<h5 style='text-align: center;'>{zone_name}各区域人口密度分布</h5>",
+            unsafe_allow_html=True
+        )
+        chart = alt.Chart(population_df).mark_bar().encode(
+            y=alt.Y("district:N", title="区域"),
+            x=alt.X("population_density:Q", title="人口密度"),
+            tooltip=["district", "population_density"],  # 鼠标悬停时展示的信息
+            color=alt.condition(
+                brush,
+                if_true=alt.value("orange"),  # 选中时的颜色
+                if_false=alt.value("steelblue")  # 默认颜色
+            )
+        ).properties(
+        ).add_params(
+            brush
+        ).interactive()  # 允许缩放和滚动
+
+        st.altair_chart(chart, use_container_width=True)
+
+    with col3:
+        st.markdown(
+            f"<h5 style='text-align: center;'>{zone_name}各区域面积分布</h5>",
+            unsafe_allow_html=True
+        )
+        chart = alt.Chart(population_df).mark_bar().encode(
+            y=alt.Y("district:N", title="区域"),
+            x=alt.X("area_km2:Q", title="面积（km²）"),
+            tooltip=["district", "area_km2"],  # 鼠标悬停时展示的信息
+            color=alt.condition(
+                brush,
+                if_true=alt.value("orange"),  # 选中时的颜色
+                if_false=alt.value("steelblue")  # 默认颜色
+            )
+        ).properties(
+        ).add_params(
+            brush
+        ).interactive()  # 允许缩放和滚动
+
+        st.altair_chart(chart, use_container_width=True)
+
 
 # 子页面配置
 st.set_page_config(
@@ -14,11 +145,13 @@ st.set_page_config(
 )
 
 custom_sidebar_pages_order()  # 侧边栏
+warm_up_population_rasters()  # 预热人口栅格句柄池（每个进程只执行一次）
 st.title("基本信息")
 st.divider()
 
-pca_code_data, df = load_cities_info()  # 加载数据
-zone_info = select_zone(pca_code_data, df)  # 加载区域选择框
+admin_index = load_admin_index()  # 加载行政区划索引
+zone_info = select_zone(admin_index)  # 加载区域选择框
+prefetch_zone_boundaries(zone_info)  # 并发预取本页面所需的行政区边界
 st.divider()
 
 # 1. 渲染主页面——第一部分
@@ -73,122 +206,42 @@ col1, col2 = st.columns(2)
 st.markdown("##### 年份选择")
 selected_year = st.selectbox(
     "请选择人口数据年份：",
-    options=[2020, 2021, 2022, 2023, 2024],
+    options=POPULATION_YEARS,
     index=0,  # 默认 2020 年
     label_visibility="collapsed"
 )
 
 # 2.2. 人口信息展示
 st.markdown("##### 信息维度选择")
+view_options = [
+    f"{zone_info['city_name']}: 市级人口信息概览",
+    f"{zone_info['district_name']}：区/县级人口信息概览",
+    f"{zone_info['district_name']}：多年人口变化",
+    f"{zone_info['province_name']}：省级人口信息概览",
+    "全国：人口信息概览"
+]
+street_view = f"{zone_info['district_name']}：街道（乡镇）人口信息概览"
+if zone_info["street_code"] is not None:
+    view_options.insert(2, street_view)  # 开启街道（乡镇）选择时才显示
 view_selection = st.radio(
     "选择视图：",
-    options=[
-        f"{zone_info['city_name']}: 市级人口信息概览",
-        f"{zone_info['district_name']}：区/县级人口信息概览"
-    ],
+    options=view_options,
     horizontal=True,
     label_visibility="collapsed"
 )
 
-df_city_population_info = get_city_population_from_tif(zone_info["province_name"], zone_info["city_adcode"],
-                                                       zone_info["all_district_names"], df,
+df_city_population_info = get_city_population_from_tif(zone_info["city_adcode"], zone_info["all_districts"],
                                                        selected_year)  # 加载指定年份城市人口统计数据
 district_data = get_population_from_tif(zone_info["district_adcode"], selected_year)  # 加载指定年份区/县人口详细数据
 
 st.divider()
 
 if view_selection == f"{zone_info['city_name']}: 市级人口信息概览":
-    col1, col2, col3 = st.columns(3)
-    brush = alt.selection_interval(encodings=['y'])  # 用于鼠标交互，用户可以在 y 轴方向选择数据
-    # 总人口条形图
-    with col1:
-        st.markdown(
-            f"<h5 style='text-align: center;'>{zone_info['city_name']}各区域人口分布</h5>",
-            unsafe_allow_html=True
-        )
-        chart = alt.Chart(df_city_population_info).mark_bar().encode(
-            y=alt.Y("district:N", title="区域"),
-            x=alt.X("total_population:Q", title="人口"),
-            tooltip=["district", "total_population"],  # 鼠标悬停时展示的信息
-            color=alt.condition(
-                brush,
-                if_true=alt.value("orange"),  # 选中时的颜色
-                if_false=alt.value("steelblue")  # 默认颜色
-            )
-        ).properties(
-        ).add_params(
-            brush
-        ).interactive()  # 允许缩放和滚动
-
-        st.altair_chart(chart, use_container_width=True)
-
-    with col2:
-        st.markdown(
-            f"<h5 style='text-align: center;'>{zone_info['city_name']}各区域人口密度分布</h5>",
-            unsafe_allow_html=True
-        )
-        chart = alt.Chart(df_city_population_info).mark_bar().encode(
-            y=alt.Y("district:N", title="区域"),
-            x=alt.X("population_density:Q", title="人口密度"),
-            tooltip=["district", "population_density"],  # 鼠标悬停时展示的信息
-            color=alt.condition(
-                brush,
-                if_true=alt.value("orange"),  # 选中时的颜色
-                if_false=alt.value("steelblue")  # 默认颜色
-            )
-        ).properties(
-        ).add_params(
-            brush
-        ).interactive()  # 允许缩放和滚动
-
-        st.altair_chart(chart, use_container_width=True)
-
-    with col3:
-        st.markdown(
-            f"<h5 style='text-align: center;'>{zone_info['city_name']}各区域面积分布</h5>",
-            unsafe_allow_html=True
-        )
-        chart = alt.Chart(df_city_population_info).mark_bar().encode(
-            y=alt.Y("district:N", title="区域"),
-            x=alt.X("area_km2:Q", title="面积（km²）"),
-            tooltip=["district", "area_km2"],  # 鼠标悬停时展示的信息
-            color=alt.condition(
-                brush,
-                if_true=alt.value("orange"),  # 选中时的颜色
-                if_false=alt.value("steelblue")  # 默认颜色
-            )
-        ).properties(
-        ).add_params(
-            brush
-        ).interactive()  # 允许缩放和滚动
-
-        st.altair_chart(chart, use_container_width=True)
+    zone_population_charts(zone_info['city_name'], df_city_population_info)
 
 # 2.3. 区/县级人口空间分布
 if view_selection == f"{zone_info['district_name']}：区/县级人口信息概览":
-    # 基本指标
-    pop_val = f"{district_data['total_population']:,}"
-    density_val = f"{district_data['population_density']:,}"
-    area_val = f"{district_data['area_km2']:,}"
-    max_density_val = f"{district_data['max_population_density']:,}"
-    min_density_val = f"{district_data['min_population_density']:,}"
-
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        with st.container(border=True):
-            st.markdown(f"**总人口 (人): {pop_val}**")
-    with col2:
-        with st.container(border=True):
-            st.markdown(f"**人口密度 (人/km²): {density_val}**")
-    with col3:
-        with st.container(border=True):
-            st.markdown(f"**面积 (km²): {area_val}**")
-    with col4:
-        with st.container(border=True):
-            st.markdown(f"**最高密度点 (人/100*100m²): {max_density_val}**")
-    with col5:
-        with st.container(border=True):
-            st.markdown(f"**最低密度点 (人/100*100m²): {min_density_val}**")
+    population_metrics_view(district_data)
 
     # 人口分布直方图
     st.markdown(
@@ -196,7 +249,7 @@ if view_selection == f"{zone_info['district_name']}：区/县级人口信息概
         unsafe_allow_html=True
     )
     df_hist = pd.DataFrame({
-        'population': district_data["population_values"]
+        'population': district_data["population"]
     })
     df_hist['bin'] = pd.cut(df_hist['population'], bins=50)  # 进行直方图分箱
     df_agg = df_hist.groupby('bin', observed=False).size().reset_index(name='count')
@@ -230,21 +283,85 @@ if view_selection == f"{zone_info['district_name']}：区/县级人口信息概
     combined_chart = alt.layer(chart, line)  # 叠加两个图像
     st.altair_chart(combined_chart, use_container_width=True)
 
+    population_maps_view(zone_info['district_name'], district_data, selected_year,
+                         get_population_map_level(zone_info["district_adcode"], selected_year))
+
+# 2.4. 街道（乡镇）级人口信息（只统计本地边界库中有边界的街道）
+if view_selection == street_view:
+    df_street_population_info = get_street_population_from_tif(zone_info["district_adcode"],
+                                                               zone_info["all_streets"], selected_year)
+    if df_street_population_info is None:
+        st.info(f"本地边界库中没有 {zone_info['district_name']} 的街道（乡镇）边界，无法统计街道人口。")
+        st.stop()
+    zone_population_charts(zone_info['district_name'], df_street_population_info)
+
+    # 统计表中只包含本地边界库中有边界的街道
+    street_data = None
+    if zone_info["street_name"] in set(df_street_population_info["district"]):
+        street_data = get_population_from_tif(int(zone_info["street_code"]), selected_year)
+    if street_data is None:
+        st.info(f"本地边界库中没有 {zone_info['street_name']} 的边界。")
+        st.stop()
+    st.markdown(
+        f"<h5 style='text-align: center;'>{zone_info['street_name']}人口信息</h5>",
+        unsafe_allow_html=True
+    )
+    population_metrics_view(street_data)
+    population_maps_view(zone_info['street_name'], street_data, selected_year,
+                         get_population_map_level(int(zone_info["street_code"]), selected_year))
+
+# 2.5. 区/县级多年人口变化（所有年份共用一次裁剪，与年份选择器无关）
+if view_selection == f"{zone_info['district_name']}：多年人口变化":
+    stack_data = get_population_stack_from_tif(zone_info["district_adcode"], POPULATION_YEARS)
+    if stack_data is None:
+        st.warning(f"{zone_info['district_name']} 没有裁剪到人口数据！")
+        st.stop()
+
     col1, col2 = st.columns(2)
-    # 人口分布热力图
+    # 总人口时间序列
     with col1:
         st.markdown(
-            f"<h5 style='text-align: center;'>{zone_info['district_name']}人口密度热力图</h5>",
+            f"<h5 style='text-align: center;'>{zone_info['district_name']}总人口变化趋势</h5>",
             unsafe_allow_html=True
         )
-        r = plot_heatmap(district_data['population_data'])
-        st.pydeck_chart(r, use_container_width=True)
+        df_trend = pd.DataFrame({
+            "year": stack_data["years"],
+            "total_population": stack_data["total_population"],
+            "growth_rate": stack_data["growth_rate"]
+        })
+        chart = alt.Chart(df_trend).mark_line(point=True).encode(
+            x=alt.X("year:O", title="年份", axis=alt.Axis(labelAngle=0)),
+            y=alt.Y("total_population:Q", title="总人口", scale=alt.Scale(zero=False)),
+            tooltip=[
+                alt.Tooltip("year:O", title="年份"),
+                alt.Tooltip("total_population:Q", title="总人口", format=","),
+                alt.Tooltip("growth_rate:Q", title="增长率", format=".2%")
+            ]
+        ).interactive()
+        st.altair_chart(chart, use_container_width=True)
 
-    # 人口分布3D图
+    # 网格人口变化图
     with col2:
         st.markdown(
-            f"<h5 style='text-align: center;'>{zone_info['district_name']}人口密度3D图</h5>",
+            f"<h5 style='text-align: center;'>{zone_info['district_name']}网格人口变化图"
+            f"（{stack_data['years'][0]} → {stack_data['years'][-1]}）</h5>",
             unsafe_allow_html=True
         )
-        r = plot_population_3d_map(district_data['population_data'])
+        r = plot_population_change_map(stack_data['lon'], stack_data['lat'], stack_data['change'])
         st.pydeck_chart(r, use_container_width=True)
+
+# 2.6. 省级 / 全国人口信息（分块并行处理）
+region_views = {
+    f"{zone_info['province_name']}：省级人口信息概览": (zone_info["province_name"], zone_info["province_adcode"]),
+    "全国：人口信息概览": ("全国", 100000)
+}
+if view_selection in region_views:
+    region_name, region_adcode = region_views[view_selection]
+    with st.spinner(f"正在分块处理{region_name}人口数据..."):
+        region_data = get_region_population_from_tif(region_adcode, selected_year)
+    if region_data is None:
+        st.warning(f"{region_name} 没有裁剪到人口数据！")
+        st.stop()
+
+    population_metrics_view(region_data)
+    population_maps_view(region_name, region_data, selected_year, region_data['map_level'])
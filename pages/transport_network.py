@@ -3,19 +3,48 @@ import altair as alt
 
 from core.network import *
 from core.common import *
+from config.settings import COORDINATE_SYSTEM_MAP
 
 
-def network_info_view(nodes_gdf, edges_gdf, key):
+def network_export_widget(adcode, key):
+    """
+    导出路网"边"，可选坐标系（叠加高德、百度等国内底图或合作方数据时使用 GCJ02 / BD09）
+    :param adcode: 区/县 adcode
+    :param key: 路网类型，同时作为组件唯一标识符 (如 'drive', 'bike')
+    """
+    col1, col2 = st.columns([0.6, 0.4], vertical_alignment="bottom")
+    with col1:
+        coordinate_system_label = st.selectbox(
+            "导出坐标系",
+            options=list(COORDINATE_SYSTEM_MAP.keys()),
+            index=0,
+            key=f"export_crs_{key}"
+        )
+    exported = export_network_edges(adcode, key, COORDINATE_SYSTEM_MAP[coordinate_system_label])
+    with col2:
+        if exported is not None:
+            file_name, data = exported
+            st.download_button(
+                "下载道路（GeoParquet）",
+                data=data,
+                file_name=file_name,
+                mime="application/octet-stream",
+                key=f"export_edges_{key}"
+            )
+
+
+def network_info_view(nodes_gdf, edges_gdf, key, adcode):
     """
     展示不同类型路网的信息
     :param nodes_gdf: 路网节点 gdf
     :param edges_gdf: 路网边 gdf
     :param key: 组件唯一标识符 (如 'drive', 'bike')
+    :param adcode: 区/县 adcode，用于导出路网
     :return:
     """
     # 基本指标
-    total_km = edges_gdf["length"].astype(float).sum() / 1000
-    avg_len = edges_gdf["length"].astype(float).mean()
+    total_km = edges_gdf["length"].sum() / 1000
+    avg_len = edges_gdf["length"].mean()
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         with st.container(border=True):
@@ -42,6 +71,7 @@ def network_info_view(nodes_gdf, edges_gdf, key):
         deck = plot_network_map(nodes_gdf, edges_gdf, network_style)
         if deck:
             st.pydeck_chart(deck)
+        network_export_widget(adcode, key=key)
 
     with col2:
         st.markdown(
@@ -76,12 +106,11 @@ def network_info_view(nodes_gdf, edges_gdf, key):
             f"<h5 style='text-align: center;'>道路类型和长度分布</h5>",
             unsafe_allow_html=True
         )
-        # 注意：OSMnx 的 highway 字段有时是列表，这里统一转为字符串
-        chart_data = edges_gdf.reset_index()[["highway", "length"]].copy()
-        chart_data["highway"] = chart_data["highway"].astype(str)
-        chart_data["length"] = chart_data["length"].astype(float)
+        # highway 为分类列（多个取值以 ";" 连接），length 为数值列，均无需再转换
+        chart_data = edges_gdf[["highway", "length"]]
         top_k_highways = chart_data["highway"].value_counts().nlargest(6).index.tolist()  # 取 top-k 类型
         chart_data = chart_data[chart_data["highway"].isin(top_k_highways)]  # 过滤，仅剩 top-k 类型的数据
+        chart_data = chart_data.assign(highway=chart_data["highway"].cat.remove_unused_categories())
 
         # 定义交互选择器 fields=['highway']: 表示根据“道路类型”来进行筛选
         selection = alt.selection_point(fields=["highway"], name="Select")
@@ -133,8 +162,8 @@ custom_sidebar_pages_order()  # 渲染侧边栏
 st.title("交通网络信息")
 st.divider()
 
-pca_code_data, df = load_cities_info()  # 加载数据
-zone_info = select_zone(pca_code_data, df)  # 加载区域选择框
+admin_index = load_admin_index()  # 加载行政区划索引
+zone_info = select_zone(admin_index)  # 加载区域选择框
 st.divider()
 
 view_selection = st.radio(
@@ -152,9 +181,11 @@ view_selection = st.radio(
 if view_selection == f"{zone_info['district_name']}道路网信息":
     # 1.1. 网络可视化
     # 加载 gdf 数据
-    drive_nodes_gdf, drive_edges_gdf = load_network_from_osm(zone_info["district_adcode"], network_type="drive")
-    bike_nodes_gdf, bike_edges_gdf = load_network_from_osm(zone_info["district_adcode"], network_type="bike")
-    walk_nodes_gdf, walk_edges_gdf = load_network_from_osm(zone_info["district_adcode"], network_type="walk")
+    # 三种路网都没有本地缓存时，只从 OSM 下载一次，在本地分别构建
+    networks = load_networks_from_osm(zone_info["district_adcode"], network_types=("drive", "bike", "walk"))
+    drive_nodes_gdf, drive_edges_gdf = networks["drive"]
+    bike_nodes_gdf, bike_edges_gdf = networks["bike"]
+    walk_nodes_gdf, walk_edges_gdf = networks["walk"]
     st.divider()
 
     if drive_nodes_gdf is not None and drive_edges_gdf is not None:
@@ -162,7 +193,8 @@ if view_selection == f"{zone_info['district_name']}道路网信息":
             f"<h4 style='text-align: center;'>机动车网络</h4>",
             unsafe_allow_html=True
         )
-        network_info_view(nodes_gdf=drive_nodes_gdf, edges_gdf=drive_edges_gdf, key="drive")
+        network_info_view(nodes_gdf=drive_nodes_gdf, edges_gdf=drive_edges_gdf, key="drive",
+                          adcode=zone_info["district_adcode"])
 
     st.divider()
     if bike_nodes_gdf is not None and bike_edges_gdf is not None:
@@ -170,7 +202,8 @@ if view_selection == f"{zone_info['district_name']}道路网信息":
             f"<h4 style='text-align: center;'>骑行网络</h4>",
             unsafe_allow_html=True
         )
-        network_info_view(nodes_gdf=bike_nodes_gdf, edges_gdf=bike_edges_gdf, key="bike")
+        network_info_view(nodes_gdf=bike_nodes_gdf, edges_gdf=bike_edges_gdf, key="bike",
+                          adcode=zone_info["district_adcode"])
 
     st.divider()
     if walk_nodes_gdf is not None and walk_edges_gdf is not None:
@@ -178,7 +211,8 @@ if view_selection == f"{zone_info['district_name']}道路网信息":
             f"<h4 style='text-align: center;'>步行网络</h4>",
             unsafe_allow_html=True
         )
-        network_info_view(nodes_gdf=walk_nodes_gdf, edges_gdf=walk_edges_gdf, key="walk")
+        network_info_view(nodes_gdf=walk_nodes_gdf, edges_gdf=walk_edges_gdf, key="walk",
+                          adcode=zone_info["district_adcode"])
 
 # 2. 渲染主页面——第二部分
 if view_selection == f"{zone_info['district_name']}地面公交路网信息":
@@ -0,0 +1 @@
+# 离线命令行工具，需在项目根目录下以模块方式运行，例如：python -m scripts.convert_population_to_cog
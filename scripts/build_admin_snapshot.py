@@ -0,0 +1,30 @@
+"""
+将行政区划源文件（pca-code.json、provinces/cities/areas/streets.json、amap_adcode_citycode.xlsx）
+编译为 ADMIN_SNAPSHOT_PATH 下的一个 Arrow IPC 快照。页面启动时内存映射读取快照，不再解析 JSON 与 xlsx；
+快照中保存源文件的内容哈希，源文件更新后页面会自动重新编译，也可以用本脚本提前编译。
+
+用法（在项目根目录下运行）：
+    python -m scripts.build_admin_snapshot
+"""
+import os
+import time
+
+from config.settings import ADMIN_SNAPSHOT_PATH
+from utils import compile_admin_snapshot, read_admin_snapshot
+
+
+def main():
+    start = time.perf_counter()
+    table = compile_admin_snapshot(ADMIN_SNAPSHOT_PATH)
+    print(f"共 {table.num_rows} 个行政区划（含街道），编译耗时 {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    if read_admin_snapshot(ADMIN_SNAPSHOT_PATH) is None:
+        print("快照写入失败！")
+        return
+    print(f"已保存到：{ADMIN_SNAPSHOT_PATH}（{os.path.getsize(ADMIN_SNAPSHOT_PATH) / 1024:.0f} KB），"
+          f"读取耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
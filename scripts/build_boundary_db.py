@@ -0,0 +1,137 @@
+"""
+离线构建全国行政区边界库：按 pca-code.json 的层级（全国 → 省 → 市 → 区/县）下载阿里云 DataV 边界，
+写入 BOUNDARY_DB_PATH 下的一个 SQLite 文件（adcode 唯一索引、parent_adcode 索引、R*Tree 空间索引）。
+边界库存在时，地图、人口与路网模块直接读取本地边界，不再逐个请求 DataV。
+
+下载方式：逐级请求父级区域的 _full 边界（一次请求得到全部下一级区域），同一级的请求并发执行；
+pca-code.json 中存在、但没有出现在父级 _full 边界中的区域，再单独请求。
+
+DataV 没有街道（乡镇）级边界。如果有本地的街道边界 GeoJSON（要素属性中包含 9 位街道代码 code 或 adcode），
+可以通过 --street-boundaries 一并写入边界库，用于街道级人口统计；上级区/县取街道代码的前 6 位。
+
+用法（在项目根目录下运行）：
+    python -m scripts.build_boundary_db
+    python -m scripts.build_boundary_db --street-boundaries streets_beijing.geojson streets_shanghai.geojson
+"""
+import argparse
+import json
+import os
+
+from config.settings import ASSETS_MAP_PATH, BOUNDARY_DB_PATH
+from utils import get_geojson_batch_from_aliyun
+from utils.boundary_db import write_boundary_db
+
+
+def pca_code_adcodes(pca_code_data):
+    """
+    列出 pca-code.json 中的所有省、市、区/县 adcode（省、市代码补齐为 6 位）
+    :return: set of int
+    """
+    adcodes = set()
+    for province in pca_code_data:
+        adcodes.add(int(province["code"].ljust(6, "0")))
+        for city in province.get("children", []):
+            adcodes.add(int(city["code"].ljust(6, "0")))
+            for district in city.get("children", []):
+                if len(district["code"]) == 6:
+                    adcodes.add(int(district["code"]))
+    return adcodes
+
+
+def collect_children(parent_adcodes):
+    """
+    并发请求各父级区域的 _full 边界，并为缺少 parent 信息的要素（例如南海诸岛九段线）补充上级 adcode
+    :param parent_adcodes: 父级区域 adcode 列表
+    :return: 下一级区域的 GeoJSON Feature 列表
+    """
+    results = get_geojson_batch_from_aliyun([(adcode, True) for adcode in parent_adcodes])
+    features = []
+    for (parent_adcode, _), geojson_data_dict in results.items():
+        if not geojson_data_dict:
+            print(f"{parent_adcode} 没有获取到下一级区域边界，跳过！")
+            continue
+        for feature in geojson_data_dict.get("features", []):
+            properties = feature.setdefault("properties", {})
+            if properties.get("adcode") == parent_adcode:
+                continue
+            if not (properties.get("parent") or {}).get("adcode"):
+                properties["parent"] = {"adcode": parent_adcode}
+            features.append(feature)
+    return features
+
+
+def load_street_features(filepaths):
+    """
+    读取本地街道（乡镇）边界 GeoJSON，将要素属性整理为与 DataV 一致的格式（adcode、name、level、parent）
+    :param filepaths: GeoJSON 文件路径列表
+    :return: GeoJSON Feature 列表
+    """
+    features = []
+    for filepath in filepaths:
+        with open(filepath, mode="r", encoding="utf-8") as f:
+            geojson_data_dict = json.load(f)
+        for feature in geojson_data_dict.get("features", []):
+            properties = feature.get("properties") or {}
+            code = str(properties.get("code") or properties.get("adcode") or "")
+            if len(code) != 9 or not code.isdigit() or not feature.get("geometry"):
+                print(f"{filepath} 中存在缺少 9 位街道代码或几何形状的要素，跳过！")
+                continue
+            feature["properties"] = {
+                **properties,
+                "adcode": int(code),
+                "level": "street",
+                "parent": {"adcode": int(code[:6])}
+            }
+            features.append(feature)
+    return features
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建全国行政区边界库")
+    parser.add_argument("--street-boundaries", nargs="*", default=[], help="本地街道（乡镇）边界 GeoJSON 文件")
+    args = parser.parse_args()
+
+    with open(os.path.join(ASSETS_MAP_PATH, "pca-code.json"), mode="r", encoding="utf-8") as f:
+        pca_code_data = json.load(f)
+    expected_adcodes = pca_code_adcodes(pca_code_data)
+
+    # 全国
+    country_geojson = get_geojson_batch_from_aliyun([(100000, False)])[(100000, False)]
+    features = list((country_geojson or {}).get("features", []))
+
+    # 省 → 市 → 区/县：逐级请求 _full 边界，只对还有下一级的区域继续请求
+    parent_adcodes = [100000]
+    while parent_adcodes:
+        children = collect_children(parent_adcodes)
+        features.extend(children)
+        parent_adcodes = [
+            feature["properties"]["adcode"] for feature in children
+            if isinstance(feature["properties"].get("adcode"), int)
+            and feature["properties"].get("level") in ("province", "city")
+            and feature["properties"].get("childrenNum", 0) > 0
+        ]
+        print(f"已获取 {len(features)} 个区域边界")
+
+    # pca-code.json 中存在、但父级 _full 边界中没有的区域，单独请求
+    found_adcodes = {feature["properties"].get("adcode") for feature in features}
+    missing_adcodes = sorted(expected_adcodes - found_adcodes)
+    if missing_adcodes:
+        print(f"单独请求 {len(missing_adcodes)} 个区域边界...")
+        for (adcode, _), geojson_data_dict in get_geojson_batch_from_aliyun(
+                [(adcode, False) for adcode in missing_adcodes]).items():
+            if geojson_data_dict and geojson_data_dict.get("features"):
+                features.extend(geojson_data_dict["features"])
+            else:
+                print(f"{adcode} 没有获取到边界数据，跳过！")
+
+    if args.street_boundaries:
+        street_features = load_street_features(args.street_boundaries)
+        print(f"导入 {len(street_features)} 个本地街道（乡镇）边界")
+        features.extend(street_features)
+
+    count = write_boundary_db(BOUNDARY_DB_PATH, features)
+    print(f"共 {count} 个区域边界，已保存到：{BOUNDARY_DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+从本地 OSM 提取文件（.osm.pbf，例如 Geofabrik 的省级提取）离线构建各区/县的 drive / bike / walk 路网，
+写入与页面相同的本地缓存（DATA_NETWORK_PATH/{adcode}/{network_type}_edges.parquet 与 _nodes.parquet）。
+结果与 osmnx.graph_from_polygon 下载构建的路网一致。内存中只保留落在各区/县（含 500 米缓冲区）外包矩形内的节点，
+节点总数不超过 NETWORK_PBF_MAX_NODES 时一个省的所有区/县只需读取一遍 PBF 文件，否则按空间顺序分批、每批读取一遍。
+
+PBF 文件要求：按 OSM 惯例排序（先节点、后 way），数据块为未压缩或 zlib 压缩（Geofabrik 提取均满足）。
+
+用法（在项目根目录下运行）：
+    python -m scripts.build_network_from_pbf guangdong-latest.osm.pbf --province 440000
+    python -m scripts.build_network_from_pbf guangdong-latest.osm.pbf --adcodes 440106 440104 --network-types drive
+"""
+import argparse
+import time
+
+import geopandas as gpd
+
+from utils import load_admin_table, admin_index_from_table, load_boundary_geojson_batch, iter_graphs_from_pbf, \
+    network_cache_filepaths, write_network_graph
+
+
+def collect_district_adcodes(admin_index, adcode):
+    """
+    行政区划下的所有区/县 adcode（本身为区/县，或没有下级区/县的城市时返回自身）
+    """
+    division = admin_index.find_by_adcode(adcode)
+    if division is None:
+        raise ValueError(f"未找到 adcode 为 {adcode} 的行政区划")
+    # 按 code 向下遍历（直辖市的省级与市级共用 adcode）
+    adcodes, stack = [], [division]
+    while stack:
+        division = stack.pop()
+        if division.level == "district" or not division.children:
+            adcodes.append(division.adcode)
+        else:
+            stack.extend(reversed(admin_index.children(division.code)))
+    return adcodes
+
+
+def load_district_polygons(adcodes):
+    """
+    各区/县的边界多边形（多个多边形合并为一个）；没有获取到有效边界的区/县跳过
+    :return: dict：adcode -> shapely 多边形
+    """
+    geojsons = load_boundary_geojson_batch([(adcode, False) for adcode in adcodes])
+    polygons = {}
+    for adcode in adcodes:
+        geojson_data_dict = geojsons.get((adcode, False))
+        if not geojson_data_dict or not geojson_data_dict.get("features"):
+            print(f"{adcode} 没有获取到边界数据，跳过处理！")
+            continue
+        polygon = gpd.GeoDataFrame.from_features(geojson_data_dict["features"], crs="EPSG:4326").geometry.union_all()
+        if not polygon.is_valid:
+            print(f"{adcode} 边界无效，跳过处理！")
+            continue
+        polygons[adcode] = polygon
+    return polygons
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从本地 .osm.pbf 文件构建区/县路网缓存")
+    parser.add_argument("pbf_path", help=".osm.pbf 文件路径")
+    parser.add_argument("--adcodes", nargs="+", type=int, default=[], help="区/县 adcode")
+    parser.add_argument("--province", type=int, nargs="+", default=[],
+                        help="省 / 市 adcode，处理其下属的所有区/县")
+    parser.add_argument("--network-types", nargs="+", default=["drive", "bike", "walk"], help="路网类型")
+    args = parser.parse_args()
+
+    adcodes = list(args.adcodes)
+    if args.province:
+        admin_index = admin_index_from_table(load_admin_table())
+        for adcode in args.province:
+            adcodes.extend(collect_district_adcodes(admin_index, adcode))
+    adcodes = list(dict.fromkeys(adcodes))
+    if not adcodes:
+        parser.error("请通过 --adcodes 或 --province 指定需要处理的区域")
+
+    polygons = load_district_polygons(adcodes)
+    print(f"共 {len(polygons)} 个区/县，开始读取 {args.pbf_path} ...")
+    start = time.perf_counter()
+    for adcode, graphs in iter_graphs_from_pbf(args.pbf_path, polygons, args.network_types):
+        for network_type, G in graphs.items():
+            edges_file_path, nodes_file_path = network_cache_filepaths(adcode, network_type)
+            write_network_graph(G, edges_file_path, nodes_file_path)
+        print(f"{adcode}：{'、'.join(f'{t} {len(G.edges)} 条边' for t, G in graphs.items())}"
+              f"（累计 {time.perf_counter() - start:.1f}s）")
+    print(f"完成，共用时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
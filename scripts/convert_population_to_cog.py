@@ -0,0 +1,62 @@
+"""
+将 WorldPop 人口 GeoTIFF 一次性转换为 Cloud-Optimized GeoTIFF（COG）：内部分块、压缩，并内置金字塔（overviews）。
+转换后的文件保存在 DATA_CITY_PATH 下，人口模块会优先读取 COG 文件，裁剪耗时只与目标区域大小相关。
+
+用法（在项目根目录下运行）：
+    python -m scripts.convert_population_to_cog
+    python -m scripts.convert_population_to_cog --years 2020 2024 --overwrite
+"""
+import argparse
+import os
+
+import rasterio
+import rasterio.shutil
+
+from config.settings import DATA_CITY_PATH, POPULATION_YEARS, POPULATION_TIF_TEMPLATE, POPULATION_COG_TEMPLATE
+
+# COG 驱动参数
+COG_OPTIONS = {
+    "BLOCKSIZE": 512,  # 内部分块大小（像素）
+    "COMPRESS": "DEFLATE",
+    "PREDICTOR": "YES",  # 浮点数据自动使用浮点预测器，提升压缩率
+    "OVERVIEWS": "AUTO",  # 自动生成内置金字塔
+    "RESAMPLING": "AVERAGE",  # 金字塔重采样方式
+    "BIGTIFF": "IF_SAFER",
+    "NUM_THREADS": "ALL_CPUS"
+}
+
+
+def convert_to_cog(src_filepath, dst_filepath):
+    """
+    将单个 GeoTIFF 转换为 COG。先写入临时文件，完成后再原子替换，避免中断时留下损坏的文件。
+    :param src_filepath: 原始 GeoTIFF 路径
+    :param dst_filepath: 输出 COG 路径
+    """
+    tmp_filepath = f"{dst_filepath}.tmp"
+    with rasterio.open(src_filepath) as src:
+        rasterio.shutil.copy(src, tmp_filepath, driver="COG", **COG_OPTIONS)
+    os.replace(tmp_filepath, dst_filepath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="将 WorldPop 人口 GeoTIFF 转换为 Cloud-Optimized GeoTIFF")
+    parser.add_argument("--years", type=int, nargs="+", default=POPULATION_YEARS, help="需要转换的年份")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的 COG 文件")
+    args = parser.parse_args()
+
+    for year in args.years:
+        src_filepath = os.path.join(DATA_CITY_PATH, POPULATION_TIF_TEMPLATE.format(year=year))
+        dst_filepath = os.path.join(DATA_CITY_PATH, POPULATION_COG_TEMPLATE.format(year=year))
+        if not os.path.exists(src_filepath):
+            print(f"未找到 {year} 年的人口数据文件，跳过：{src_filepath}")
+            continue
+        if os.path.exists(dst_filepath) and not args.overwrite:
+            print(f"{year} 年的 COG 文件已存在，跳过：{dst_filepath}")
+            continue
+        print(f"正在转换 {year} 年人口数据：{src_filepath} -> {dst_filepath}")
+        convert_to_cog(src_filepath, dst_filepath)
+    print("转换完成！")
+
+
+if __name__ == "__main__":
+    main()
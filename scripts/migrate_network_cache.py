@@ -0,0 +1,39 @@
+"""
+将 DATA_NETWORK_PATH 下旧版本的路网缓存（所有属性列都是字符串）升级为带类型的列：数值列、列表列、
+highway / name 分类列，u / v / key 索引为 int64。页面读取缓存时也会自动升级，本脚本用于一次性批量处理。
+其他坐标系的转换副本（例如 drive_edges.gcj02.parquet）不需要处理，原文件更新后会自动重新生成。
+
+用法（在项目根目录下运行）：
+    python -m scripts.migrate_network_cache
+"""
+import os
+import re
+import time
+
+from config.settings import DATA_NETWORK_PATH
+from utils import migrate_network_cache
+
+NETWORK_CACHE_PATTERN = re.compile(r"^\w+_(edges|nodes)\.parquet$")
+
+
+def main():
+    migrated, skipped = 0, 0
+    for root, _, filenames in os.walk(DATA_NETWORK_PATH):
+        for filename in sorted(filenames):
+            if not NETWORK_CACHE_PATTERN.match(filename):
+                continue
+            filepath = os.path.join(root, filename)
+            start = time.perf_counter()
+            try:
+                if migrate_network_cache(filepath):
+                    migrated += 1
+                    print(f"已升级：{filepath}（{time.perf_counter() - start:.1f}s）")
+                else:
+                    skipped += 1
+            except Exception as e:
+                print(f"{filepath} 升级失败，跳过！原因: {e}")
+    print(f"共升级 {migrated} 个路网缓存文件，{skipped} 个已是最新版本")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+离线批量预计算所有省、市、区/县在各年份的人口统计信息（总人口、面积、人口密度、最高/最低网格人口），
+结果写入 POPULATION_STATS_PATH 下的一张列式 Parquet 表。人口模块在该表存在时直接查表，无需再读取栅格。
+
+计算方式：以“城市及其下属区/县”为一个统计单元，在进程池中并行处理；每个单元只读取一次各年份栅格，
+使用分区统计同时得到城市与各区/县的结果；省级与全国（100000）按各自的边界分块并行处理。
+统计口径与页面实时计算一致：每个区域按自身边界裁剪（all_touched），相邻区域共享的边界像素分别计入各个区域；
+面积优先使用边界库中预计算的面积。
+
+用法（在项目根目录下运行）：
+    python -m scripts.precompute_population_stats
+    python -m scripts.precompute_population_stats --years 2020 2024 --workers 8
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from pyproj import Geod
+
+from config.settings import ASSETS_MAP_PATH, MUNICIPALITY_NAMES, POPULATION_STATS_PATH, POPULATION_YEARS, \
+    POPULATION_CHUNK_SIZE
+from utils import load_boundary_geojson, load_boundary_geojson_batch, zonal_statistics, \
+    find_population_tif_filepath, chunked_population_aggregate, create_population_process_pool, \
+    get_boundary_meta_batch
+
+
+def load_population_units(pca_code_data):
+    """
+    将 pca-code 多级行政区数据整理为统计单元列表。
+    - 普通城市：一个单元包含城市及其下属区/县
+    - 直辖市、省直辖县级行政区划：区/县直接隶属于省级行政区，不单独统计城市层级
+    - 下属为乡镇/街道的城市（例如东莞市）：城市本身即为统计区域
+    :param pca_code_data: 多级行政区数据
+    :return: list of dict
+    """
+    units = []
+    for province in pca_code_data:
+        province_adcode = int(province["code"].ljust(6, "0"))
+        for city in province.get("children", []):
+            has_city_level = province["name"] not in MUNICIPALITY_NAMES and "直辖县级行政区划" not in city["name"]
+            districts = [(int(d["code"]), d["name"]) for d in city.get("children", []) if len(d["code"]) == 6]
+            units.append({
+                "province_adcode": province_adcode,
+                "province_name": province["name"],
+                "city_adcode": int(city["code"].ljust(6, "0")) if has_city_level else None,
+                "city_name": city["name"],
+                "districts": districts
+            })
+    return units
+
+
+def compute_unit_statistics(unit, years):
+    """
+    计算一个统计单元内所有区域在各年份的人口统计（在子进程中运行）。
+    :param unit: load_population_units 返回的统计单元
+    :param years: 年份列表
+    :return: list of dict，每个区域每个年份一行；城市按自身边界统计（与下属区/县在同一次分区统计中完成）
+    """
+    parent_adcode = unit["city_adcode"] or unit["province_adcode"]
+    zones = [(adcode, name, "district", parent_adcode) for adcode, name in unit["districts"]]
+    if unit["city_adcode"] is not None:
+        zones.append((unit["city_adcode"], unit["city_name"], "city", unit["province_adcode"]))
+    if not zones:
+        return []
+
+    # 父级区域的子区域边界只需一次请求；缺失的区域再并发请求
+    parent_geojson = load_boundary_geojson(parent_adcode, is_sub=True) if unit["districts"] else None
+    features_by_adcode = {
+        feature["properties"].get("adcode"): feature for feature in (parent_geojson or {}).get("features", [])
+    }
+    missing_geojsons = load_boundary_geojson_batch(
+        [(adcode, False) for adcode, *_ in zones if adcode not in features_by_adcode]
+    )
+    zone_rows, zone_features = [], []
+    for adcode, name, level, zone_parent_adcode in zones:
+        feature = features_by_adcode.get(adcode)
+        if feature is None:
+            geojson_data_dict = missing_geojsons.get((adcode, False))
+            if not geojson_data_dict or not geojson_data_dict.get("features"):
+                print(f"{name}({adcode}) 没有获取到边界数据，跳过处理！")
+                continue
+            feature = geojson_data_dict["features"][0]
+        zone_rows.append({"adcode": adcode, "name": name, "level": level, "parent_adcode": zone_parent_adcode})
+        zone_features.append(feature)
+    if not zone_features:
+        return []
+
+    gdf = gpd.GeoDataFrame.from_features(zone_features, crs="EPSG:4326")
+    # 面积：与页面一致，优先使用边界库中预计算的面积，其余区域投影到 UTM 计算
+    boundary_metas = get_boundary_meta_batch([zone_row["adcode"] for zone_row in zone_rows])
+    utm_area_km2 = gdf.to_crs(gdf.estimate_utm_crs()).area.to_numpy() / 1_000_000
+    area_km2 = [
+        boundary_metas[zone_row["adcode"]]["area_km2"] if zone_row["adcode"] in boundary_metas else utm_area_km2[i]
+        for i, zone_row in enumerate(zone_rows)
+    ]
+
+    rows = []
+    for year in years:
+        tif_filepath = find_population_tif_filepath(year)
+        if tif_filepath is None:
+            continue
+        stats = zonal_statistics(tif_filepath, gdf.geometry)
+        for i, zone_row in enumerate(zone_rows):
+            rows.append({
+                **zone_row,
+                "year": year,
+                "total_population": stats["sum"].iat[i],
+                "area_km2": area_km2[i],
+                "max_population_density": stats["max"].iat[i],
+                "min_population_density": stats["min"].iat[i]
+            })
+    return rows
+
+
+def compute_region_statistics(adcode, name, parent_adcode, years, executor):
+    """
+    计算省级 / 全国区域在各年份的人口统计：与页面实时计算（get_region_population_from_tif）相同，
+    按区域自身边界分块并行处理，边界像素只统计一次。
+    :param executor: 分块处理复用的进程池
+    :return: list of dict，每个年份一行；没有获取到边界数据时返回空列表
+    """
+    geojson_data_dict = load_boundary_geojson(adcode, is_sub=False)
+    if not geojson_data_dict or not geojson_data_dict.get("features"):
+        print(f"{name}({adcode}) 没有获取到边界数据，跳过处理！")
+        return []
+    gdf = gpd.GeoDataFrame.from_features(geojson_data_dict["features"], crs="EPSG:4326")
+    boundary_meta = get_boundary_meta_batch([adcode]).get(adcode)
+    if boundary_meta is not None:
+        area_km2 = boundary_meta["area_km2"]
+    else:
+        area_km2 = abs(Geod(ellps="WGS84").geometry_area_perimeter(gdf.geometry.union_all())[0]) / 1_000_000
+
+    rows = []
+    for year in years:
+        tif_filepath = find_population_tif_filepath(year)
+        if tif_filepath is None:
+            continue
+        merged = chunked_population_aggregate(tif_filepath, gdf.geometry, [], POPULATION_CHUNK_SIZE,
+                                              executor=executor)
+        if merged is None:
+            continue
+        rows.append({
+            "adcode": adcode,
+            "name": name,
+            "level": "province" if adcode != 100000 else "country",
+            "parent_adcode": parent_adcode,
+            "year": year,
+            "total_population": merged["sum"],
+            "area_km2": area_km2,
+            "max_population_density": merged["max"],
+            "min_population_density": merged["min"]
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线预计算各级行政区人口统计信息")
+    parser.add_argument("--years", type=int, nargs="+", default=POPULATION_YEARS, help="需要计算的年份")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程池大小")
+    args = parser.parse_args()
+
+    with open(os.path.join(ASSETS_MAP_PATH, "pca-code.json"), mode="r", encoding="utf-8") as f:
+        pca_code_data = json.load(f)
+    units = load_population_units(pca_code_data)
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(compute_unit_statistics, unit, args.years): unit for unit in units}
+        for i, future in enumerate(as_completed(futures)):
+            unit = futures[future]
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                print(f"{unit['province_name']} {unit['city_name']} 统计失败: {e}")
+            print(f"[{i + 1}/{len(units)}] 已完成：{unit['province_name']} {unit['city_name']}")
+
+    if not rows:
+        print("没有得到任何统计结果，请检查人口数据文件与网络连接！")
+        return
+
+    # 省级与全国：按各自边界分块并行处理，所有区域共用一个进程池
+    regions = {unit["province_adcode"]: unit["province_name"] for unit in units}
+    with create_population_process_pool(args.workers) as executor:
+        for i, (adcode, name) in enumerate([*regions.items(), (100000, "全国")]):
+            try:
+                rows.extend(compute_region_statistics(adcode, name, 100000 if adcode != 100000 else 0, args.years,
+                                                      executor))
+            except Exception as e:
+                print(f"{name} 统计失败: {e}")
+            print(f"[{i + 1}/{len(regions) + 1}] 已完成：{name}")
+
+    df = pd.DataFrame(rows)
+    df["population_density"] = np.where(df["area_km2"] > 0, df["total_population"] / df["area_km2"], 0.0)
+    df = df.astype({
+        "adcode": "int64",
+        "parent_adcode": "int64",
+        "year": "int16",
+        "level": "category",
+        "total_population": "float64",
+        "area_km2": "float64",
+        "population_density": "float64",
+        "max_population_density": "float64",
+        "min_population_density": "float64"
+    })
+    df = df.sort_values(["adcode", "year"], ignore_index=True)
+
+    # 先写入临时文件，再原子替换
+    os.makedirs(os.path.dirname(POPULATION_STATS_PATH), exist_ok=True)
+    tmp_filepath = f"{POPULATION_STATS_PATH}.tmp"
+    df.to_parquet(tmp_filepath, index=False)
+    os.replace(tmp_filepath, POPULATION_STATS_PATH)
+    print(f"共 {df['adcode'].nunique()} 个区域、{len(df)} 条统计结果，已保存到：{POPULATION_STATS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ import warnings
 from streamlit_lottie import st_lottie
 
 from core.common import custom_sidebar_pages_order
+from core.basic import warm_up_population_rasters
 from utils import load_lottie_file
 from config.settings import ASSETS_ANIMATION_PATH
 
@@ -29,6 +30,9 @@ st.Page(page="pages/transport_network.py")
 # 3. 渲染侧边栏
 custom_sidebar_pages_order()
 
+# 预热人口栅格句柄池（后台线程执行，每个进程只执行一次）
+warm_up_population_rasters()
+
 # 4. 渲染主页面
 st.title("欢迎来到 地理可视化 App")
 
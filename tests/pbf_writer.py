@@ -0,0 +1,126 @@
+"""
+测试用的最小 .osm.pbf 写入工具：按 OSM PBF 格式（protobuf 编码）写入节点与 way，不依赖 osmium 等外部库
+"""
+import struct
+import zlib
+
+
+def varint(value):
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while True:
+        byte, value = value & 0x7f, value >> 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def field_bytes(field, data):
+    return varint((field << 3) | 2) + varint(len(data)) + data
+
+
+def field_varint(field, value):
+    return varint(field << 3) + varint(value)
+
+
+def packed(values):
+    return b"".join(varint(value) for value in values)
+
+
+def packed_delta(values):
+    previous, deltas = 0, []
+    for value in values:
+        deltas.append(zigzag(value - previous))
+        previous = value
+    return packed(deltas)
+
+
+class StringTable:
+    """
+    数据块的字符串表，索引 0 保留为空字符串
+    """
+
+    def __init__(self):
+        self.strings = [""]
+        self.index = {}
+
+    def __call__(self, string):
+        if string not in self.index:
+            self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return self.index[string]
+
+    def encode(self):
+        return field_bytes(1, b"".join(field_bytes(1, string.encode("utf-8")) for string in self.strings))
+
+
+def write_blob(f, blob_type, data, compress=True):
+    blob = field_varint(2, len(data)) + (field_bytes(3, zlib.compress(data)) if compress else field_bytes(1, data))
+    header = field_bytes(1, blob_type.encode("utf-8")) + field_varint(3, len(blob))
+    f.write(struct.pack(">I", len(header)))
+    f.write(header)
+    f.write(blob)
+
+
+def encode_dense_nodes(nodes, strings):
+    keys_vals = []
+    for node in nodes:
+        for key, value in node.get("tags", {}).items():
+            keys_vals += [strings(key), strings(value)]
+        keys_vals.append(0)
+    dense = field_bytes(1, packed_delta([node["id"] for node in nodes]))
+    dense += field_bytes(8, packed_delta([round(node["lat"] * 1e7) for node in nodes]))
+    dense += field_bytes(9, packed_delta([round(node["lon"] * 1e7) for node in nodes]))
+    dense += field_bytes(10, packed(keys_vals))
+    return field_bytes(2, dense)
+
+
+def encode_plain_nodes(nodes, strings):
+    group = b""
+    for node in nodes:
+        tags = node.get("tags", {})
+        message = field_varint(1, zigzag(node["id"]))
+        message += field_bytes(2, packed(strings(key) for key in tags))
+        message += field_bytes(3, packed(strings(value) for value in tags.values()))
+        message += field_varint(8, zigzag(round(node["lat"] * 1e7)))
+        message += field_varint(9, zigzag(round(node["lon"] * 1e7)))
+        group += field_bytes(1, message)
+    return group
+
+
+def encode_ways(ways, strings):
+    group = b""
+    for way in ways:
+        message = field_varint(1, way["id"])
+        message += field_bytes(2, packed(strings(key) for key in way["tags"]))
+        message += field_bytes(3, packed(strings(value) for value in way["tags"].values()))
+        message += field_bytes(8, packed_delta(way["nodes"]))
+        group += field_bytes(3, message)
+    return group
+
+
+def write_pbf(filepath, nodes, ways, per_block=500, dense=True):
+    """
+    写入 .osm.pbf 文件：先节点、后 way，每个数据块最多 per_block 个元素（默认粒度 100 纳度）；
+    way 数据块交替使用 zlib 压缩与未压缩格式
+    :param nodes: Overpass 格式的节点字典列表（id、lat、lon、可选 tags），需按 id 排序
+    :param ways: Overpass 格式的 way 字典列表（id、nodes、tags）
+    :param dense: 节点是否使用 DenseNodes 格式
+    """
+    with open(filepath, "wb") as f:
+        write_blob(f, "OSMHeader", field_bytes(4, b"OsmSchema-V0.6") + field_bytes(4, b"DenseNodes"))
+        for start in range(0, len(nodes), per_block):
+            strings = StringTable()
+            encode = encode_dense_nodes if dense else encode_plain_nodes
+            group = encode(nodes[start:start + per_block], strings)
+            write_blob(f, "OSMData", strings.encode() + field_bytes(2, group))
+        for start in range(0, len(ways), per_block):
+            strings = StringTable()
+            group = encode_ways(ways[start:start + per_block], strings)
+            write_blob(f, "OSMData", strings.encode() + field_bytes(2, group), compress=start // per_block % 2 == 0)
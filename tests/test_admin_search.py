@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from utils.admin_search import AdminSearchIndex, pinyin_keys
+
+
+def make_entries(names, level="district"):
+    return [(f"{i:06d}", name, level, i, ()) for i, name in enumerate(names)]
+
+
+def test_prefix_range_deduplicates_before_limit():
+    # 每个条目有首字母与全拼两个检索键，二者都以 "b" 开头
+    pairs = sorted((key, entry_id) for entry_id, keys in enumerate([("bjs", "beijingshi"), ("bds", "baodingshi"),
+                                                                      ("bts", "baotoushi"), ("bxs", "benxishi")])
+                   for key in keys)
+    keys = [key for key, _ in pairs]
+    ids = np.array([entry_id for _, entry_id in pairs], dtype=np.int32)
+    assert AdminSearchIndex._prefix_range(keys, ids, "b", 3) == [0, 1, 2]
+    assert AdminSearchIndex._prefix_range(keys, ids, "b", 10) == [0, 1, 2, 3]
+    assert AdminSearchIndex._prefix_range(keys, ids, "bao", 10) == [1, 2]
+    assert AdminSearchIndex._prefix_range(keys, ids, "c", 10) == []
+
+
+@pytest.mark.skipif(not pinyin_keys("北京"), reason="未安装 pypinyin")
+def test_pinyin_search_returns_limit_distinct_entries():
+    names = ["北京市", "保定市", "包头市", "本溪市", "蚌埠市", "宝鸡市"]
+    index = AdminSearchIndex(make_entries(names))
+    results = index.search("b", limit=4)
+    assert len({result["code"] for result in results}) == len(results) == 4
+    assert len(index.search("b", limit=10)) == len(names)
+
+
+def test_chinese_search_orders_exact_prefix_contains():
+    index = AdminSearchIndex(make_entries(["济南市", "南京市", "南昌市", "南"]))
+    assert [result["name"] for result in index.search("南", limit=10)] == ["南", "南京市", "南昌市", "济南市"]
+    assert [result["name"] for result in index.search("南", limit=2)] == ["南", "南京市"]
+    assert [result["name"] for result in index.search("济南", limit=10)] == ["济南市"]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from utils import LngLatTransfer
+
+transfer = LngLatTransfer()
+
+# 覆盖国内典型范围的经纬度（包括经度小于 105 度、sqrt(|lng - 105|) 分支两侧的点）
+rng = np.random.default_rng(0)
+LNG = np.concatenate([rng.uniform(73.0, 135.0, 500), [105.0, 116.397128, 121.473701, 87.617733]])
+LAT = np.concatenate([rng.uniform(18.0, 53.0, 500), [35.0, 39.916527, 31.230416, 43.792818]])
+
+PAIRS = [
+    ("GCJ02_to_BD09", "GCJ02_to_BD09_batch"),
+    ("BD09_to_GCJ02", "BD09_to_GCJ02_batch"),
+    ("WGS84_to_GCJ02", "WGS84_to_GCJ02_batch"),
+    ("GCJ02_to_WGS84", "GCJ02_to_WGS84_batch"),
+    ("BD09_to_WGS84", "BD09_to_WGS84_batch"),
+    ("WGS84_to_BD09", "WGS84_to_BD09_batch"),
+    ("WGS84_to_WebMercator", "WGS84_to_WebMercator_batch"),
+]
+
+
+def scalar_results(method_name, lng, lat):
+    method = getattr(transfer, method_name)
+    return np.array([method(float(x), float(y)) for x, y in zip(lng, lat)]).T
+
+
+# 与逐点计算一致：批量版本改变了部分运算顺序，只允许浮点舍入级别的差异（经纬度约 1e-10 度，墨卡托坐标约 1e-5 米）
+@pytest.mark.parametrize("scalar_name, batch_name", PAIRS)
+def test_batch_matches_scalar(scalar_name, batch_name):
+    expected_lng, expected_lat = scalar_results(scalar_name, LNG, LAT)
+    lng, lat = getattr(transfer, batch_name)(LNG, LAT)
+    np.testing.assert_allclose(lng, expected_lng, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(lat, expected_lat, rtol=1e-12, atol=1e-9)
+
+
+def test_web_mercator_to_wgs84_batch_matches_scalar():
+    x, y = transfer.WGS84_to_WebMercator_batch(LNG, LAT)
+    expected_lng, expected_lat = scalar_results("WebMercator_to_WGS84", x, y)
+    lng, lat = transfer.WebMercator_to_WGS84_batch(x, y)
+    np.testing.assert_allclose(lng, expected_lng, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(lat, expected_lat, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("scalar_name, batch_name", PAIRS)
+def test_batch_in_place_and_shape(scalar_name, batch_name):
+    expected_lng, expected_lat = getattr(transfer, batch_name)(LNG, LAT)
+    lng, lat = LNG.reshape(4, -1).copy(), LAT.reshape(4, -1).copy()
+    out_lng, out_lat = getattr(transfer, batch_name)(lng, lat, out=(lng, lat))
+    assert out_lng is lng and out_lat is lat
+    np.testing.assert_array_equal(out_lng.ravel(), expected_lng)
+    np.testing.assert_array_equal(out_lat.ravel(), expected_lat)
+
+
+def test_gcj02_to_wgs84_exact_batch_inverts_forward():
+    gcj_lng, gcj_lat = transfer.WGS84_to_GCJ02_batch(LNG, LAT)
+    lng, lat = transfer.GCJ02_to_WGS84_exact_batch(gcj_lng, gcj_lat)
+    np.testing.assert_allclose(lng, LNG, rtol=0, atol=1e-8)
+    np.testing.assert_allclose(lat, LAT, rtol=0, atol=1e-8)
+
+
+def test_output_shape_mismatch_raises():
+    with pytest.raises(ValueError):
+        transfer.WGS84_to_GCJ02_batch(LNG, LAT, out=(np.empty(3), np.empty(3)))
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+import pytest
+from shapely.geometry import LineString, Point
+
+from utils.network_cache_utils import migrate_network_cache, network_cache_version, read_network_cache, \
+    NETWORK_SCHEMA_VERSION
+
+
+def write_legacy_cache(gdf, filepath):
+    """
+    按旧版本的方式写入缓存：除 geometry 外的所有列都以 astype(str) 保存
+    """
+    gdf = gdf.copy()
+    for col in gdf.columns:
+        if col != "geometry":
+            gdf[col] = gdf[col].astype(str)
+    gdf.to_parquet(filepath)
+
+
+@pytest.fixture
+def legacy_edges_filepath(tmp_path):
+    index = pd.MultiIndex.from_tuples([(1, 2, 0), (2, 3, 0), (3, 1, 1)], names=["u", "v", "key"])
+    gdf = gpd.GeoDataFrame({
+        "osmid": [[101, 102], 103, 104],
+        "highway": [["primary", "secondary"], "residential", "residential"],
+        "name": ["中山路", np.nan, "解放路"],
+        "oneway": [True, False, True],
+        "reversed": [[False, True], False, True],
+        "lanes": [["2", "3"], "2", np.nan],
+        "length": [120.5, 33.25, 8.0],
+        "geometry": [LineString([(0, 0), (1, 1)]), LineString([(1, 1), (2, 2)]), LineString([(2, 2), (0, 0)])],
+    }, index=index, crs="EPSG:4326")
+    filepath = tmp_path / "drive_edges.parquet"
+    write_legacy_cache(gdf, filepath)
+    return str(filepath)
+
+
+@pytest.fixture
+def legacy_nodes_filepath(tmp_path):
+    gdf = gpd.GeoDataFrame({
+        "y": [39.9, 39.91, 39.92],
+        "x": [116.4, 116.41, 116.42],
+        "street_count": [3, 1, np.nan],
+        "highway": [np.nan, "traffic_signals", np.nan],
+        "geometry": [Point(116.4, 39.9), Point(116.41, 39.91), Point(116.42, 39.92)],
+    }, index=pd.Index([1, 2, 3], name="osmid"), crs="EPSG:4326")
+    filepath = tmp_path / "drive_nodes.parquet"
+    write_legacy_cache(gdf, filepath)
+    return str(filepath)
+
+
+def is_list_dtype(dtype):
+    return isinstance(dtype, pd.ArrowDtype) and pa.types.is_list(dtype.pyarrow_dtype)
+
+
+def test_migrate_legacy_edges(legacy_edges_filepath):
+    assert network_cache_version(legacy_edges_filepath) == 1
+    assert migrate_network_cache(legacy_edges_filepath) is True
+    assert network_cache_version(legacy_edges_filepath) == NETWORK_SCHEMA_VERSION == 2
+    assert migrate_network_cache(legacy_edges_filepath) is False
+
+    gdf = read_network_cache(legacy_edges_filepath)
+    assert list(gdf.index.names) == ["u", "v", "key"]
+    assert all(level.dtype == np.int64 for level in gdf.index.levels)
+    assert gdf.index.tolist() == [(1, 2, 0), (2, 3, 0), (3, 1, 1)]
+
+    assert is_list_dtype(gdf["osmid"].dtype) and pa.types.is_int64(gdf["osmid"].dtype.pyarrow_dtype.value_type)
+    assert gdf["osmid"].tolist() == [[101, 102], [103], [104]]
+    assert is_list_dtype(gdf["reversed"].dtype)
+    assert gdf["reversed"].tolist() == [[False, True], [False], [True]]
+    assert is_list_dtype(gdf["lanes"].dtype)
+    assert gdf["lanes"].tolist()[:2] == [["2", "3"], ["2"]] and pd.isna(gdf["lanes"].iloc[2])
+
+    assert isinstance(gdf["highway"].dtype, pd.CategoricalDtype)
+    assert gdf["highway"].tolist() == ["primary;secondary", "residential", "residential"]
+    assert isinstance(gdf["name"].dtype, pd.CategoricalDtype)
+    assert gdf["name"].tolist()[0] == "中山路" and pd.isna(gdf["name"].iloc[1])
+
+    assert gdf["oneway"].dtype == "boolean"
+    assert gdf["oneway"].tolist() == [True, False, True]
+    assert gdf["length"].dtype == np.float64
+    assert gdf["length"].tolist() == [120.5, 33.25, 8.0]
+    assert gdf.geometry.iloc[0].equals(LineString([(0, 0), (1, 1)]))
+
+
+def test_migrate_legacy_nodes(legacy_nodes_filepath):
+    assert migrate_network_cache(legacy_nodes_filepath) is True
+    assert migrate_network_cache(legacy_nodes_filepath) is False
+
+    gdf = read_network_cache(legacy_nodes_filepath)
+    assert gdf.index.name == "osmid" and gdf.index.dtype == np.int64
+    assert gdf["street_count"].dtype == "Int64"
+    assert gdf["street_count"].tolist()[:2] == [3, 1] and pd.isna(gdf["street_count"].iloc[2])
+    assert gdf["x"].dtype == np.float64 and gdf["x"].tolist() == [116.4, 116.41, 116.42]
+    assert gdf["y"].tolist() == [39.9, 39.91, 39.92]
+    assert pd.isna(gdf["highway"].iloc[0]) and gdf["highway"].iloc[1] == "traffic_signals"
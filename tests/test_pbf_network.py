@@ -0,0 +1,147 @@
+import copy
+
+import numpy as np
+import osmnx as ox
+import pytest
+import shapely
+from osmnx import _overpass
+
+from pbf_writer import write_pbf
+from utils.osm_utils import filter_overpass_responses, iter_graphs_from_pbf, count_pbf_nodes, batch_by_node_count
+from utils.pbf_utils import iter_pbf_elements
+
+NETWORK_TYPES = ["drive", "bike", "walk"]
+HIGHWAYS = ["residential", "footway", "cycleway", "service", "primary", "motorway", "steps", "track", "path",
+            "construction"]
+
+
+def random_tags(rng, way_id):
+    tags = {"highway": str(rng.choice(HIGHWAYS))}
+    r = rng.random(8)
+    if r[0] < .2:
+        tags["oneway"] = "yes"
+    if r[1] < .05:
+        tags["oneway"] = "-1"
+    if r[2] < .05:
+        tags["foot"] = "no"
+    if r[3] < .05:
+        tags["access"] = "private"
+    if tags["highway"] == "service" and r[4] < .5:
+        tags["service"] = str(rng.choice(["parking_aisle", "driveway", "alley"]))
+    if r[5] < .05:
+        tags["bicycle"] = "no"
+    if r[6] < .3:
+        tags["name"] = f"路{way_id}"
+    if r[7] < .05:
+        tags["junction"] = "roundabout"
+    return tags
+
+
+@pytest.fixture(scope="module")
+def osm_data():
+    """
+    40*40 的规则路网（间距约 100 米），道路类型与通行标签随机；另有远离区域的节点与 way，
+    以及一端在区域内、一端远在区域外的长 way
+    """
+    rng = np.random.default_rng(1)
+    n = 40
+    nodes = [
+        {"type": "node", "id": i * n + j + 1, "lat": round(39.9 + i * 0.001, 7), "lon": round(116.4 + j * 0.001, 7)}
+        for i in range(n) for j in range(n)
+    ]
+    for node in nodes[::37]:
+        node["tags"] = {"highway": "traffic_signals", "foo": "bar"}
+    ways, way_id = [], 1000
+    for i in range(n):
+        for k in range(0, n - 1, 5):
+            row = [i * n + j + 1 for j in range(k, min(k + 6, n))]
+            column = [j * n + i + 1 for j in range(k, min(k + 6, n))]
+            for refs in (row, column):
+                ways.append({"type": "way", "id": way_id, "nodes": refs, "tags": random_tags(rng, way_id)})
+                way_id += 1
+    far = [{"type": "node", "id": 10 ** 6 + k, "lat": 30.0 + k * 1e-3, "lon": 110.0} for k in range(5)]
+    ways.append({"type": "way", "id": 99998, "nodes": [5, 10 ** 6 + 3], "tags": {"highway": "residential"}})
+    ways.append({"type": "way", "id": 99999, "nodes": [10 ** 6, 10 ** 6 + 1, 10 ** 6 + 2],
+                 "tags": {"highway": "primary"}})
+    return sorted(nodes + far, key=lambda node: node["id"]), sorted(ways, key=lambda way: way["id"])
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["dense", "plain"])
+def pbf_filepath(request, osm_data, tmp_path_factory):
+    nodes, ways = osm_data
+    filepath = tmp_path_factory.mktemp("pbf") / "test.osm.pbf"
+    write_pbf(str(filepath), nodes, ways, per_block=300, dense=request.param)
+    return str(filepath)
+
+
+def test_iter_pbf_elements_reads_nodes_and_ways(osm_data, pbf_filepath):
+    nodes, ways = osm_data
+    ids, lons, lats, node_tags = [], [], [], {}
+    parsed_ways = []
+    for kind, data in iter_pbf_elements(pbf_filepath, node_tag_keys={"highway"}):
+        if kind == "nodes":
+            ids.append(data[0])
+            lons.append(data[1])
+            lats.append(data[2])
+            node_tags.update(data[3])
+        else:
+            parsed_ways.extend(data)
+
+    np.testing.assert_array_equal(np.concatenate(ids), [node["id"] for node in nodes])
+    np.testing.assert_allclose(np.concatenate(lons), [node["lon"] for node in nodes], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(np.concatenate(lats), [node["lat"] for node in nodes], rtol=0, atol=1e-9)
+    assert node_tags == {node["id"]: {"highway": "traffic_signals"} for node in nodes if "tags" in node}
+    assert [(way_id, refs.tolist(), tags) for way_id, refs, tags in parsed_ways] == \
+           [(way["id"], way["nodes"], way["tags"]) for way in ways]
+
+
+def graph_attributes(G):
+    # 边的 geometry 由节点坐标生成，比较节点坐标即可
+    edges = {(u, v, k): {key: value for key, value in data.items() if key != "geometry"}
+             for u, v, k, data in G.edges(keys=True, data=True)}
+    return dict(G.nodes(data=True)), edges
+
+
+@pytest.mark.parametrize("polygon", [
+    shapely.box(116.405, 39.905, 116.43, 39.93),
+    shapely.box(116.41, 39.91, 116.44, 39.94),
+], ids=["inner", "edge"])
+def test_pbf_graphs_match_osmnx(osm_data, pbf_filepath, polygon, monkeypatch):
+    nodes, ways = osm_data
+    response_jsons = [{"elements": nodes + ways}]
+    # osmnx 的下载函数替换为返回同一份数据（按路网类型筛选），其余建图步骤保持不变
+    monkeypatch.setattr(_overpass, "_download_overpass_network", lambda poly, network_type, custom_filter: iter(
+        copy.deepcopy(filter_overpass_responses(response_jsons, network_type))
+    ))
+    monkeypatch.setattr(ox.settings, "use_cache", False)
+
+    _, graphs = next(iter_graphs_from_pbf(pbf_filepath, {0: polygon}, NETWORK_TYPES))
+    for network_type in NETWORK_TYPES:
+        expected = ox.graph_from_polygon(polygon, network_type=network_type)
+        assert len(expected) > 0
+        assert graph_attributes(graphs[network_type]) == graph_attributes(expected), network_type
+
+
+def test_pbf_graphs_in_node_batches_match_single_pass(osm_data, pbf_filepath):
+    polygons = {
+        "west": shapely.box(116.405, 39.905, 116.415, 39.93),
+        "east": shapely.box(116.425, 39.905, 116.435, 39.93),
+        "north": shapely.box(116.41, 39.93, 116.43, 39.935),
+    }
+    single_pass = dict(iter_graphs_from_pbf(pbf_filepath, polygons, ["drive"], max_nodes=None))
+    # 上限小于任一区域的节点数量时，每个区域单独读取一遍
+    batched = dict(iter_graphs_from_pbf(pbf_filepath, polygons, ["drive"], max_nodes=1))
+    assert batched.keys() == polygons.keys()
+    for key in polygons:
+        assert graph_attributes(batched[key]["drive"]) == graph_attributes(single_pass[key]["drive"]), key
+
+
+def test_count_pbf_nodes_and_batches(osm_data, pbf_filepath):
+    nodes, _ = osm_data
+    bounds = [(116.4, 39.9, 116.4095, 39.9395), (116.41, 39.9, 116.4395, 39.9395), (109.0, 29.0, 111.0, 31.0)]
+    counts = count_pbf_nodes(pbf_filepath, bounds)
+    expected = [sum(min_lon <= node["lon"] <= max_lon and min_lat <= node["lat"] <= max_lat for node in nodes)
+                for min_lon, min_lat, max_lon, max_lat in bounds]
+    assert counts.tolist() == expected == [400, 1200, 5]
+    assert batch_by_node_count(["a", "b", "c"], bounds, counts, 1000) == [["c", "a"], ["b"]]
+    assert batch_by_node_count(["a", "b", "c"], bounds, counts, 2000) == [["c", "a", "b"]]
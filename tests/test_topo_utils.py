@@ -0,0 +1,80 @@
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, MultiPolygon, shape as to_shape
+
+from utils.topo_utils import build_topology, encode_arc, decode_arc, shape_arc_ids, shape_to_geometry
+
+QUANTUM = 1e-6
+
+# 两个相邻区域：公共边界 x = 116.5 上有中间点（两侧的顶点相同，但环的方向相反），坐标不是量化步长的整数倍
+SHARED_EDGE = [(116.5, 39.9000004), (116.5, 39.93), (116.5000002, 39.96), (116.5, 40.0)]
+WEST = Polygon([(116.4, 39.9000004), *SHARED_EDGE, (116.4, 40.0)])
+EAST = Polygon([*SHARED_EDGE[::-1], (116.6, 39.9000004), (116.6, 40.0)])
+
+
+def decode_all(arcs):
+    return {arc_id: decode_arc(encode_arc(arc), QUANTUM) for arc_id, arc in enumerate(arcs)}
+
+
+def assert_rings_close(decoded, original):
+    """
+    解码后的环与原始环的顶点一一对应（起点可能不同），每个坐标的误差不超过半个量化步长
+    """
+    decoded = np.asarray(decoded)
+    original = np.asarray(original.coords)
+    assert np.array_equal(decoded[0], decoded[-1])
+    decoded, original = decoded[:-1], original[:-1]
+    assert len(decoded) == len(original)
+    start = int(np.argmin(np.abs(original - decoded[0]).sum(axis=1)))
+    original = np.roll(original, -start, axis=0)
+    if shapely.LinearRing(decoded).is_ccw != shapely.LinearRing(original).is_ccw:
+        original = np.concatenate([original[:1], original[1:][::-1]])
+    assert np.max(np.abs(decoded - original)) <= QUANTUM / 2 + 1e-12
+
+
+def test_shared_edge_stored_once_and_round_trips():
+    arcs, shapes = build_topology([WEST, EAST], QUANTUM)
+
+    west_ids, east_ids = shape_arc_ids(shapes[0]), shape_arc_ids(shapes[1])
+    shared = west_ids & east_ids
+    assert len(shared) == 1
+    shared_id = shared.pop()
+    # 公共边界在两个环中方向相反：一侧正向引用，另一侧反向引用
+    refs = [ref for shape in shapes for ref in shape["arcs"][0] if (ref if ref >= 0 else ~ref) == shared_id]
+    assert sorted(ref >= 0 for ref in refs) == [False, True]
+    assert len(arcs) == 3
+    assert {tuple(point) for point in arcs[shared_id].tolist()} == \
+           {(round(x / QUANTUM), round(y / QUANTUM)) for x, y in SHARED_EDGE}
+
+    decoded = decode_all(arcs)
+    for shape, polygon in zip(shapes, [WEST, EAST]):
+        geometry = shape_to_geometry(shape, decoded)
+        assert geometry["type"] == "Polygon"
+        assert_rings_close(geometry["coordinates"][0], polygon.exterior)
+        assert to_shape(geometry).is_valid
+
+
+def test_junction_hole_and_island_round_trip():
+    # 左侧区域与右侧上下两个区域相接，(1, 1) 为三个区域的交汇点；左侧区域有一个洞，另有一个独立的岛屿
+    left = Polygon([(0, 0), (1, 0), (1, 1), (1, 2), (0, 2)], holes=[[(0.2, 0.2), (0.4, 0.2), (0.4, 0.4)]])
+    lower = Polygon([(1, 0), (2, 0), (2, 1), (1, 1)])
+    upper = MultiPolygon([Polygon([(1, 1), (2, 1), (2, 2), (1, 2)]), Polygon([(3, 3), (3.5, 3), (3.5, 3.5)])])
+    arcs, shapes = build_topology([left, lower, upper], QUANTUM)
+
+    # 每条边界只保存一次：任意两条弧段正向或反向都不相同
+    arc_keys = [tuple(map(tuple, arc.tolist())) for arc in arcs]
+    assert len(set(arc_keys) | {key[::-1] for key in arc_keys}) == 2 * len(arcs)
+    # 交汇点处切分：左侧区域的右边界分为与下方、上方区域各自共享的两条弧段
+    assert len(shape_arc_ids(shapes[0]) & shape_arc_ids(shapes[1])) == 1
+    assert len(shape_arc_ids(shapes[0]) & shape_arc_ids(shapes[2])) == 1
+    assert len(shape_arc_ids(shapes[1]) & shape_arc_ids(shapes[2])) == 1
+
+    decoded = decode_all(arcs)
+    left_geometry = shape_to_geometry(shapes[0], decoded)
+    assert_rings_close(left_geometry["coordinates"][0], left.exterior)
+    assert_rings_close(left_geometry["coordinates"][1], left.interiors[0])
+    upper_geometry = shape_to_geometry(shapes[2], decoded)
+    assert upper_geometry["type"] == "MultiPolygon"
+    for rings, polygon in zip(upper_geometry["coordinates"], upper.geoms):
+        assert_rings_close(rings[0], polygon.exterior)
+    assert to_shape(upper_geometry).equals(upper)
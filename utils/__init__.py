@@ -1,9 +1,45 @@
 from .common_utils import hex_to_rgba, extract_geojson_coordinates
-from .io_utils import get_geojson_from_aliyun, load_lottie_file
+from .io_utils import get_geojson_from_aliyun, get_geojson_batch_from_aliyun, load_lottie_file
 from .coor_convert_utils import LngLatTransfer
+from .crs_utils import COORDINATE_SYSTEMS, convert_coordinates, convert_geometries, convert_geojson, \
+    convert_geodataframe, convert_parquet, ensure_converted_parquet, parquet_coordinate_system
+from .network_cache_utils import network_cache_filepaths, normalize_network_gdf, write_network_cache, \
+    write_network_graph, read_network_cache, network_cache_version, migrate_network_cache
+from .osm_utils import parse_overpass_filter, match_overpass_filter, download_osm_superset, \
+    graph_from_osm_responses, graphs_from_polygon, read_pbf_network_elements, iter_graphs_from_pbf, buffer_polygon, \
+    graphs_from_pbf_elements
+from .admin_index import AdminDivision, AdminIndex, build_admin_index, read_admin_sources, admin_index_from_table, \
+    compile_admin_snapshot, read_admin_snapshot, load_admin_table, read_street_shard
+from .admin_search import AdminSearchIndex, build_admin_search_index
+from .boundary_db import load_boundary_geojson, load_boundary_geojson_batch, load_boundary_outline_geojson, \
+    get_boundary_feature, get_boundary_children, get_boundary_bbox, get_boundary_meta, get_boundary_meta_batch, \
+    query_boundaries_by_bbox, prefetch_boundaries
+from .raster_utils import find_population_tif_filepath, read_masked_window, read_masked_window_stack, zonal_statistics, \
+    block_sum, chunked_population_aggregate, create_population_process_pool, open_raster, open_rasters, \
+    warm_up_rasters
+from .tile_utils import get_population_tile, get_population_tile_uri, tiles_for_bounds, tile_lonlat_bounds, \
+    select_tile_zoom, start_tile_server, population_tile_min_zoom
 
 __all__ = [
     "hex_to_rgba", "extract_geojson_coordinates",
-    "get_geojson_from_aliyun", "load_lottie_file",
-    "LngLatTransfer"
+    "get_geojson_from_aliyun", "get_geojson_batch_from_aliyun", "load_lottie_file",
+    "LngLatTransfer",
+    "COORDINATE_SYSTEMS", "convert_coordinates", "convert_geometries", "convert_geojson", "convert_geodataframe",
+    "convert_parquet", "ensure_converted_parquet", "parquet_coordinate_system",
+    "network_cache_filepaths", "normalize_network_gdf", "write_network_cache", "write_network_graph",
+    "read_network_cache", "network_cache_version", "migrate_network_cache",
+    "parse_overpass_filter", "match_overpass_filter", "download_osm_superset", "graph_from_osm_responses",
+    "graphs_from_polygon", "read_pbf_network_elements", "iter_graphs_from_pbf",
+    "buffer_polygon", "graphs_from_pbf_elements",
+    "AdminDivision", "AdminIndex", "build_admin_index", "read_admin_sources", "admin_index_from_table",
+    "compile_admin_snapshot", "read_admin_snapshot", "load_admin_table", "read_street_shard",
+    "AdminSearchIndex", "build_admin_search_index",
+    "load_boundary_geojson", "load_boundary_geojson_batch", "load_boundary_outline_geojson", "get_boundary_feature",
+    "get_boundary_children", "get_boundary_bbox", "get_boundary_meta", "get_boundary_meta_batch",
+    "query_boundaries_by_bbox", "prefetch_boundaries",
+    "find_population_tif_filepath", "read_masked_window", "read_masked_window_stack", "zonal_statistics",
+    "block_sum", "chunked_population_aggregate", "create_population_process_pool", "open_raster", "open_rasters",
+    "warm_up_rasters",
+    "get_population_tile", "get_population_tile_uri", "tiles_for_bounds", "tile_lonlat_bounds", "select_tile_zoom",
+    "start_tile_server", "population_tile_min_zoom"
 ]
@@ -0,0 +1,386 @@
+import os
+import json
+import hashlib
+from types import MappingProxyType
+from typing import NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config.settings import ASSETS_MAP_PATH, ADMIN_SNAPSHOT_PATH
+from .cache_utils import atomic_write_bytes
+
+# 行政区划快照：将 pca-code.json、provinces/cities/areas/streets.json 与 amap_adcode_citycode.xlsx 编译为一个
+# Arrow IPC（Feather）文件，按内存映射读取，冷启动时无需解析 JSON 与 xlsx。
+# 文件元数据中保存快照版本与源文件内容哈希，源文件变化后快照自动重新编译。
+# 第一个记录批次（record batch）为省、市、区/县，之后每个省的街道（乡镇）各占一个记录批次，
+# 展开某个省的街道时只读取对应的批次。
+ADMIN_SNAPSHOT_VERSION = 2
+ADMIN_SOURCE_FILENAMES = (
+    "pca-code.json", "provinces.json", "cities.json", "areas.json", "streets.json", "amap_adcode_citycode.xlsx"
+)
+ADMIN_SNAPSHOT_SCHEMA = pa.schema([
+    ("code", pa.string()),
+    ("name", pa.string()),
+    ("level", pa.dictionary(pa.int8(), pa.string())),  # province / city / district / street
+    ("parent_code", pa.string()),
+    ("adcode", pa.int32()),  # 街道没有 adcode
+    ("citycode", pa.string())  # 电话区号
+])
+
+
+class AdminDivision(NamedTuple):
+    """
+    行政区划节点（不可变）
+    - code: pca-code.json 中的区划代码（省 2 位、市 4 位、区/县 6 位），作为索引主键
+    - adcode: 高德 / DataV 使用的 6 位 adcode，用于获取边界与人口数据
+    - children: 下一级区划的 code（按 pca-code.json 中的顺序）
+    """
+    code: str
+    name: str
+    level: str  # province / city / district
+    adcode: int
+    parent_code: str
+    children: tuple
+    citycode: str = None
+
+
+class AdminIndex:
+    """
+    省、市、区/县三级行政区划索引：进程内只构建一次，之后只读。
+    按 code 查找节点、按 code 浏览上下级、以及在指定上级范围内按名称查找，均为常数时间。
+    """
+
+    def __init__(self, divisions, province_codes):
+        self._divisions = MappingProxyType(divisions)  # code -> AdminDivision
+        self._province_codes = tuple(province_codes)
+        self._child_codes_by_name = MappingProxyType({
+            code: MappingProxyType({self._divisions[child].name: child for child in division.children})
+            for code, division in self._divisions.items()
+        })  # 上级 code -> {下级名称 -> 下级 code}
+        self._codes_by_adcode = MappingProxyType({
+            division.adcode: code for code, division in reversed(list(self._divisions.items()))
+        })  # adcode -> code（多个区划共用 adcode 时取层级最高的，例如直辖市的省级与市级）
+
+    def __len__(self):
+        return len(self._divisions)
+
+    def __contains__(self, code):
+        return code in self._divisions
+
+    def get(self, code):
+        """
+        按 code 查找行政区划，不存在时返回 None
+        """
+        return self._divisions.get(code)
+
+    def provinces(self):
+        """
+        所有省级行政区划
+        """
+        return [self._divisions[code] for code in self._province_codes]
+
+    def children(self, code):
+        """
+        下一级行政区划列表
+        """
+        return [self._divisions[child] for child in self._divisions[code].children]
+
+    def parent(self, code):
+        """
+        上一级行政区划，省级返回 None
+        """
+        return self._divisions.get(self._divisions[code].parent_code)
+
+    def find_child(self, parent_code, name):
+        """
+        在指定上级范围内按名称查找下一级行政区划（parent_code 为 None 时查找省级），找不到时返回 None
+        """
+        if parent_code is None:
+            return next((self._divisions[code] for code in self._province_codes
+                         if self._divisions[code].name == name), None)
+        code = self._child_codes_by_name.get(parent_code, {}).get(name)
+        return self._divisions[code] if code is not None else None
+
+    def find_by_adcode(self, adcode):
+        """
+        按 adcode 查找行政区划，找不到时返回 None
+        """
+        code = self._codes_by_adcode.get(int(adcode))
+        return self._divisions[code] if code is not None else None
+
+
+def resolve_adcode(code, name, adcode_by_name, valid_adcodes):
+    """
+    解析区划的 adcode：6 位补齐后的代码存在于 adcode 表中时直接使用，
+    否则按名称查找，并且只接受与上级代码前缀一致的唯一结果（处理代码变更的区/县，例如加格达奇区）。
+    :param code: pca-code.json 中的区划代码
+    :param name: 区划名称
+    :param adcode_by_name: dict：名称 -> adcode 列表
+    :param valid_adcodes: adcode 表中所有 adcode 的集合
+    :return: adcode；无法确定时返回 None
+    """
+    adcode = int(code.ljust(6, "0"))
+    if adcode in valid_adcodes:
+        return adcode
+    prefix = code[:-2] if len(code) > 2 else code
+    candidates = [candidate for candidate in adcode_by_name.get(name, []) if str(candidate).startswith(prefix)]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def merge_source_divisions(pca_code_data, provinces, cities, areas):
+    """
+    将 provinces/cities/areas.json 中存在、但 pca-code.json 中没有的区划补充到多级行政区数据中（按上级代码挂载）
+    :return: 补充后的多级行政区数据（不修改输入）
+    """
+    pca_code_data = json.loads(json.dumps(pca_code_data))
+    nodes = {}
+    for province in pca_code_data:
+        nodes[province["code"]] = province
+        for city in province.setdefault("children", []):
+            nodes[city["code"]] = city
+            for district in city.setdefault("children", []):
+                nodes[district["code"]] = district
+    for items, parent_key in ((provinces, None), (cities, "provinceCode"), (areas, "cityCode")):
+        for item in items:
+            if item["code"] in nodes:
+                continue
+            node = {"code": item["code"], "name": item["name"], "children": []}
+            if parent_key is None:
+                pca_code_data.append(node)
+            elif item.get(parent_key) in nodes:
+                nodes[item[parent_key]].setdefault("children", []).append(node)
+            else:
+                continue
+            nodes[item["code"]] = node
+    return pca_code_data
+
+
+def build_admin_index(pca_code_data, adcode_df):
+    """
+    由 pca-code.json 与 amap_adcode_citycode.xlsx 构建行政区划索引
+    - 城市的 adcode 不存在时（直辖市的"市辖区"/"县"、省直辖县级行政区划），使用省级 adcode，与 DataV 的层级一致
+    - 无法确定 adcode 的区/县（例如 adcode 表中没有的经济开发区）没有边界与人口数据，不加入索引
+    :param pca_code_data: 多级行政区数据
+    :param adcode_df: adcode 查找表（列：中文名、adcode、citycode）
+    :return: AdminIndex
+    """
+    names = adcode_df.index if "中文名" not in adcode_df.columns else adcode_df["中文名"]
+    citycodes = adcode_df["citycode"] if "citycode" in adcode_df.columns else [None] * len(adcode_df)
+    adcode_by_name = {}
+    citycode_by_adcode = {}
+    for name, adcode, citycode in zip(names, adcode_df["adcode"], citycodes):
+        adcode_by_name.setdefault(name, []).append(int(adcode))
+        if isinstance(citycode, str) and citycode.isdigit():
+            citycode_by_adcode.setdefault(int(adcode), citycode)
+    valid_adcodes = {adcode for adcodes in adcode_by_name.values() for adcode in adcodes}
+
+    divisions = {}
+    province_codes = []
+    for province in pca_code_data:
+        province_adcode = resolve_adcode(province["code"], province["name"], adcode_by_name, valid_adcodes)
+        if province_adcode is None:
+            continue
+        city_codes = []
+        for city in province.get("children", []):
+            city_adcode = resolve_adcode(city["code"], city["name"], adcode_by_name, valid_adcodes)
+            city_adcode = city_adcode if city_adcode is not None else province_adcode
+            district_codes = []
+            for district in city.get("children", []):
+                district_adcode = resolve_adcode(district["code"], district["name"], adcode_by_name, valid_adcodes)
+                if district_adcode is None:
+                    continue
+                divisions[district["code"]] = AdminDivision(
+                    district["code"], district["name"], "district", district_adcode, city["code"], (),
+                    citycode_by_adcode.get(district_adcode)
+                )
+                district_codes.append(district["code"])
+            divisions[city["code"]] = AdminDivision(
+                city["code"], city["name"], "city", city_adcode, province["code"], tuple(district_codes),
+                citycode_by_adcode.get(city_adcode)
+            )
+            city_codes.append(city["code"])
+        divisions[province["code"]] = AdminDivision(
+            province["code"], province["name"], "province", province_adcode, None, tuple(city_codes),
+            citycode_by_adcode.get(province_adcode)
+        )
+        province_codes.append(province["code"])
+
+    # 按层级从高到低排列，使 adcode 反查优先得到高层级的区划
+    divisions = dict(sorted(divisions.items(), key=lambda item: len(item[0])))
+    return AdminIndex(divisions, province_codes)
+
+
+def admin_source_hash(source_dir=ASSETS_MAP_PATH):
+    """
+    计算行政区划源文件的内容哈希（文件名与内容），用于判断快照是否过期
+    """
+    digest = hashlib.sha1(f"v{ADMIN_SNAPSHOT_VERSION}".encode("utf-8"))
+    for filename in ADMIN_SOURCE_FILENAMES:
+        digest.update(filename.encode("utf-8"))
+        with open(os.path.join(source_dir, filename), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_admin_sources(source_dir=ASSETS_MAP_PATH):
+    """
+    读取行政区划源文件（较慢：需要解析 JSON 与 xlsx，只在编译快照时使用）
+    :return: (pca_code_data, adcode_df, streets)：合并后的多级行政区数据、adcode 查找表（以中文名为索引）、街道列表
+    """
+    sources = {}
+    for filename in ADMIN_SOURCE_FILENAMES[:-1]:
+        with open(os.path.join(source_dir, filename), mode="r", encoding="utf-8") as f:
+            sources[filename] = json.load(f)
+    adcode_df = pd.read_excel(os.path.join(source_dir, "amap_adcode_citycode.xlsx"))
+    adcode_df.set_index("中文名", inplace=True)
+    pca_code_data = merge_source_divisions(
+        sources["pca-code.json"], sources["provinces.json"], sources["cities.json"], sources["areas.json"]
+    )
+    return pca_code_data, adcode_df, sources["streets.json"]
+
+
+def admin_index_to_table(admin_index, streets):
+    """
+    将行政区划索引与街道列表转换为 Arrow 表（按省、市、区/县、街道的顺序，同级按 pca-code.json 中的顺序，街道按代码排序）
+    """
+    streets = sorted(streets, key=lambda street: street["code"])
+    rows = []
+    for province in admin_index.provinces():
+        rows.append(province)
+        for city in admin_index.children(province.code):
+            rows.append(city)
+            rows.extend(admin_index.children(city.code))
+    rows.sort(key=lambda division: len(division.code))
+    return pa.Table.from_pydict({
+        "code": [d.code for d in rows] + [s["code"] for s in streets],
+        "name": [d.name for d in rows] + [s["name"] for s in streets],
+        "level": [d.level for d in rows] + ["street"] * len(streets),
+        "parent_code": [d.parent_code for d in rows] + [s["areaCode"] for s in streets],
+        "adcode": [d.adcode for d in rows] + [None] * len(streets),
+        "citycode": [d.citycode for d in rows] + [None] * len(streets)
+    }, schema=ADMIN_SNAPSHOT_SCHEMA)
+
+
+def admin_index_from_table(table):
+    """
+    由快照中的 Arrow 表构建行政区划索引（不包含街道）
+    """
+    columns = table.filter(pc.not_equal(table["level"].cast(pa.string()), "street")).to_pydict()
+    divisions = {}
+    children = {}
+    province_codes = []
+    for code, name, level, parent_code, adcode, citycode in zip(
+            columns["code"], columns["name"], columns["level"], columns["parent_code"], columns["adcode"],
+            columns["citycode"]):
+        divisions[code] = (code, name, level, adcode, parent_code, citycode)
+        children[code] = []
+        if parent_code is None:
+            province_codes.append(code)
+        elif parent_code in children:
+            children[parent_code].append(code)
+    return AdminIndex({
+        code: AdminDivision(code, name, level, adcode, parent_code, tuple(children[code]), citycode)
+        for code, (code, name, level, adcode, parent_code, citycode) in divisions.items()
+    }, province_codes)
+
+
+def write_admin_snapshot(filepath, table, source_hash):
+    """
+    将 Arrow 表（不压缩，便于内存映射）与版本、源文件哈希一起原子写入快照文件。
+    省、市、区/县写入第一个记录批次，街道按省分别写入一个记录批次，批次编号保存在元数据 street_batches 中。
+    """
+    levels = table["level"].cast(pa.string()).to_pylist()
+    division_count = sum(level != "street" for level in levels)
+    batches = [table.slice(0, division_count)]
+    street_batches = {}
+    street_codes = table["code"].to_pylist()[division_count:]
+    start = 0
+    while start < len(street_codes):
+        province_code = street_codes[start][:2]
+        stop = start
+        while stop < len(street_codes) and street_codes[stop][:2] == province_code:
+            stop += 1
+        street_batches[province_code] = len(batches)
+        batches.append(table.slice(division_count + start, stop - start))
+        start = stop
+
+    schema = table.schema.with_metadata({
+        "version": str(ADMIN_SNAPSHOT_VERSION),
+        "source_hash": source_hash,
+        "street_batches": json.dumps(street_batches)
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, schema) as writer:
+        for batch in batches:
+            writer.write_table(batch.replace_schema_metadata(schema.metadata))
+    atomic_write_bytes(filepath, sink.getvalue().to_pybytes())
+
+
+def read_street_shard(province_code, filepath=ADMIN_SNAPSHOT_PATH):
+    """
+    内存映射读取一个省的街道（乡镇），只读取该省对应的记录批次
+    :param province_code: 省级区划代码（2 位）
+    :return: dict：区/县代码 -> ((街道代码, 街道名称), ...)；快照中没有该省的街道时返回空字典；
+             快照不存在或已损坏时返回 None
+    """
+    try:
+        with pa.memory_map(filepath, "r") as source:
+            reader = pa.ipc.open_file(source)
+            street_batches = json.loads((reader.schema.metadata or {}).get(b"street_batches", b"{}"))
+            if province_code not in street_batches:
+                return {}
+            columns = reader.get_batch(street_batches[province_code]).to_pydict()
+    except (OSError, pa.ArrowException):
+        return None
+    streets = {}
+    for code, name, parent_code in zip(columns["code"], columns["name"], columns["parent_code"]):
+        streets.setdefault(parent_code, []).append((code, name))
+    return {district_code: tuple(items) for district_code, items in streets.items()}
+
+
+def read_admin_snapshot(filepath, source_hash=None):
+    """
+    内存映射读取行政区划快照
+    :param source_hash: 期望的源文件哈希；为 None 时不校验
+    :return: Arrow 表；快照不存在、已损坏、版本或源文件哈希不一致时返回 None
+    """
+    try:
+        with pa.memory_map(filepath, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(b"version") != str(ADMIN_SNAPSHOT_VERSION).encode("utf-8"):
+        return None
+    if source_hash is not None and metadata.get(b"source_hash") != source_hash.encode("utf-8"):
+        return None
+    return table
+
+
+def compile_admin_snapshot(filepath=ADMIN_SNAPSHOT_PATH, source_dir=ASSETS_MAP_PATH):
+    """
+    由源文件编译行政区划快照
+    :return: Arrow 表
+    """
+    source_hash = admin_source_hash(source_dir)
+    pca_code_data, adcode_df, streets = read_admin_sources(source_dir)
+    table = admin_index_to_table(build_admin_index(pca_code_data, adcode_df), streets)
+    try:
+        write_admin_snapshot(filepath, table, source_hash)
+    except OSError as e:
+        print(f"行政区划快照写入失败: {e}")
+    return table
+
+
+def load_admin_table(filepath=ADMIN_SNAPSHOT_PATH, source_dir=ASSETS_MAP_PATH):
+    """
+    加载行政区划快照；快照不存在或源文件已变化时重新编译
+    :return: Arrow 表（包含街道）
+    """
+    table = read_admin_snapshot(filepath, admin_source_hash(source_dir))
+    if table is None:
+        print("行政区划快照不存在或已过期，正在由源文件重新编译...")
+        table = compile_admin_snapshot(filepath, source_dir)
+    return table
@@ -0,0 +1,163 @@
+import bisect
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from pypinyin import lazy_pinyin  # 可选依赖：安装后支持拼音首字母与全拼搜索
+except ImportError:
+    lazy_pinyin = None
+
+ADMIN_LEVEL_ORDER = {"province": 0, "city": 1, "district": 2, "street": 3}
+
+
+def name_ngrams(name):
+    """
+    名称的一元与二元字符片段（n-gram），作为倒排索引的键
+    """
+    return set(name) | {name[i:i + 2] for i in range(len(name) - 1)}
+
+
+def pinyin_keys(name):
+    """
+    名称的拼音检索键：首字母（例如 "bjs"）与全拼（例如 "beijingshi"）；未安装 pypinyin 时返回空列表
+    """
+    if lazy_pinyin is None:
+        return []
+    syllables = [syllable.lower() for syllable in lazy_pinyin(name, errors="ignore") if syllable]
+    initials = "".join(syllable[0] for syllable in syllables)
+    return list(dict.fromkeys(key for key in (initials, "".join(syllables)) if key))
+
+
+class AdminSearchIndex:
+    """
+    全国省、市、区/县、街道（乡镇）名称的输入提示（typeahead）搜索索引：进程内只构建一次，之后只读。
+    - 条目按"层级 → 名称长度 → 代码"排序，条目编号即为基础排名，编号越小越靠前
+    - 精确匹配：名称 -> 条目编号
+    - 前缀匹配：按名称排序的数组上二分查找
+    - 包含匹配：一元/二元字符片段的倒排索引，取最短的倒排列表逐个校验，凑够结果数量即停止
+    - 拼音：首字母与全拼的前缀匹配（需要安装 pypinyin）
+    """
+
+    def __init__(self, entries):
+        """
+        :param entries: list of (code, name, level, adcode, path)，path 为 [(code, name, adcode), ...]，从省级到本级
+        """
+        entries = sorted(entries, key=lambda entry: (ADMIN_LEVEL_ORDER.get(entry[2], 9), len(entry[1]), entry[0]))
+        self._entries = tuple(entries)
+
+        self._exact = {}  # 名称 -> [条目编号]
+        postings = {}  # 字符片段 -> [条目编号]（升序）
+        for entry_id, (_, name, _, _, _) in enumerate(entries):
+            self._exact.setdefault(name, []).append(entry_id)
+            for gram in name_ngrams(name):
+                postings.setdefault(gram, []).append(entry_id)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        prefix_keys = sorted((name, entry_id) for entry_id, (_, name, _, _, _) in enumerate(entries))
+        self._prefix_names = [name for name, _ in prefix_keys]
+        self._prefix_ids = np.array([entry_id for _, entry_id in prefix_keys], dtype=np.int32)
+
+        pinyin_cache = {}  # 重名较多（例如街道），每个名称只转换一次
+        pinyin_pairs = []
+        for entry_id, (_, name, _, _, _) in enumerate(entries):
+            if name not in pinyin_cache:
+                pinyin_cache[name] = pinyin_keys(name)
+            pinyin_pairs.extend((key, entry_id) for key in pinyin_cache[name])
+        pinyin_pairs.sort()
+        self._pinyin_keys = [key for key, _ in pinyin_pairs]
+        self._pinyin_ids = np.array([entry_id for _, entry_id in pinyin_pairs], dtype=np.int32)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def supports_pinyin(self):
+        return bool(self._pinyin_keys)
+
+    @staticmethod
+    def _prefix_range(keys, ids, query, limit):
+        """
+        在排序后的检索键上二分查找前缀范围，返回基础排名最靠前的 limit 个条目编号。
+        同一条目可能有多个检索键匹配（例如拼音首字母与全拼），先去重再取前 limit 个
+        """
+        start = bisect.bisect_left(keys, query)
+        stop = bisect.bisect_left(keys, query + "\uffff", lo=start)
+        return np.unique(ids[start:stop])[:limit].tolist()
+
+    def search(self, query, limit=10):
+        """
+        搜索行政区划名称
+        :param query: 输入的名称片段；纯字母时按拼音首字母或全拼前缀匹配
+        :param limit: 最多返回的结果数量
+        :return: list of dict：code、name、level、adcode（街道为所属区/县的 adcode）、path（从省级到本级）、
+                 full_name（以空格连接的完整名称）；排序：精确匹配 → 前缀匹配 → 包含匹配，同类按层级、名称长度排序
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        if query.isascii():
+            if not query.isalpha():
+                return []
+            entry_ids = self._prefix_range(self._pinyin_keys, self._pinyin_ids, query.lower(), limit)
+            return [self._result(entry_id) for entry_id in entry_ids]
+
+        ranked = list(self._exact.get(query, []))
+        if len(ranked) < limit:
+            ranked.extend(self._prefix_range(self._prefix_names, self._prefix_ids, query, limit))
+        if len(dict.fromkeys(ranked)) < limit:
+            # 包含匹配：查询中任一字符片段没有出现过时，不可能匹配
+            grams = [query] if len(query) == 1 else [query[i:i + 2] for i in range(len(query) - 1)]
+            postings = [self._postings.get(gram) for gram in grams]
+            if all(posting is not None for posting in postings):
+                seen = set(ranked)
+                needed = limit - len(seen)
+                for entry_id in min(postings, key=len).tolist():
+                    if entry_id in seen or query not in self._entries[entry_id][1]:
+                        continue
+                    ranked.append(entry_id)
+                    needed -= 1
+                    if needed == 0:
+                        break
+        return [self._result(entry_id) for entry_id in dict.fromkeys(ranked)][:limit]
+
+    def _result(self, entry_id):
+        code, name, level, adcode, path = self._entries[entry_id]
+        return {
+            "code": code,
+            "name": name,
+            "level": level,
+            "adcode": adcode,
+            "path": list(path),
+            "full_name": " ".join(part[1] for part in path)
+        }
+
+
+def build_admin_search_index(admin_index, admin_table):
+    """
+    构建行政区划搜索索引
+    :param admin_index: 行政区划索引（省、市、区/县）
+    :param admin_table: 行政区划快照表（load_admin_table 的返回值），从中读取街道
+    :return: AdminSearchIndex
+    """
+    paths = {}
+    entries = []
+    for province in admin_index.provinces():
+        paths[province.code] = ((province.code, province.name, province.adcode),)
+        for city in admin_index.children(province.code):
+            paths[city.code] = paths[province.code] + ((city.code, city.name, city.adcode),)
+            for district in admin_index.children(city.code):
+                paths[district.code] = paths[city.code] + ((district.code, district.name, district.adcode),)
+    for code, path in paths.items():
+        division = admin_index.get(code)
+        entries.append((code, division.name, division.level, division.adcode, path))
+
+    streets = admin_table.filter(pc.equal(admin_table["level"].cast(pa.string()), "street")).select(
+        ["code", "name", "parent_code"]
+    ).to_pydict()
+    for code, name, parent_code in zip(streets["code"], streets["name"], streets["parent_code"]):
+        parent_path = paths.get(parent_code)
+        if parent_path is None:
+            continue  # 所属区/县不在索引中（没有 adcode），无法定位
+        entries.append((code, name, "street", parent_path[-1][2], parent_path + ((code, name, None),)))
+    return AdminSearchIndex(entries)
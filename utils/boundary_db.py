@@ -0,0 +1,460 @@
+import os
+import json
+import sqlite3
+import threading
+import shapely
+from pyproj import Geod
+
+from config.settings import BOUNDARY_DB_PATH, BOUNDARY_SIMPLIFY_TOLERANCES, BOUNDARY_TOPOLOGY_QUANTUM
+from .io_utils import get_geojson_from_aliyun, get_geojson_batch_from_aliyun, is_boundary_cache_fresh
+from .topo_utils import build_topology, encode_arc, decode_arc, shape_arc_ids, shape_to_geometry
+
+# 行政区边界库（SQLite）：
+# - boundary：每个行政区一行，adcode 唯一索引、parent_adcode 索引，以及预计算的元数据
+#   （中心点、椭球面积、顶点数量、编码后的几何形状大小），地图视图与面积统计直接查表，无需读取几何形状
+# - boundary_rtree：R*Tree 空间索引（外包框），按 feature_id 与 boundary 关联
+# - boundary_shape：各简化层级的拓扑形状（弧段引用），simplify_level 为 0 表示原始几何形状，
+#   否则对应 BOUNDARY_SIMPLIFY_TOLERANCES[simplify_level - 1]
+# - boundary_arc：量化、差分编码的共享弧段，同一上级行政区下相邻区域的公共边界只保存一次
+BOUNDARY_DB_VERSION = 3
+BOUNDARY_DB_SCHEMA = f"""
+PRAGMA user_version = {BOUNDARY_DB_VERSION};
+CREATE TABLE boundary (
+    feature_id INTEGER PRIMARY KEY,
+    adcode TEXT NOT NULL UNIQUE,
+    parent_adcode INTEGER,
+    level TEXT,
+    name TEXT,
+    properties TEXT NOT NULL,
+    centroid_lon REAL,
+    centroid_lat REAL,
+    area_km2 REAL,
+    vertex_count INTEGER,
+    shape_bytes INTEGER
+);
+CREATE INDEX idx_boundary_parent_adcode ON boundary (parent_adcode);
+CREATE VIRTUAL TABLE boundary_rtree USING rtree (feature_id, min_lon, max_lon, min_lat, max_lat);
+CREATE TABLE boundary_shape (
+    feature_id INTEGER NOT NULL,
+    simplify_level INTEGER NOT NULL,
+    shape TEXT NOT NULL,
+    PRIMARY KEY (feature_id, simplify_level)
+);
+CREATE TABLE boundary_arc (
+    arc_id INTEGER PRIMARY KEY,
+    coordinates BLOB NOT NULL
+);
+"""
+SQLITE_MAX_PARAMS = 900  # 单条语句的参数数量上限（SQLite 默认 999）
+
+_local = threading.local()
+
+
+def get_boundary_db_connection():
+    """
+    获取当前线程的只读数据库连接（sqlite3 连接不能跨线程、跨进程共享，因此按线程与进程分别创建）
+    :return: sqlite3.Connection；如果边界库不存在，返回 None
+    """
+    if getattr(_local, "pid", None) == os.getpid() and getattr(_local, "connection", None) is not None:
+        return _local.connection
+    if not os.path.exists(BOUNDARY_DB_PATH):
+        return None
+    connection = sqlite3.connect(f"file:{BOUNDARY_DB_PATH}?mode=ro", uri=True)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != BOUNDARY_DB_VERSION:
+        connection.close()
+        print(f"边界库版本不匹配（{version} != {BOUNDARY_DB_VERSION}），请重新运行 scripts.build_boundary_db")
+        return None
+    _local.connection = connection
+    _local.pid = os.getpid()
+    return _local.connection
+
+
+def load_arcs(connection, arc_ids):
+    """
+    读取并解码指定的弧段（只读取需要的弧段，不解析无关的几何形状）
+    :return: dict：弧段编号 -> (N, 2) 浮点坐标
+    """
+    arc_ids = sorted(arc_ids)
+    arcs = {}
+    for i in range(0, len(arc_ids), SQLITE_MAX_PARAMS):
+        chunk = arc_ids[i:i + SQLITE_MAX_PARAMS]
+        rows = connection.execute(
+            f"SELECT arc_id, coordinates FROM boundary_arc WHERE arc_id IN ({','.join('?' * len(chunk))})", chunk
+        )
+        for arc_id, data in rows:
+            arcs[arc_id] = decode_arc(data, BOUNDARY_TOPOLOGY_QUANTUM)
+    return arcs
+
+
+def rows_to_features(connection, rows):
+    """
+    将 (properties, shape) 查询结果解码为 GeoJSON Feature 列表。多个区域共享的弧段只读取、解码一次
+    """
+    shapes = [json.loads(shape) for _, shape in rows]
+    arcs = load_arcs(connection, set().union(*(shape_arc_ids(shape) for shape in shapes)))
+    return [
+        {"type": "Feature", "properties": json.loads(properties), "geometry": shape_to_geometry(shape, arcs)}
+        for (properties, _), shape in zip(rows, shapes)
+    ]
+
+
+BOUNDARY_SELECT_SQL = (
+    "SELECT b.properties, s.shape FROM boundary b "
+    "JOIN boundary_shape s ON s.feature_id = b.feature_id AND s.simplify_level = ?"
+)
+
+
+def get_boundary_feature(adcode, level=0):
+    """
+    从边界库中读取单个行政区的边界
+    :param adcode: 行政区 adcode
+    :param level: 简化层级，0 表示原始几何形状
+    :return: GeoJSON Feature；如果边界库不存在或没有该行政区，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    row = connection.execute(f"{BOUNDARY_SELECT_SQL} WHERE b.adcode = ?", (level, str(adcode))).fetchone()
+    return rows_to_features(connection, [row])[0] if row is not None else None
+
+
+def get_boundary_children(parent_adcode, level=0):
+    """
+    从边界库中读取某个行政区的所有下一级行政区边界（按 adcode 排序）
+    :param parent_adcode: 上级行政区 adcode
+    :param level: 简化层级，0 表示原始几何形状
+    :return: list of GeoJSON Feature；如果边界库不存在，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    rows = connection.execute(
+        f"{BOUNDARY_SELECT_SQL} WHERE b.parent_adcode = ? ORDER BY b.adcode", (level, int(parent_adcode))
+    ).fetchall()
+    return rows_to_features(connection, rows)
+
+
+def get_boundary_children_arcs(parent_adcode, level=0):
+    """
+    读取某个行政区所有下一级行政区的边界线：每条共享弧段只返回一次，用于只绘制边界、不填充的图层
+    :return: list of (N, 2) 浮点坐标；如果边界库不存在或没有下一级行政区，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    rows = connection.execute(
+        "SELECT s.shape FROM boundary b JOIN boundary_shape s ON s.feature_id = b.feature_id "
+        "AND s.simplify_level = ? WHERE b.parent_adcode = ?", (level, int(parent_adcode))
+    ).fetchall()
+    if not rows:
+        return None
+    arc_ids = set().union(*(shape_arc_ids(json.loads(shape)) for shape, in rows))
+    return list(load_arcs(connection, arc_ids).values())
+
+
+def get_boundary_bbox(adcode):
+    """
+    从空间索引中读取行政区外包框（不读取几何形状）
+    :return: [[min_lon, min_lat], [max_lon, max_lat]]；如果边界库不存在或没有该行政区，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    row = connection.execute(
+        "SELECT r.min_lon, r.min_lat, r.max_lon, r.max_lat FROM boundary_rtree r "
+        "JOIN boundary b ON b.feature_id = r.feature_id WHERE b.adcode = ?", (str(adcode),)
+    ).fetchone()
+    return [[row[0], row[1]], [row[2], row[3]]] if row is not None else None
+
+
+BOUNDARY_META_SQL = (
+    "SELECT b.adcode, b.name, b.level, b.parent_adcode, r.min_lon, r.min_lat, r.max_lon, r.max_lat, "
+    "b.centroid_lon, b.centroid_lat, b.area_km2, b.vertex_count, b.shape_bytes "
+    "FROM boundary b JOIN boundary_rtree r ON r.feature_id = b.feature_id"
+)
+
+
+def row_to_meta(row):
+    """
+    将元数据查询结果转换为字典
+    """
+    adcode, name, level, parent_adcode, min_lon, min_lat, max_lon, max_lat, \
+        centroid_lon, centroid_lat, area_km2, vertex_count, shape_bytes = row
+    return {
+        "adcode": int(adcode) if adcode.isdigit() else adcode,
+        "name": name,
+        "level": level,
+        "parent_adcode": parent_adcode,
+        "bbox": [[min_lon, min_lat], [max_lon, max_lat]],
+        "centroid": [centroid_lon, centroid_lat],
+        "area_km2": area_km2,
+        "vertex_count": vertex_count,
+        "shape_bytes": shape_bytes
+    }
+
+
+def get_boundary_meta(adcode):
+    """
+    读取行政区元数据（不读取几何形状）
+    :return: dict：adcode、name、level、parent_adcode、bbox [[min_lon, min_lat], [max_lon, max_lat]]、
+             centroid [lon, lat]、area_km2（WGS84 椭球面积）、vertex_count、shape_bytes；
+             如果边界库不存在或没有该行政区，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    row = connection.execute(f"{BOUNDARY_META_SQL} WHERE b.adcode = ?", (str(adcode),)).fetchone()
+    return row_to_meta(row) if row is not None else None
+
+
+def get_boundary_meta_batch(adcodes):
+    """
+    批量读取行政区元数据
+    :return: dict：adcode -> 元数据字典（边界库中没有的行政区不包含在结果中）
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return {}
+    adcodes = [str(adcode) for adcode in adcodes]
+    metas = {}
+    for i in range(0, len(adcodes), SQLITE_MAX_PARAMS):
+        chunk = adcodes[i:i + SQLITE_MAX_PARAMS]
+        rows = connection.execute(f"{BOUNDARY_META_SQL} WHERE b.adcode IN ({','.join('?' * len(chunk))})", chunk)
+        for row in rows:
+            meta = row_to_meta(row)
+            metas[meta["adcode"]] = meta
+    return metas
+
+
+def select_simplify_level(zoom, tile_size=256):
+    """
+    按地图缩放级别选择简化层级：容差不超过一个屏幕像素对应的经度跨度，简化前后在屏幕上没有可见差别
+    :param zoom: 地图缩放级别；为 None 时使用原始几何形状
+    :return: 简化层级，0 表示原始几何形状
+    """
+    if zoom is None:
+        return 0
+    pixel_degrees = 360.0 / (tile_size * 2 ** zoom)
+    level = 0
+    for i, tolerance in enumerate(BOUNDARY_SIMPLIFY_TOLERANCES):
+        if tolerance <= pixel_degrees:
+            level = i + 1
+    return level
+
+
+def query_boundaries_by_bbox(min_lon, min_lat, max_lon, max_lat, level=None):
+    """
+    使用空间索引查询外包框与给定范围相交的行政区
+    :param level: 可选，行政级别（country / province / city / district）
+    :return: list of (adcode, name, level)；如果边界库不存在，返回 None
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return None
+    sql = (
+        "SELECT b.adcode, b.name, b.level FROM boundary_rtree r JOIN boundary b ON b.feature_id = r.feature_id "
+        "WHERE r.max_lon >= ? AND r.min_lon <= ? AND r.max_lat >= ? AND r.min_lat <= ?"
+    )
+    params = [min_lon, max_lon, min_lat, max_lat]
+    if level is not None:
+        sql += " AND b.level = ?"
+        params.append(level)
+    return connection.execute(sql, params).fetchall()
+
+
+def load_boundary_from_db(adcode, is_sub=False, zoom=None):
+    """
+    从边界库中读取与 get_geojson_from_aliyun 格式一致的 FeatureCollection
+    :param zoom: 地图缩放级别；提供时读取对应的简化层级
+    :return: FeatureCollection；如果边界库中没有对应数据，返回 None
+    """
+    level = select_simplify_level(zoom)
+    if is_sub:
+        features = get_boundary_children(adcode, level)
+    else:
+        feature = get_boundary_feature(adcode, level)
+        features = [feature] if feature is not None else None
+    if not features:
+        return None
+    return {"type": "FeatureCollection", "features": features}
+
+
+def load_boundary_outline_geojson(adcode, zoom=None):
+    """
+    获取某个行政区所有下一级行政区的边界线（相邻区域的公共边界只出现一次），用于地图中只绘制边界的父级图层。
+    边界库中没有对应数据时，退回 load_boundary_geojson(adcode, is_sub=True)。
+    :param zoom: 地图缩放级别；提供时读取对应的简化层级
+    :return: FeatureCollection
+    """
+    arcs = get_boundary_children_arcs(adcode, select_simplify_level(zoom))
+    if not arcs:
+        return load_boundary_geojson(adcode, is_sub=True, zoom=zoom)
+    return {"type": "FeatureCollection", "features": [{
+        "type": "Feature",
+        "properties": {"adcode": adcode},
+        "geometry": {"type": "MultiLineString", "coordinates": [arc.tolist() for arc in arcs]}
+    }]}
+
+
+def boundary_exists_in_db(adcode, is_sub=False):
+    """
+    判断边界库中是否有对应数据（只查询索引，不读取几何形状）
+    """
+    connection = get_boundary_db_connection()
+    if connection is None:
+        return False
+    if is_sub:
+        row = connection.execute("SELECT 1 FROM boundary WHERE parent_adcode = ? LIMIT 1", (int(adcode),)).fetchone()
+    else:
+        row = connection.execute("SELECT 1 FROM boundary WHERE adcode = ?", (str(adcode),)).fetchone()
+    return row is not None
+
+
+def prefetch_boundaries(boundary_keys):
+    """
+    并发预取边界库中没有的行政区边界（写入本地边界缓存）；边界库中已有的、以及本地缓存仍可直接使用的不做任何处理
+    :param boundary_keys: (adcode, is_sub) 列表
+    """
+    get_geojson_batch_from_aliyun([
+        (adcode, is_sub) for adcode, is_sub in boundary_keys
+        if not boundary_exists_in_db(adcode, is_sub) and not is_boundary_cache_fresh(adcode, is_sub)
+    ])
+
+
+def load_boundary_geojson(adcode, is_sub=False, zoom=None):
+    """
+    获取行政区边界：优先读取本地边界库，库中没有时再通过 get_geojson_from_aliyun 获取（本地缓存 / 网络）。
+    - is_sub = False 仅获取当前 adcode 区域边界数据
+    - is_sub = True 获取当前 adcode 的一级子区域边界数据
+    - zoom：用于地图展示时提供，按缩放级别读取预计算的简化边界（仅边界库中的数据）
+    """
+    geojson_data_dict = load_boundary_from_db(adcode, is_sub, zoom)
+    if geojson_data_dict is not None:
+        return geojson_data_dict
+    return get_geojson_from_aliyun(adcode, is_sub=is_sub)
+
+
+def load_boundary_geojson_batch(boundary_keys):
+    """
+    批量获取行政区边界：边界库中已有的直接读取，其余的并发请求。
+    :param boundary_keys: (adcode, is_sub) 列表
+    :return: dict：(adcode, is_sub) -> FeatureCollection（获取失败时为 None）
+    """
+    results, missing_keys = {}, []
+    for adcode, is_sub in dict.fromkeys((adcode, bool(is_sub)) for adcode, is_sub in boundary_keys):
+        geojson_data_dict = load_boundary_from_db(adcode, is_sub)
+        if geojson_data_dict is None:
+            missing_keys.append((adcode, is_sub))
+        else:
+            results[(adcode, is_sub)] = geojson_data_dict
+    results.update(get_geojson_batch_from_aliyun(missing_keys))
+    return results
+
+
+def write_boundary_db(db_filepath, features):
+    """
+    将行政区边界写入新的 SQLite 边界库（先写入临时文件，再原子替换）。
+    以同一上级行政区的所有下级区域为一组，生成各简化层级并编码为共享弧段拓扑。
+    :param db_filepath: 边界库路径
+    :param features: GeoJSON Feature 列表；properties 中需要包含 adcode、name、level 以及 parent.adcode
+    :return: 写入的行政区数量
+    """
+    os.makedirs(os.path.dirname(db_filepath), exist_ok=True)
+    tmp_filepath = f"{db_filepath}.tmp"
+    if os.path.exists(tmp_filepath):
+        os.remove(tmp_filepath)
+
+    # 同一行政区可能出现在多个来源中（例如父级 _full 与单独请求），按 adcode 去重，保留最后一个
+    features_by_adcode = {}
+    for feature in features:
+        properties = feature.get("properties") or {}
+        if feature.get("geometry") and properties.get("adcode") is not None:
+            features_by_adcode[str(properties["adcode"])] = feature
+
+    connection = sqlite3.connect(tmp_filepath)
+    try:
+        connection.executescript(BOUNDARY_DB_SCHEMA)
+        geod = Geod(ellps="WGS84")
+        groups = {}  # parent_adcode -> [(feature_id, geometry)]
+        for feature in features_by_adcode.values():
+            properties = feature["properties"]
+            geometry = shapely.from_geojson(json.dumps(feature["geometry"]))
+            parent_adcode = (properties.get("parent") or {}).get("adcode")
+            parent_adcode = int(parent_adcode) if parent_adcode is not None else None
+            centroid = geometry.centroid
+            cursor = connection.execute(
+                "INSERT INTO boundary (adcode, parent_adcode, level, name, properties, "
+                "centroid_lon, centroid_lat, area_km2, vertex_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(properties["adcode"]),
+                    parent_adcode,
+                    properties.get("level"),
+                    properties.get("name"),
+                    json.dumps(properties, ensure_ascii=False),
+                    centroid.x if not centroid.is_empty else None,
+                    centroid.y if not centroid.is_empty else None,
+                    abs(geod.geometry_area_perimeter(geometry)[0]) / 1_000_000,
+                    int(shapely.get_num_coordinates(geometry))
+                )
+            )
+            min_lon, min_lat, max_lon, max_lat = geometry.bounds
+            connection.execute(
+                "INSERT INTO boundary_rtree VALUES (?, ?, ?, ?, ?)",
+                (cursor.lastrowid, min_lon, max_lon, min_lat, max_lat)
+            )
+            groups.setdefault(parent_adcode, []).append((cursor.lastrowid, geometry))
+
+        arc_count = 0
+        for members in groups.values():
+            feature_ids = [feature_id for feature_id, _ in members]
+            geometries = [geometry for _, geometry in members]
+            for level in range(len(BOUNDARY_SIMPLIFY_TOLERANCES) + 1):
+                if level > 0:
+                    # 下一层级在上一层级的基础上继续简化
+                    geometries = simplify_sibling_geometries(geometries, BOUNDARY_SIMPLIFY_TOLERANCES[level - 1])
+                arcs, shapes = build_topology(geometries, BOUNDARY_TOPOLOGY_QUANTUM, arc_id_start=arc_count)
+                encoded_arcs = [encode_arc(arc) for arc in arcs]
+                connection.executemany(
+                    "INSERT INTO boundary_arc (arc_id, coordinates) VALUES (?, ?)",
+                    [(arc_count + i, data) for i, data in enumerate(encoded_arcs)]
+                )
+                if level == 0:
+                    connection.executemany(
+                        "UPDATE boundary SET shape_bytes = ? WHERE feature_id = ?",
+                        [(sum(len(encoded_arcs[arc_id - arc_count]) for arc_id in shape_arc_ids(shape)), feature_id)
+                         for feature_id, shape in zip(feature_ids, shapes)]
+                    )
+                connection.executemany(
+                    "INSERT INTO boundary_shape (feature_id, simplify_level, shape) VALUES (?, ?, ?)",
+                    [(feature_id, level, json.dumps(shape, separators=(",", ":")))
+                     for feature_id, shape in zip(feature_ids, shapes)]
+                )
+                arc_count += len(arcs)
+        connection.commit()
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    os.replace(tmp_filepath, db_filepath)
+    return len(features_by_adcode)
+
+
+def simplify_sibling_geometries(geometries, tolerance):
+    """
+    简化同一上级行政区下的所有区域：多边形作为一个整体覆盖（coverage）简化，相邻区域共享的边界简化结果一致，
+    不会出现缝隙或重叠；其余几何类型（例如九段线）单独简化。
+    :param geometries: shapely 几何形状列表
+    :param tolerance: 容差（度）
+    :return: 简化后的几何形状列表
+    """
+    geometries = list(geometries)
+    polygon_indices = [i for i, g in enumerate(geometries) if g.geom_type in ("Polygon", "MultiPolygon")]
+    simplified = [shapely.simplify(g, tolerance, preserve_topology=True) for g in geometries]
+    if polygon_indices:
+        try:
+            coverage = shapely.coverage_simplify([geometries[i] for i in polygon_indices], tolerance)
+            for i, geometry in zip(polygon_indices, coverage):
+                simplified[i] = geometry
+        except shapely.errors.GEOSException as e:
+            print(f"覆盖简化失败，改为逐个简化（相邻边界可能不完全一致）: {e}")
+    return simplified
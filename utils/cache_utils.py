@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+
+def atomic_write_bytes(filepath, data):
+    """
+    原子写入文件：先写入同目录下的临时文件，再使用 os.replace 替换，避免读取到写了一半的文件。
+    :param filepath: 目标文件路径
+    :param data: 需要写入的 bytes
+    """
+    directory = os.path.dirname(filepath)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_filepath = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+
+
+def touch(filepath):
+    """
+    更新文件的修改时间，标记为最近使用（LRU 淘汰依据修改时间，不依赖可能被关闭的访问时间）
+    """
+    try:
+        os.utime(filepath)
+    except OSError:
+        pass
+
+
+def evict_lru(directory, max_bytes, sidecar_suffixes=()):
+    """
+    按最近最少使用（LRU）原则淘汰缓存文件，直到目录（含子目录）总大小不超过 max_bytes。
+    正在写入的临时文件（.tmp_ 前缀）不参与淘汰。
+    :param directory: 缓存目录
+    :param max_bytes: 缓存大小上限（字节）
+    :param sidecar_suffixes: 附属文件后缀（例如 ".meta"）：{主文件}{后缀} 与主文件作为一个缓存项，
+                             按主文件的修改时间排序，并与主文件一起删除
+    :return: 被删除的缓存项数量
+    """
+    entries = {}  # 主文件路径 -> [修改时间, 总大小, 文件路径列表]
+    total_bytes = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.startswith(".tmp_"):
+                continue
+            filepath = os.path.join(root, filename)
+            try:
+                stat = os.stat(filepath)
+            except OSError:
+                continue
+            total_bytes += stat.st_size
+            suffix = next((suffix for suffix in sidecar_suffixes if filename.endswith(suffix)), None)
+            key = filepath[:-len(suffix)] if suffix else filepath
+            entry = entries.setdefault(key, [stat.st_mtime, 0, []])
+            if suffix is None:
+                entry[0] = stat.st_mtime
+            entry[1] += stat.st_size
+            entry[2].append(filepath)
+
+    removed = 0
+    for _, size, filepaths in sorted(entries.values()):
+        if total_bytes <= max_bytes:
+            break
+        for filepath in filepaths:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+        total_bytes -= size
+        removed += 1
+
+    # 清理淘汰后留下的空子目录（例如失效网格签名对应的目录）
+    if removed:
+        for root, dirnames, filenames in os.walk(directory, topdown=False):
+            if root != directory and not dirnames and not filenames:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+    return removed
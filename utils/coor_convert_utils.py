@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 
 # WGS84、GCJ02（火星坐标系）、BD09（百度坐标系）以及百度地图中保存矢量信息的web墨卡托
@@ -54,8 +55,8 @@ class LngLatTransfer:
         sqrtmagic = math.sqrt(magic)
         dlat = (dlat * 180.0) / ((self.a * (1 - self.es)) / (magic * sqrtmagic) * self.pi)
         dlng = (dlng * 180.0) / (self.a / sqrtmagic * math.cos(radlat) * self.pi)
-        gcj_lng = lat + dlat
-        gcj_lat = lng + dlng
+        gcj_lng = lng + dlng
+        gcj_lat = lat + dlat
         return gcj_lng, gcj_lat
 
     def GCJ02_to_WGS84(self, gcj_lng, gcj_lat):
@@ -144,3 +145,199 @@ class LngLatTransfer:
         lat = y / 20037508.34 * 180
         lat = 180 / self.pi * (2 * math.atan(math.exp(lat * self.pi / 180)) - self.pi / 2)
         return lng, lat
+
+    # ------------------------------------------------------------------------------------------------------------
+    # 批量转换：输入为经纬度数组（任意形状，按 float64 连续数组计算），输出为同形状的数组。
+    # out 为可选的输出缓冲区 (out_lng, out_lat)，可以是输入数组本身（原地转换），避免为大批量坐标重复分配内存。
+    # ------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _as_arrays(lng, lat):
+        lng = np.require(lng, dtype=np.float64, requirements="C")
+        lat = np.require(lat, dtype=np.float64, requirements="C")
+        if lng.shape != lat.shape:
+            lng, lat = np.broadcast_arrays(lng, lat)
+        return lng, lat
+
+    @staticmethod
+    def _output(out, shape):
+        if out is None:
+            return np.empty(shape, dtype=np.float64), np.empty(shape, dtype=np.float64)
+        out_lng, out_lat = out
+        if out_lng.shape != shape or out_lat.shape != shape:
+            raise ValueError(f"输出缓冲区形状 {out_lng.shape} / {out_lat.shape} 与输入形状 {shape} 不一致")
+        return out_lng, out_lat
+
+    def _transform_batch(self, lng, lat):
+        """
+        _transformlat 与 _transformlng 的批量版本，两者共用的经度正弦项只计算一次
+        :return: (transformlat, transformlng)
+        """
+        common = (20.0 * np.sin(6.0 * lng * self.pi) + 20.0 * np.sin(2.0 * lng * self.pi)) * 2.0 / 3.0
+        sqrt_abs_lng = np.sqrt(np.abs(lng))
+        ret_lat = -100.0 + 2.0 * lng + 3.0 * lat + 0.2 * lat * lat + 0.1 * lng * lat + 0.2 * sqrt_abs_lng
+        ret_lat += common
+        ret_lat += (20.0 * np.sin(lat * self.pi) + 40.0 * np.sin(lat / 3.0 * self.pi)) * 2.0 / 3.0
+        ret_lat += (160.0 * np.sin(lat / 12.0 * self.pi) + 320 * np.sin(lat * self.pi / 30.0)) * 2.0 / 3.0
+        ret_lng = 300.0 + lng + 2.0 * lat + 0.1 * lng * lng + 0.1 * lng * lat + 0.1 * sqrt_abs_lng
+        ret_lng += common
+        ret_lng += (20.0 * np.sin(lng * self.pi) + 40.0 * np.sin(lng / 3.0 * self.pi)) * 2.0 / 3.0
+        ret_lng += (150.0 * np.sin(lng / 12.0 * self.pi) + 300.0 * np.sin(lng / 30.0 * self.pi)) * 2.0 / 3.0
+        return ret_lat, ret_lng
+
+    def _gcj02_offset_batch(self, lng, lat):
+        """
+        GCJ02 相对 WGS84 的偏移量 (dlng, dlat)，按给定位置计算
+        """
+        dlat, dlng = self._transform_batch(lng - 105.0, lat - 35.0)
+        radlat = lat / 180.0 * self.pi
+        magic = np.sin(radlat)
+        magic = 1 - self.es * magic * magic
+        sqrtmagic = np.sqrt(magic)
+        dlat = (dlat * 180.0) / ((self.a * (1 - self.es)) / (magic * sqrtmagic) * self.pi)
+        dlng = (dlng * 180.0) / (self.a / sqrtmagic * np.cos(radlat) * self.pi)
+        return dlng, dlat
+
+    def GCJ02_to_BD09_batch(self, gcj_lng, gcj_lat, out=None):
+        """
+        批量实现GCJ02向BD09坐标系的转换
+        :param gcj_lng: GCJ02坐标系下的经度数组
+        :param gcj_lat: GCJ02坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的BD09下经纬度数组
+        """
+        gcj_lng, gcj_lat = self._as_arrays(gcj_lng, gcj_lat)
+        z = np.sqrt(gcj_lng * gcj_lng + gcj_lat * gcj_lat) + 0.00002 * np.sin(gcj_lat * self.x_pi)
+        theta = np.arctan2(gcj_lat, gcj_lng) + 0.000003 * np.cos(gcj_lng * self.x_pi)
+        bd_lng, bd_lat = self._output(out, gcj_lng.shape)
+        np.multiply(z, np.cos(theta), out=bd_lng)
+        bd_lng += 0.0065
+        np.multiply(z, np.sin(theta), out=bd_lat)
+        bd_lat += 0.006
+        return bd_lng, bd_lat
+
+    def BD09_to_GCJ02_batch(self, bd_lng, bd_lat, out=None):
+        """
+        批量实现BD09坐标系向GCJ02坐标系的转换
+        :param bd_lng: BD09坐标系下的经度数组
+        :param bd_lat: BD09坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的GCJ02下经纬度数组
+        """
+        bd_lng, bd_lat = self._as_arrays(bd_lng, bd_lat)
+        x = bd_lng - 0.0065
+        y = bd_lat - 0.006
+        z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * self.x_pi)
+        theta = np.arctan2(y, x) - 0.000003 * np.cos(x * self.x_pi)
+        gcj_lng, gcj_lat = self._output(out, bd_lng.shape)
+        np.multiply(z, np.cos(theta), out=gcj_lng)
+        np.multiply(z, np.sin(theta), out=gcj_lat)
+        return gcj_lng, gcj_lat
+
+    def WGS84_to_GCJ02_batch(self, lng, lat, out=None):
+        """
+        批量实现WGS84坐标系向GCJ02坐标系的转换
+        :param lng: WGS84坐标系下的经度数组
+        :param lat: WGS84坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的GCJ02下经纬度数组
+        """
+        lng, lat = self._as_arrays(lng, lat)
+        dlng, dlat = self._gcj02_offset_batch(lng, lat)
+        gcj_lng, gcj_lat = self._output(out, lng.shape)
+        np.add(lng, dlng, out=gcj_lng)
+        np.add(lat, dlat, out=gcj_lat)
+        return gcj_lng, gcj_lat
+
+    def GCJ02_to_WGS84_batch(self, gcj_lng, gcj_lat, out=None):
+        """
+        批量实现GCJ02坐标系向WGS84坐标系的转换（与 GCJ02_to_WGS84 相同的单步近似，误差约 1~2 米）
+        :param gcj_lng: GCJ02坐标系下的经度数组
+        :param gcj_lat: GCJ02坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的WGS84下经纬度数组
+        """
+        gcj_lng, gcj_lat = self._as_arrays(gcj_lng, gcj_lat)
+        dlng, dlat = self._gcj02_offset_batch(gcj_lng, gcj_lat)
+        lng, lat = self._output(out, gcj_lng.shape)
+        np.subtract(gcj_lng, dlng, out=lng)
+        np.subtract(gcj_lat, dlat, out=lat)
+        return lng, lat
+
+    def GCJ02_to_WGS84_exact_batch(self, gcj_lng, gcj_lat, tolerance=1e-9, max_iterations=10, out=None):
+        """
+        批量实现GCJ02坐标系向WGS84坐标系的高精度转换：以单步近似为初值迭代求解 WGS84_to_GCJ02 的反函数，
+        所有点的经纬度修正量都小于 tolerance（度）时停止，1e-9 度约为 0.1 毫米。
+        :param gcj_lng: GCJ02坐标系下的经度数组
+        :param gcj_lat: GCJ02坐标系下的纬度数组
+        :param tolerance: 收敛阈值（度）
+        :param max_iterations: 最大迭代次数
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的WGS84下经纬度数组
+        """
+        gcj_lng, gcj_lat = self._as_arrays(gcj_lng, gcj_lat)
+        dlng, dlat = self._gcj02_offset_batch(gcj_lng, gcj_lat)
+        lng, lat = gcj_lng - dlng, gcj_lat - dlat
+        for _ in range(max_iterations):
+            dlng, dlat = self._gcj02_offset_batch(lng, lat)
+            error_lng = lng + dlng - gcj_lng
+            error_lat = lat + dlat - gcj_lat
+            lng -= error_lng
+            lat -= error_lat
+            if max(np.max(np.abs(error_lng), initial=0.0), np.max(np.abs(error_lat), initial=0.0)) < tolerance:
+                break
+        out_lng, out_lat = self._output(out, gcj_lng.shape)
+        np.copyto(out_lng, lng)
+        np.copyto(out_lat, lat)
+        return out_lng, out_lat
+
+    def BD09_to_WGS84_batch(self, bd_lng, bd_lat, out=None):
+        """
+        批量实现BD09坐标系向WGS84坐标系的转换
+        :param bd_lng: BD09坐标系下的经度数组
+        :param bd_lat: BD09坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的WGS84下经纬度数组
+        """
+        lng, lat = self.BD09_to_GCJ02_batch(bd_lng, bd_lat, out=out)
+        return self.GCJ02_to_WGS84_batch(lng, lat, out=(lng, lat))
+
+    def WGS84_to_BD09_batch(self, lng, lat, out=None):
+        """
+        批量实现WGS84坐标系向BD09坐标系的转换
+        :param lng: WGS84坐标系下的经度数组
+        :param lat: WGS84坐标系下的纬度数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的BD09下经纬度数组
+        """
+        gcj_lng, gcj_lat = self.WGS84_to_GCJ02_batch(lng, lat, out=out)
+        return self.GCJ02_to_BD09_batch(gcj_lng, gcj_lat, out=(gcj_lng, gcj_lat))
+
+    def WGS84_to_WebMercator_batch(self, lng, lat, out=None):
+        """
+        批量实现WGS84向web墨卡托的转换
+        :param lng: WGS84经度数组
+        :param lat: WGS84纬度数组
+        :param out: 可选的输出缓冲区 (out_x, out_y)
+        :return: 转换后的web墨卡托坐标数组
+        """
+        lng, lat = self._as_arrays(lng, lat)
+        x, y = self._output(out, lng.shape)
+        np.multiply(lng, 20037508.342789 / 180, out=x)
+        np.multiply(np.log(np.tan((90 + lat) * self.pi / 360)), 180 / self.pi * 20037508.34789 / 180, out=y)
+        return x, y
+
+    def WebMercator_to_WGS84_batch(self, x, y, out=None):
+        """
+        批量实现web墨卡托向WGS84的转换
+        :param x: web墨卡托x坐标数组
+        :param y: web墨卡托y坐标数组
+        :param out: 可选的输出缓冲区 (out_lng, out_lat)
+        :return: 转换后的WGS84经纬度数组
+        """
+        x, y = self._as_arrays(x, y)
+        lat_radians = 2 * np.arctan(np.exp(y / 20037508.34 * self.pi)) - self.pi / 2
+        lng, lat = self._output(out, x.shape)
+        np.multiply(x, 180 / 20037508.34, out=lng)
+        np.multiply(lat_radians, 180 / self.pi, out=lat)
+        return lng, lat
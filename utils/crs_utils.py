@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+
+from .coor_convert_utils import LngLatTransfer
+
+# 几何形状级别的坐标系转换（WGS84 / GCJ02 / BD09）：
+# - 一次取出一组几何形状的全部顶点（shapely.get_coordinates），按数组批量转换后写回（shapely.set_coordinates），
+#   不在 Python 中逐点循环
+# - GeoJSON：要素几何形状按 GEOS 批量解析与序列化，属性原样保留
+# - GeoParquet：按行组（row group）流式读取、转换、写出，内存占用只与单个行组大小有关；
+#   转换结果以 "{原文件名}.{坐标系}.parquet" 缓存在原文件旁边，原文件更新后自动重新生成
+
+COORDINATE_SYSTEMS = ("WGS84", "GCJ02", "BD09")
+PARQUET_COORDINATE_SYSTEM_KEY = b"coordinate_system"  # Parquet schema 元数据中记录坐标系的键
+
+_transfer = LngLatTransfer()
+_BATCH_CONVERTERS = {
+    ("WGS84", "GCJ02"): _transfer.WGS84_to_GCJ02_batch,
+    ("WGS84", "BD09"): _transfer.WGS84_to_BD09_batch,
+    ("GCJ02", "BD09"): _transfer.GCJ02_to_BD09_batch,
+    ("BD09", "GCJ02"): _transfer.BD09_to_GCJ02_batch,
+    ("GCJ02", "WGS84"): _transfer.GCJ02_to_WGS84_exact_batch,
+}
+
+
+def _check_coordinate_system(coordinate_system):
+    if coordinate_system not in COORDINATE_SYSTEMS:
+        raise ValueError(f"不支持的坐标系: {coordinate_system}，可选: {', '.join(COORDINATE_SYSTEMS)}")
+
+
+def convert_coordinates(lng, lat, source, target, out=None):
+    """
+    批量转换经纬度数组的坐标系；转换到 WGS84 时使用迭代求逆（误差远小于 1 毫米），使往返转换不产生累积偏移
+    :param lng: 经度数组
+    :param lat: 纬度数组
+    :param source: 源坐标系（WGS84 / GCJ02 / BD09）
+    :param target: 目标坐标系
+    :param out: 可选的输出缓冲区 (out_lng, out_lat)，可以是输入数组本身
+    :return: (lng, lat) 转换后的经纬度数组
+    """
+    _check_coordinate_system(source)
+    _check_coordinate_system(target)
+    if source == target:
+        lng, lat = LngLatTransfer._as_arrays(lng, lat)
+        if out is None:
+            return lng.copy(), lat.copy()
+        np.copyto(out[0], lng)
+        np.copyto(out[1], lat)
+        return out
+    if (source, target) == ("BD09", "WGS84"):
+        lng, lat = _transfer.BD09_to_GCJ02_batch(lng, lat, out=out)
+        return _transfer.GCJ02_to_WGS84_exact_batch(lng, lat, out=(lng, lat))
+    return _BATCH_CONVERTERS[(source, target)](lng, lat, out=out)
+
+
+def convert_geometries(geometries, source, target):
+    """
+    批量转换一组几何形状的坐标系：所有顶点一次取出、一次转换、一次写回；Z 坐标保持不变
+    :param geometries: shapely 几何形状数组（或列表，允许 None）
+    :return: 转换后的几何形状数组（numpy object 数组，输入不会被修改）
+    """
+    geometries = np.array(geometries, dtype=object)
+    if geometries.size == 0 or source == target:
+        return geometries
+    include_z = bool(np.any(shapely.has_z(geometries)))
+    coordinates = shapely.get_coordinates(geometries, include_z=include_z)
+    lng, lat = convert_coordinates(coordinates[:, 0], coordinates[:, 1], source, target)
+    coordinates[:, 0] = lng
+    coordinates[:, 1] = lat
+    return shapely.set_coordinates(geometries, coordinates)
+
+
+def convert_geojson(geojson_data_dict, source, target):
+    """
+    转换 GeoJSON FeatureCollection 的坐标系
+    :param geojson_data_dict: GeoJSON FeatureCollection
+    :return: 新的 FeatureCollection（要素属性与其余字段原样保留，输入不会被修改）
+    """
+    _check_coordinate_system(source)
+    _check_coordinate_system(target)
+    features = (geojson_data_dict or {}).get("features") or []
+    geometry_strings = [
+        json.dumps(feature["geometry"]) if feature.get("geometry") else None for feature in features
+    ]
+    geometries = convert_geometries(shapely.from_geojson(geometry_strings), source, target)
+    geometry_strings = shapely.to_geojson(geometries)
+
+    converted = dict(geojson_data_dict or {"type": "FeatureCollection"})
+    converted["features"] = [
+        {**feature, "geometry": json.loads(geometry_string) if geometry_string is not None else None}
+        for feature, geometry_string in zip(features, geometry_strings)
+    ]
+    converted.pop("bbox", None)  # 原 bbox 已不再准确
+    return converted
+
+
+def convert_geodataframe(gdf, source, target):
+    """
+    转换 GeoDataFrame 活动几何列的坐标系；GCJ02 / BD09 没有 EPSG 编码，crs 仍记为经纬度（EPSG:4326），
+    实际坐标系记录在 gdf.attrs["coordinate_system"] 中
+    :return: 转换后的 GeoDataFrame 副本
+    """
+    _check_coordinate_system(source)
+    _check_coordinate_system(target)
+    converted = gdf.copy()
+    geometry_column = converted.geometry.name
+    converted[geometry_column] = convert_geometries(converted.geometry.values, source, target)
+    converted = converted.set_geometry(geometry_column, crs=gdf.crs)
+    converted.attrs["coordinate_system"] = target
+    return converted
+
+
+def parquet_coordinate_system(filepath, default="WGS84"):
+    """
+    读取 Parquet 文件 schema 元数据中记录的坐标系，没有记录时返回 default
+    """
+    metadata = pq.read_schema(filepath).metadata or {}
+    value = metadata.get(PARQUET_COORDINATE_SYSTEM_KEY)
+    return value.decode("utf-8") if value else default
+
+
+def _geometry_columns(schema):
+    """
+    GeoParquet 元数据中声明的 WKB 几何列；没有 geo 元数据时，按 geopandas 的默认列名 geometry 处理
+    :return: (geo 元数据字典或 None, 几何列名列表)
+    """
+    metadata = schema.metadata or {}
+    if b"geo" in metadata:
+        geo = json.loads(metadata[b"geo"])
+        columns = [
+            name for name, column in geo.get("columns", {}).items()
+            if column.get("encoding", "WKB").upper() == "WKB" and name in schema.names
+        ]
+        return geo, columns
+    return None, [name for name in ("geometry",) if name in schema.names]
+
+
+def convert_parquet(src_filepath, dst_filepath, source, target):
+    """
+    流式转换 GeoParquet 文件的坐标系：逐个行组读取、转换几何列（WKB）、写出，保留原有的行组划分与其余列
+    :param src_filepath: 源文件路径
+    :param dst_filepath: 目标文件路径（先写入同目录下的临时文件，完成后原子替换）
+    :param source: 源坐标系
+    :param target: 目标坐标系
+    :return: 转换的行数
+    """
+    _check_coordinate_system(source)
+    _check_coordinate_system(target)
+    parquet_file = pq.ParquetFile(src_filepath)
+    schema = parquet_file.schema_arrow
+    geo, geometry_columns = _geometry_columns(schema)
+
+    metadata = dict(schema.metadata or {})
+    if geo is not None:
+        for name in geometry_columns:
+            geo["columns"][name].pop("bbox", None)  # bbox 为可选字段，转换后不再准确，直接去掉
+        metadata[b"geo"] = json.dumps(geo).encode("utf-8")
+    metadata[PARQUET_COORDINATE_SYSTEM_KEY] = target.encode("utf-8")
+    schema = schema.with_metadata(metadata)
+    geometry_indices = [schema.get_field_index(name) for name in geometry_columns]
+
+    directory = os.path.dirname(os.path.abspath(dst_filepath))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_filepath = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".parquet")
+    os.close(fd)
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_filepath, schema) as writer:
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i)
+                for index in geometry_indices:
+                    column = table.column(index)
+                    geometries = shapely.from_wkb(column.to_numpy(zero_copy_only=False))
+                    wkb = shapely.to_wkb(convert_geometries(geometries, source, target))
+                    table = table.set_column(index, schema.field(index), pa.array(wkb, type=column.type))
+                writer.write_table(table.replace_schema_metadata(metadata))
+                rows += table.num_rows
+        os.replace(tmp_filepath, dst_filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    return rows
+
+
+def converted_parquet_filepath(filepath, target):
+    """
+    转换结果的缓存路径：与原文件同目录，例如 drive_edges.parquet -> drive_edges.gcj02.parquet
+    """
+    root, ext = os.path.splitext(filepath)
+    return f"{root}.{target.lower()}{ext}"
+
+
+def ensure_converted_parquet(filepath, target, source="WGS84"):
+    """
+    获取 GeoParquet 文件在目标坐标系下的副本：缓存存在且不早于原文件时直接返回，否则重新转换
+    :param filepath: 原文件路径
+    :param target: 目标坐标系
+    :param source: 原文件的坐标系
+    :return: 目标坐标系下的文件路径（与原坐标系相同时返回原文件路径）
+    """
+    _check_coordinate_system(target)
+    if source == target:
+        return filepath
+    converted_filepath = converted_parquet_filepath(filepath, target)
+    if not os.path.exists(converted_filepath) or os.path.getmtime(converted_filepath) < os.path.getmtime(filepath):
+        convert_parquet(filepath, converted_filepath, source, target)
+    return converted_filepath
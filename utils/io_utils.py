@@ -1,5 +1,121 @@
 import requests
 import json
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.settings import BOUNDARY_CACHE_PATH, BOUNDARY_CACHE_TTL, BOUNDARY_CACHE_MAX_BYTES, BOUNDARY_OFFLINE_MODE, \
+    BOUNDARY_REQUEST_TIMEOUT, BOUNDARY_FETCH_MAX_WORKERS, BOUNDARY_REQUEST_RETRIES, BOUNDARY_CACHE_EVICT_INTERVAL
+from .cache_utils import atomic_write_bytes, touch, evict_lru
+
+_session = None
+_session_lock = threading.Lock()
+_inflight = {}  # (adcode, is_sub) -> Future：正在进行的边界请求
+_inflight_lock = threading.Lock()
+_write_count = 0
+_write_count_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    获取进程内共享的 HTTP 会话：复用 keep-alive 连接，连接池大小与并发请求数一致，并对网关错误自动重试。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=BOUNDARY_REQUEST_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"]
+            )
+            adapter = HTTPAdapter(
+                pool_connections=BOUNDARY_FETCH_MAX_WORKERS, pool_maxsize=BOUNDARY_FETCH_MAX_WORKERS, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def boundary_cache_filepath(adcode, is_sub=False):
+    """
+    边界缓存文件路径：BOUNDARY_CACHE_PATH/{adcode}.json 或 {adcode}_full.json，与 DataV 的文件名一致。
+    同目录下的 .meta 文件保存 ETag、Last-Modified 与获取时间，用于判断是否过期以及条件请求。
+    """
+    return os.path.join(BOUNDARY_CACHE_PATH, f"{adcode}_full.json" if is_sub else f"{adcode}.json")
+
+
+def load_cached_boundary(filepath):
+    """
+    读取缓存的边界数据与元数据
+    :return: (geojson, meta)；如果缓存不存在或已损坏，返回 None。元数据缺失时 meta 为空字典（视为已过期）
+    """
+    try:
+        with open(filepath, "rb") as f:
+            geojson_data_dict = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    try:
+        with open(f"{filepath}.meta", "rb") as f:
+            meta = json.loads(f.read())
+    except (OSError, ValueError):
+        meta = {}
+    return geojson_data_dict, meta
+
+
+def is_boundary_cache_fresh(adcode, is_sub=False):
+    """
+    判断边界缓存是否可以直接使用（未过期，或离线模式下已存在）：只读取元数据文件，不解析 GeoJSON
+    """
+    filepath = boundary_cache_filepath(adcode, is_sub)
+    if not os.path.exists(filepath):
+        return False
+    if BOUNDARY_OFFLINE_MODE:
+        return True
+    try:
+        with open(f"{filepath}.meta", "rb") as f:
+            meta = json.loads(f.read())
+    except (OSError, ValueError):
+        return False
+    return time.time() - meta.get("fetched_at", 0) < BOUNDARY_CACHE_TTL
+
+
+def save_cached_boundary(filepath, content, response):
+    """
+    将响应内容与元数据原子写入磁盘，并按 LRU 控制缓存总大小（边界文件与其 .meta 作为一个缓存项淘汰）
+    :param filepath: 缓存文件路径
+    :param content: 响应内容（bytes）
+    :param response: requests 响应，用于读取 ETag 与 Last-Modified
+    """
+    meta = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time()
+    }
+    atomic_write_bytes(filepath, content)
+    atomic_write_bytes(f"{filepath}.meta", json.dumps(meta).encode("utf-8"))
+
+    # 每写入一定数量的边界文件才扫描一次缓存目录，避免并发预取时每个请求都遍历整个目录
+    global _write_count
+    with _write_count_lock:
+        _write_count += 1
+        should_evict = _write_count % BOUNDARY_CACHE_EVICT_INTERVAL == 0
+    if should_evict:
+        evict_lru(BOUNDARY_CACHE_PATH, BOUNDARY_CACHE_MAX_BYTES, sidecar_suffixes=(".meta",))
+
+
+def refresh_cached_boundary_meta(filepath, meta):
+    """
+    条件请求返回 304（未修改）时，只更新元数据中的获取时间
+    """
+    meta = {**meta, "fetched_at": time.time()}
+    atomic_write_bytes(f"{filepath}.meta", json.dumps(meta).encode("utf-8"))
+    touch(filepath)
 
 
 def get_geojson_from_aliyun(adcode, is_sub=False):
@@ -7,20 +123,96 @@ def get_geojson_from_aliyun(adcode, is_sub=False):
     从阿里云 DataV 动态获取 GeoJSON 数据。
     - is_sub = False 仅获取当前 adcode 区域边界数据，不包含子区域边界。
     - is_sub = True 获取当前 adcode 区域边界数据，以及一级子区域边界。
+
+    结果缓存在 BOUNDARY_CACHE_PATH 下：
+    - 缓存未过期（BOUNDARY_CACHE_TTL）时直接读取本地文件，不访问网络
+    - 缓存过期后使用 ETag / Last-Modified 发起条件请求，未修改时只刷新获取时间
+    - 请求失败时退回使用过期的缓存
+    - 离线模式（BOUNDARY_OFFLINE_MODE）只读取本地缓存
+    多个线程（会话）同时请求同一区域时，只发起一次网络请求，其余线程等待并共享结果。
+    """
+    filepath = boundary_cache_filepath(adcode, is_sub)
+    cached = load_cached_boundary(filepath)
+    if cached is not None:
+        geojson_data_dict, meta = cached
+        if BOUNDARY_OFFLINE_MODE or time.time() - meta.get("fetched_at", 0) < BOUNDARY_CACHE_TTL:
+            touch(filepath)
+            return geojson_data_dict
+    elif BOUNDARY_OFFLINE_MODE:
+        print(f"离线模式下没有找到边界缓存: {adcode}{'_full' if is_sub else ''}")
+        return None
+
+    # 合并相同的并发请求（single-flight）：第一个线程负责请求，其余线程等待其结果
+    key = (int(adcode), bool(is_sub))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+    if not is_leader:
+        return future.result()
+
+    try:
+        geojson_data_dict = fetch_geojson_from_aliyun(adcode, is_sub, filepath, cached)
+        future.set_result(geojson_data_dict)
+        return geojson_data_dict
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def fetch_geojson_from_aliyun(adcode, is_sub, filepath, cached):
+    """
+    通过共享会话请求 DataV 边界数据并写入缓存（已有缓存时发起条件请求）。
+    :param cached: load_cached_boundary 的返回值；没有缓存时为 None
+    :return: GeoJSON 字典；请求失败且没有缓存时返回 None
     """
     if is_sub:
         url = f"https://geo.datav.aliyun.com/areas_v3/bound/{adcode}_full.json"
     else:
         url = f"https://geo.datav.aliyun.com/areas_v3/bound/{adcode}.json"
+    headers = {}
+    if cached is not None:
+        if cached[1].get("etag"):
+            headers["If-None-Match"] = cached[1]["etag"]
+        if cached[1].get("last_modified"):
+            headers["If-Modified-Since"] = cached[1]["last_modified"]
     try:
-        response = requests.get(url)
+        response = get_http_session().get(url, headers=headers, timeout=BOUNDARY_REQUEST_TIMEOUT)
+        if response.status_code == 304 and cached is not None:
+            refresh_cached_boundary_meta(filepath, cached[1])
+            return cached[0]
         response.raise_for_status()  # 检查请求是否成功
-        return response.json()
+        geojson_data_dict = response.json()
+        save_cached_boundary(filepath, response.content, response)
+        return geojson_data_dict
     except Exception as e:
+        if cached is not None:
+            print(f"加载地图数据失败，使用本地缓存: {e}")
+            return cached[0]
         print(f"加载地图数据失败: {e}")
         return None
 
 
+def get_geojson_batch_from_aliyun(boundary_keys, max_workers=BOUNDARY_FETCH_MAX_WORKERS):
+    """
+    并发获取多个区域的 GeoJSON 数据，总耗时取决于最慢的单个请求，而不是所有请求耗时之和。
+    :param boundary_keys: (adcode, is_sub) 列表
+    :param max_workers: 最大并发请求数
+    :return: dict：(adcode, is_sub) -> GeoJSON 字典（获取失败时为 None）
+    """
+    boundary_keys = list(dict.fromkeys((adcode, bool(is_sub)) for adcode, is_sub in boundary_keys))
+    if not boundary_keys:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(boundary_keys))) as executor:
+        results = executor.map(lambda key: get_geojson_from_aliyun(*key), boundary_keys)
+        return dict(zip(boundary_keys, results))
+
+
 def load_lottie_file(filepath):
     """
     从指定路径加载 Lottie JSON 文件
@@ -0,0 +1,189 @@
+import ast
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import osmnx as ox
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.settings import DATA_NETWORK_PATH
+
+# 路网缓存（GeoParquet）的列类型约定：
+# - 数值列保持数值类型（length、x、y 为 float64，street_count 为可空 int64）
+# - OSM 中可能出现多个取值的属性（同一条边合并了多条 way）统一保存为列表列，单个取值也包装为单元素列表
+# - highway、name 按 OSM 的多值约定以 ";" 连接后保存为字典编码的分类列
+# - 索引：边为 (u, v, key)，节点为 osmid，均为 int64
+# 版本号随 GeoDataFrame.attrs 写入 Parquet schema 元数据；旧版本（所有属性列都是字符串）的缓存
+# 可以通过 migrate_network_cache 升级
+
+NETWORK_SCHEMA_VERSION = 2
+
+NETWORK_FLOAT_COLUMNS = ("length", "x", "y")
+NETWORK_INT_COLUMNS = ("street_count",)
+NETWORK_BOOL_COLUMNS = ("oneway",)
+NETWORK_CATEGORY_COLUMNS = ("highway", "name")
+NETWORK_INT_LIST_COLUMNS = ("osmid",)
+NETWORK_BOOL_LIST_COLUMNS = ("reversed",)
+
+
+def network_cache_filepaths(adcode, network_type, network_dir=DATA_NETWORK_PATH):
+    """
+    路网本地缓存文件路径：{network_dir}/{adcode}/{network_type}_edges.parquet 与 _nodes.parquet
+    :return: (edges_file_path, nodes_file_path)
+    """
+    adcode_dir = os.path.join(network_dir, str(adcode))
+    return (os.path.join(adcode_dir, f"{network_type}_edges.parquet"),
+            os.path.join(adcode_dir, f"{network_type}_nodes.parquet"))
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _as_list(value, cast):
+    """
+    统一为列表：缺失值为 None，单个取值包装为单元素列表
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [cast(item) for item in value]
+    return None if _is_missing(value) else [cast(value)]
+
+
+def _join_values(value):
+    """
+    多个取值以 ";" 连接（OSM 的多值约定），缺失值为 None
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return ";".join(dict.fromkeys(str(item) for item in value))
+    return None if _is_missing(value) else str(value)
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+def normalize_network_gdf(gdf):
+    """
+    将 osmnx.graph_to_gdfs 生成的路网"边"或"节点" GeoDataFrame 整理为缓存的列类型（见模块说明）
+    :return: 整理后的 GeoDataFrame 副本
+    """
+    gdf = gdf.copy()
+    geometry_column = gdf.geometry.name
+    for col in gdf.columns:
+        if col == geometry_column:
+            continue
+        series = gdf[col]
+        if col in NETWORK_FLOAT_COLUMNS:
+            gdf[col] = pd.to_numeric(series, errors="coerce").astype("float64")
+        elif col in NETWORK_INT_COLUMNS:
+            gdf[col] = pd.to_numeric(series, errors="coerce").astype("Int64")
+        elif col in NETWORK_BOOL_COLUMNS:
+            gdf[col] = series.map(lambda value: None if _is_missing(value) else _to_bool(value)).astype("boolean")
+        elif col in NETWORK_CATEGORY_COLUMNS:
+            gdf[col] = series.map(_join_values).astype("category")
+        elif col in NETWORK_INT_LIST_COLUMNS:
+            gdf[col] = series.map(lambda value: _as_list(value, int))
+        elif col in NETWORK_BOOL_LIST_COLUMNS:
+            gdf[col] = series.map(lambda value: _as_list(value, _to_bool))
+        elif series.map(lambda value: isinstance(value, (list, tuple, np.ndarray))).any():
+            gdf[col] = series.map(lambda value: _as_list(value, str))
+        else:
+            gdf[col] = series.map(lambda value: None if _is_missing(value) else str(value))
+
+    gdf.index = gdf.index.set_levels(
+        [level.astype("int64") for level in gdf.index.levels]
+    ) if isinstance(gdf.index, pd.MultiIndex) else gdf.index.astype("int64")
+    return gdf
+
+
+def write_network_cache(gdf, filepath):
+    """
+    按缓存的列类型写入路网 GeoParquet（先写入同目录下的临时文件，完成后原子替换）
+    :param gdf: osmnx.graph_to_gdfs 生成的路网"边"或"节点" GeoDataFrame
+    :param filepath: 缓存文件路径
+    :return: 整理后的 GeoDataFrame
+    """
+    gdf = normalize_network_gdf(gdf)
+    gdf.attrs["network_schema"] = NETWORK_SCHEMA_VERSION  # 以 PANDAS_ATTRS 写入 schema 元数据
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_filepath = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".parquet")
+    os.close(fd)
+    try:
+        gdf.to_parquet(tmp_filepath, index=True)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+    return gdf
+
+
+def write_network_graph(G, edges_filepath, nodes_filepath):
+    """
+    将 osmnx 路网（networkx.MultiDiGraph）写入路网缓存
+    """
+    gdf_nodes, gdf_edges = ox.graph_to_gdfs(G, nodes=True, edges=True)
+    # Parquet 不支持一列数据中同时有 list/non-list/non-null values，按缓存的列类型统一整理后保存
+    write_network_cache(gdf_edges, edges_filepath)
+    write_network_cache(gdf_nodes, nodes_filepath)
+
+
+def network_cache_version(filepath):
+    """
+    路网缓存的版本号；没有记录版本号的旧缓存（所有属性列都是字符串）为 1
+    """
+    metadata = pq.read_schema(filepath).metadata or {}
+    attrs = json.loads(metadata.get(b"PANDAS_ATTRS", b"{}"))
+    return int(attrs.get("network_schema", 1))
+
+
+def read_network_cache(filepath):
+    """
+    读取路网缓存：列表列使用 Arrow 内存布局（pd.ArrowDtype），不为每一行单独创建数组对象
+    :return: GeoDataFrame
+    """
+    return gpd.read_parquet(filepath, to_pandas_kwargs={
+        "types_mapper": lambda arrow_type: pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None
+    })
+
+
+def _parse_legacy_value(text):
+    """
+    还原旧缓存中由 astype(str) 生成的字符串：列表（"['a', 'b']"）还原为列表，"nan" / "None" 还原为缺失值，
+    其余保持字符串（数值、布尔列由 normalize_network_gdf 按列类型转换）
+    """
+    if not isinstance(text, str):
+        return text
+    if text in ("nan", "None", "<NA>", ""):
+        return None
+    if text.startswith("[") and text.endswith("]"):
+        try:
+            return list(ast.literal_eval(text))
+        except (ValueError, SyntaxError):
+            return text
+    return text
+
+
+def migrate_network_cache(filepath):
+    """
+    将旧版本的路网缓存升级为当前的列类型（原地替换）；已是当前版本时不做任何操作
+    :return: 是否进行了升级
+    """
+    if network_cache_version(filepath) >= NETWORK_SCHEMA_VERSION:
+        return False
+    gdf = gpd.read_parquet(filepath)
+    geometry_column = gdf.geometry.name
+    for col in gdf.columns:
+        if col != geometry_column:
+            # 重复取值很多（道路类型、车道数等），每个不同的字符串只解析一次
+            values = gdf[col].astype(object).to_numpy()
+            parsed = {value: _parse_legacy_value(value) for value in pd.unique(values)}
+            gdf[col] = pd.Series([parsed.get(value, value) for value in values], index=gdf.index, dtype=object)
+    write_network_cache(gdf, filepath)
+    return True
@@ -0,0 +1,355 @@
+import re
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import shapely
+from osmnx import _overpass
+from osmnx import graph as ox_graph
+
+from config.settings import NETWORK_PBF_MAX_NODES
+from .pbf_utils import iter_pbf_elements
+
+# 一次下载、多种路网：
+# osmnx 的 graph_from_polygon 每种路网类型（drive / bike / walk）单独请求一次 Overpass，并各自解析、建图。
+# 各类型的筛选条件都比 "all" 更严格，因此这里只按 "all" 下载一次原始数据（OSM way 与 node），
+# 再在本地按各类型的 Overpass 筛选条件筛选 way，并按 graph_from_polygon 相同的步骤建图：
+# 缓冲区截取 → 最大连通分量 → 拓扑简化 → 按原始多边形截取 → 最大连通分量 → 交叉口道路数（street_count）。
+# 依赖 osmnx 的内部函数（_overpass._download_overpass_network、_overpass._get_network_filter、
+# graph._create_graph），以保证筛选条件与建图细节与 osmnx 完全一致。
+# 同样的建图步骤也用于本地 .osm.pbf 文件（iter_graphs_from_pbf）：流式读取文件，转换为与 Overpass 响应相同的结构。
+
+SUPERSET_NETWORK_TYPE = "all"
+COORDINATE_SCALE = 10 ** 7  # PBF 节点坐标以 1e-7 度（OSM 的坐标精度）为单位保存为 int32
+OUTSIDE_NODE_LONLAT = (0.0, 0.0)  # PBF 中缓冲区外、没有保存坐标的节点的占位坐标（建图后按缓冲区截取时被移除）
+OVERPASS_CLAUSE_PATTERN = re.compile(r'\["([^"]+)"(?:(!?~)"([^"]*)")?\]')
+
+
+def parse_overpass_filter(overpass_filter):
+    """
+    解析 Overpass way 筛选条件，例如 ["highway"]["area"!~"yes"]["highway"!~"footway|steps"]
+    :return: list of (key, operator, regex)：operator 为 None（键存在）、"~"（取值匹配）或 "!~"（键不存在或取值不匹配）
+    """
+    return [
+        (key, operator or None, re.compile(pattern) if operator else None)
+        for key, operator, pattern in OVERPASS_CLAUSE_PATTERN.findall(overpass_filter)
+    ]
+
+
+def match_overpass_filter(tags, clauses):
+    """
+    判断 way 的标签是否满足全部筛选条件（与 Overpass 相同：正则表达式不锚定、区分大小写）
+    """
+    for key, operator, regex in clauses:
+        value = tags.get(key)
+        if operator is None:
+            if value is None:
+                return False
+        elif operator == "~":
+            if value is None or not regex.search(value):
+                return False
+        elif value is not None and regex.search(value):
+            return False
+    return True
+
+
+def filter_overpass_responses(response_jsons, network_type):
+    """
+    按路网类型的筛选条件筛选 Overpass 原始数据：只保留满足条件的 way 及其引用的 node
+    :param response_jsons: Overpass 响应列表（不会被修改）
+    :param network_type: osmnx 的路网类型
+    :return: 新的 Overpass 响应列表
+    """
+    clauses = parse_overpass_filter(_overpass._get_network_filter(network_type))
+    filtered = []
+    for response_json in response_jsons:
+        elements = response_json.get("elements", [])
+        ways = [
+            element for element in elements
+            if element.get("type") == "way" and match_overpass_filter(element.get("tags", {}), clauses)
+        ]
+        node_ids = {node_id for way in ways for node_id in way.get("nodes", [])}
+        nodes = [element for element in elements if element.get("type") == "node" and element.get("id") in node_ids]
+        filtered.append({**response_json, "elements": nodes + ways})
+    return filtered
+
+
+def buffer_polygon(polygon, distance=500):
+    """
+    与 graph_from_polygon 相同的缓冲区：投影到 UTM 后向外缓冲 distance 米
+    """
+    poly_proj, crs_utm = ox.projection.project_geometry(polygon)
+    poly_buff, _ = ox.projection.project_geometry(poly_proj.buffer(distance), crs=crs_utm, to_latlong=True)
+    return poly_buff
+
+
+def download_osm_superset(polygon):
+    """
+    按 "all" 路网类型下载多边形（含 500 米缓冲区）内的 OSM 原始数据，只请求一次
+    :return: (poly_buff, response_jsons)
+    """
+    poly_buff = buffer_polygon(polygon)
+    response_jsons = list(_overpass._download_overpass_network(poly_buff, SUPERSET_NETWORK_TYPE, None))
+    return poly_buff, response_jsons
+
+
+def graph_from_osm_responses(response_jsons, polygon, poly_buff, network_type, simplify=True, retain_all=False,
+                             truncate_by_edge=False):
+    """
+    由 Overpass 原始数据构建指定类型的路网，步骤与参数含义同 osmnx.graph_from_polygon
+    :param response_jsons: download_osm_superset 下载的原始数据
+    :param polygon: 原始多边形
+    :param poly_buff: 缓冲区多边形
+    :param network_type: osmnx 的路网类型
+    :return: networkx.MultiDiGraph
+    """
+    bidirectional = network_type in ox.settings.bidirectional_network_types
+    G_buff = ox_graph._create_graph(filter_overpass_responses(response_jsons, network_type), bidirectional)
+    G_buff = ox.truncate.truncate_graph_polygon(G_buff, poly_buff, truncate_by_edge=truncate_by_edge)
+    if not retain_all:
+        G_buff = ox.truncate.largest_component(G_buff, strongly=False)
+    if simplify:
+        G_buff = ox.simplify_graph(G_buff)
+
+    G = ox.truncate.truncate_graph_polygon(G_buff, polygon, truncate_by_edge=truncate_by_edge)
+    if not retain_all:
+        G = ox.truncate.largest_component(G, strongly=False)
+
+    street_counts = ox.stats.count_streets_per_node(G_buff, nodes=G.nodes)
+    nx.set_node_attributes(G, values=street_counts, name="street_count")
+    return G
+
+
+def graphs_from_polygon(polygon, network_types):
+    """
+    一次下载，在本地构建多种类型的路网
+    :param polygon: 区域多边形（WGS84）
+    :param network_types: osmnx 的路网类型列表，例如 ["drive", "bike", "walk"]
+    :return: dict：路网类型 -> networkx.MultiDiGraph
+    """
+    poly_buff, response_jsons = download_osm_superset(polygon)
+    return {
+        network_type: graph_from_osm_responses(response_jsons, polygon, poly_buff, network_type)
+        for network_type in network_types
+    }
+
+
+def pbf_way_tag_keys(network_types):
+    """
+    需要为 way 保留的标签键：osmnx 保存到边属性的标签，以及各路网类型筛选条件用到的标签
+    """
+    keys = set(ox.settings.useful_tags_way)
+    for network_type in (SUPERSET_NETWORK_TYPE, *network_types):
+        keys.update(key for key, _, _ in parse_overpass_filter(_overpass._get_network_filter(network_type)))
+    return keys
+
+
+def read_pbf_network_elements(filepath, bounds, network_types):
+    """
+    单遍流式读取 PBF 文件：只保存落在任一范围（bounds）内的全部节点（id 与 int32 坐标，每个节点 16 字节），
+    以及满足 "all" 筛选条件、并至少经过一个已保存节点的 way。内存占用与各范围内的节点数量成正比，
+    范围较大时（例如整省）由调用方分批读取，见 iter_graphs_from_pbf。
+    要求节点排在 way 之前（Geofabrik 等提供的 extract 均已按类型与 id 排序）
+    :param bounds: (N, 4) 数组，每行为 (min_lon, min_lat, max_lon, max_lat)
+    :return: dict：node_ids（升序）、lons、lats（int32，单位 1e-7 度）、node_tags（节点 id -> 标签）、
+             ways（list of (way_id, refs, tags)）、way_positions（各 way 节点在 node_ids 中的位置，未保存的节点为 -1）
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    superset_clauses = parse_overpass_filter(_overpass._get_network_filter(SUPERSET_NETWORK_TYPE))
+    way_tag_keys = pbf_way_tag_keys(network_types)
+
+    id_chunks, lon_chunks, lat_chunks, node_tags = [], [], [], {}
+    node_ids = lons = lats = None
+    ways, way_positions = [], []
+    for kind, data in iter_pbf_elements(filepath, lambda tags: match_overpass_filter(tags, superset_clauses),
+                                        ox.settings.useful_tags_node):
+        if kind == "nodes":
+            if node_ids is not None:
+                raise ValueError("PBF 文件中的节点需要排在 way 之前，请先用 osmium sort 排序")
+            ids, block_lons, block_lats, block_tags = data
+            inside = bounds_mask(block_lons, block_lats, bounds)
+            id_chunks.append(ids[inside])
+            lon_chunks.append(np.rint(block_lons[inside] * COORDINATE_SCALE).astype(np.int32))
+            lat_chunks.append(np.rint(block_lats[inside] * COORDINATE_SCALE).astype(np.int32))
+            if block_tags:
+                kept_ids = set(ids[inside].tolist())
+                node_tags.update((node_id, tags) for node_id, tags in block_tags.items() if node_id in kept_ids)
+            continue
+
+        if node_ids is None:
+            node_ids, lons, lats = merge_node_chunks(id_chunks, lon_chunks, lat_chunks)
+        if node_ids.size == 0:
+            continue
+        # 整个数据块的节点列表一次查找位置，再按 way 拆分
+        flat_refs = np.concatenate([refs for _, refs, _ in data])
+        flat_positions = np.minimum(np.searchsorted(node_ids, flat_refs), node_ids.size - 1)
+        flat_positions[node_ids[flat_positions] != flat_refs] = -1
+        flat_positions = flat_positions.astype(np.int32)
+        counts = np.fromiter((refs.size for _, refs, _ in data), dtype=np.int64, count=len(data))
+        block_positions = np.split(flat_positions, np.cumsum(counts)[:-1])
+        has_known = np.logical_or.reduceat(flat_positions >= 0, np.cumsum(counts) - counts)
+        for (way_id, refs, tags), positions, keep in zip(data, block_positions, has_known.tolist()):
+            if keep:
+                ways.append((way_id, refs, {key: value for key, value in tags.items() if key in way_tag_keys}))
+                way_positions.append(positions)
+
+    if node_ids is None:
+        node_ids, lons, lats = merge_node_chunks(id_chunks, lon_chunks, lat_chunks)
+    return {"node_ids": node_ids, "lons": lons, "lats": lats, "node_tags": node_tags,
+            "ways": ways, "way_positions": way_positions}
+
+
+def bounds_mask(lons, lats, bounds):
+    """
+    落在任一外包矩形（含边界）内的点
+    """
+    inside = np.zeros(lons.size, dtype=bool)
+    for min_lon, min_lat, max_lon, max_lat in bounds:
+        inside |= (lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)
+    return inside
+
+
+def merge_node_chunks(id_chunks, lon_chunks, lat_chunks):
+    """
+    合并各数据块保存的节点：逐个数组合并并清空对应的分块列表，峰值内存约为结果加一个数组；
+    节点已按 id 升序时（PBF 惯例）不再排序
+    :return: (node_ids, lons, lats)
+    """
+    def concatenate(chunks, dtype):
+        array = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+        chunks.clear()
+        return array
+
+    node_ids = concatenate(id_chunks, np.int64)
+    lons = concatenate(lon_chunks, np.int32)
+    lats = concatenate(lat_chunks, np.int32)
+    if node_ids.size > 1 and not np.all(node_ids[1:] > node_ids[:-1]):
+        order = np.argsort(node_ids, kind="stable")
+        node_ids, lons, lats = node_ids[order], lons[order], lats[order]
+    return node_ids, lons, lats
+
+
+def count_pbf_nodes(filepath, bounds):
+    """
+    统计 PBF 文件中落在各外包矩形内的节点数量（只读取节点数据块，遇到 way 数据块即停止）
+    :param bounds: (N, 4) 数组，每行为 (min_lon, min_lat, max_lon, max_lat)
+    :return: np.int64 数组，与 bounds 一一对应
+    """
+    bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+    counts = np.zeros(len(bounds), dtype=np.int64)
+    for kind, data in iter_pbf_elements(filepath):
+        if kind != "nodes":
+            break
+        _, lons, lats, _ = data
+        for i, row in enumerate(bounds):
+            counts[i] += np.count_nonzero(bounds_mask(lons, lats, row[None, :]))
+    return counts
+
+
+def batch_by_node_count(keys, bounds, counts, max_nodes):
+    """
+    按空间顺序（外包矩形中心按 1 度纬度分带、带内按经度）把区域分组，每组节点数量之和不超过 max_nodes；
+    相邻区域的外包矩形有重叠，按数量之和估计偏保守。单个区域超过上限时单独成组
+    :return: 区域标识列表的列表
+    """
+    centers = [((min_lon + max_lon) / 2, (min_lat + max_lat) / 2) for min_lon, min_lat, max_lon, max_lat in bounds]
+    order = sorted(range(len(keys)), key=lambda i: (int(np.floor(centers[i][1])), centers[i][0]))
+    batches, batch, batch_nodes = [], [], 0
+    for i in order:
+        if batch and batch_nodes + counts[i] > max_nodes:
+            batches.append(batch)
+            batch, batch_nodes = [], 0
+        batch.append(keys[i])
+        batch_nodes += int(counts[i])
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def overpass_responses_from_elements(elements, poly_buff):
+    """
+    从 PBF 读取结果中选出与 Overpass 查询 way(poly:缓冲区)；>; 相同的数据：至少有一个节点在缓冲区内的 way，及其全部节点
+    :param elements: read_pbf_network_elements 的返回值
+    :return: Overpass 响应列表（只有一个响应）
+    """
+    ways, way_positions = elements["ways"], elements["way_positions"]
+    if not ways:
+        return [{"elements": []}]
+    node_ids, lons, lats = elements["node_ids"], elements["lons"], elements["lats"]
+    min_lon, min_lat, max_lon, max_lat = poly_buff.bounds
+    candidates = np.flatnonzero(
+        (lons >= np.floor(min_lon * COORDINATE_SCALE)) & (lons <= np.ceil(max_lon * COORDINATE_SCALE)) &
+        (lats >= np.floor(min_lat * COORDINATE_SCALE)) & (lats <= np.ceil(max_lat * COORDINATE_SCALE))
+    )
+    inside = np.zeros(node_ids.size + 1, dtype=bool)  # 最后一位对应未保存的节点（位置 -1）
+    inside[candidates] = shapely.contains_xy(poly_buff, lons[candidates] / COORDINATE_SCALE,
+                                             lats[candidates] / COORDINATE_SCALE)
+
+    flat_positions = np.concatenate(way_positions)
+    starts = np.cumsum([0] + [positions.size for positions in way_positions[:-1]])
+    selected = np.flatnonzero(np.logical_or.reduceat(inside[flat_positions], starts))
+
+    selected_ways = [ways[i] for i in selected.tolist()]
+    known, unknown = set(), set()
+    for i in selected.tolist():
+        positions, refs = way_positions[i], ways[i][1]
+        known.update(positions[positions >= 0].tolist())
+        unknown.update(refs[positions < 0].tolist())
+
+    node_tags = elements["node_tags"]
+    node_elements = []
+    for position in sorted(known):
+        node_id = int(node_ids[position])
+        node = {"type": "node", "id": node_id, "lat": float(lats[position] / COORDINATE_SCALE),
+                "lon": float(lons[position] / COORDINATE_SCALE)}
+        if node_id in node_tags:
+            node["tags"] = node_tags[node_id]
+        node_elements.append(node)
+    outside_lon, outside_lat = OUTSIDE_NODE_LONLAT
+    node_elements.extend(
+        {"type": "node", "id": node_id, "lat": outside_lat, "lon": outside_lon} for node_id in sorted(unknown)
+    )
+    node_elements.sort(key=lambda node: node["id"])
+    way_elements = [
+        {"type": "way", "id": way_id, "nodes": refs.tolist(), "tags": dict(tags)} for way_id, refs, tags in selected_ways
+    ]
+    return [{"elements": node_elements + way_elements}]
+
+
+def graphs_from_pbf_elements(elements, polygon, poly_buff, network_types):
+    """
+    由 PBF 读取结果构建一个区域的多种类型路网（读取范围需覆盖 poly_buff 的外包矩形）
+    :param elements: read_pbf_network_elements 的返回值
+    :return: dict：路网类型 -> networkx.MultiDiGraph
+    """
+    response_jsons = overpass_responses_from_elements(elements, poly_buff)
+    return {
+        network_type: graph_from_osm_responses(response_jsons, polygon, poly_buff, network_type)
+        for network_type in network_types
+    }
+
+
+def iter_graphs_from_pbf(filepath, polygons, network_types, max_nodes=NETWORK_PBF_MAX_NODES):
+    """
+    从本地 .osm.pbf 文件构建多个区域、多种类型的路网，每个区域的结果与 osmnx.graph_from_polygon 相同。
+    各区域（含缓冲区）外包矩形内的节点总数不超过 max_nodes 时只读取一遍文件；否则先统计各区域的节点数量，
+    再按空间顺序分批，每批读取一遍文件，内存中同时只保留一批的节点
+    :param filepath: .osm.pbf 文件路径（例如省级 extract）
+    :param polygons: dict：区域标识（例如 adcode） -> 区域多边形（WGS84）
+    :param network_types: osmnx 的路网类型列表，例如 ["drive", "bike", "walk"]
+    :param max_nodes: 每批最多保存的节点数量，None 表示不分批
+    :return: 逐个区域生成 (区域标识, dict：路网类型 -> networkx.MultiDiGraph)，调用方处理完一个区域即可释放
+    """
+    poly_buffs = {key: buffer_polygon(polygon) for key, polygon in polygons.items()}
+    keys = list(polygons)
+    bounds = [poly_buffs[key].bounds for key in keys]
+    batches = [keys]
+    if max_nodes is not None and len(keys) > 1:
+        counts = count_pbf_nodes(filepath, bounds)
+        if counts.sum() > max_nodes:
+            batches = batch_by_node_count(keys, bounds, counts, max_nodes)
+
+    for batch in batches:
+        elements = read_pbf_network_elements(filepath, [poly_buffs[key].bounds for key in batch], network_types)
+        for key in batch:
+            yield key, graphs_from_pbf_elements(elements, polygons[key], poly_buffs[key], network_types)
+        elements = None  # 读取下一批之前释放
@@ -0,0 +1,290 @@
+import struct
+import zlib
+import numpy as np
+
+# OpenStreetMap PBF 文件的流式读取（不依赖 protobuf / pyosmium）：
+# - 文件由若干数据块组成：4 字节大端长度 + BlobHeader + Blob（原始或 zlib 压缩的 PrimitiveBlock）
+# - 逐块读取、解压、解析，内存占用只与单个数据块（通常不超过 8000 个要素）有关
+# - DenseNodes 的打包字段（id、经纬度的差分编码）用 numpy 批量解码；way 的标签按需解码，
+#   不满足筛选条件的 way 不解码节点列表
+# 参考：https://wiki.openstreetmap.org/wiki/PBF_Format
+
+WIRE_VARINT, WIRE_FIXED64, WIRE_BYTES, WIRE_FIXED32 = 0, 1, 2, 5
+
+
+def read_varint(buf, pos):
+    """
+    读取一个 varint
+    :return: (value, 下一个字段的位置)
+    """
+    result, shift = 0, 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def to_int64(value):
+    """
+    将 varint 读出的无符号整数按 int64 解释（负数以 10 字节补码编码）
+    """
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_coordinates(offset, granularity, values):
+    """
+    坐标还原：offset + granularity * value（单位：纳度），按 granularity 对应的小数位数取整，与 Overpass 输出一致
+    """
+    decimals = 9 - int(np.floor(np.log10(granularity)))
+    return np.round((offset + granularity * np.asarray(values, dtype=np.int64)) * 1e-9, decimals)
+
+
+def iter_fields(buf):
+    """
+    遍历 protobuf 消息的字段
+    :param buf: 消息内容（memoryview）
+    :return: 生成 (字段编号, 取值)：varint 字段为 int，长度前缀字段为 memoryview
+    """
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == WIRE_VARINT:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == WIRE_BYTES:
+            length, pos = read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == WIRE_FIXED64:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == WIRE_FIXED32:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"不支持的 protobuf 字段类型: {wire_type}")
+        yield field, value
+
+
+def decode_packed_varints(data):
+    """
+    批量解码打包（packed）的 varint 数组
+    :return: np.uint64 数组
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size == 0:
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = (np.arange(raw.size) - np.repeat(starts, ends - starts + 1)) * 7
+    return np.add.reduceat((raw & 0x7f).astype(np.uint64) << shifts.astype(np.uint64), starts)
+
+
+def decode_packed_sint64(data, delta=False):
+    """
+    批量解码打包的 sint64（zigzag 编码）数组，delta=True 时按差分编码还原
+    :return: np.int64 数组
+    """
+    values = decode_packed_varints(data)
+    values = (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+    return np.cumsum(values) if delta else values
+
+
+def decode_packed_uint32(data):
+    """
+    解码打包的 uint32 数组（标签的字符串表索引，数量很少，逐个读取比 numpy 更快）
+    """
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def iter_pbf_blobs(filepath):
+    """
+    逐块读取 PBF 文件中的 OSMData 数据块，跳过文件头（OSMHeader）
+    :return: 生成解压后的 PrimitiveBlock 内容（memoryview）
+    """
+    with open(filepath, mode="rb") as f:
+        while True:
+            head = f.read(4)
+            if not head:
+                return
+            if len(head) < 4:
+                raise ValueError(f"PBF 文件不完整: {filepath}")
+            header = memoryview(f.read(struct.unpack(">I", head)[0]))
+            blob_type, data_size = None, 0
+            for field, value in iter_fields(header):
+                if field == 1:
+                    blob_type = bytes(value).decode("utf-8")
+                elif field == 3:
+                    data_size = value
+            blob = memoryview(f.read(data_size))
+            if blob_type != "OSMData":
+                continue
+            data = None
+            for field, value in iter_fields(blob):
+                if field == 1:  # raw
+                    data = value
+                elif field == 3:  # zlib_data
+                    data = memoryview(zlib.decompress(value))
+                elif field in (4, 6, 7):
+                    raise ValueError("只支持未压缩或 zlib 压缩的 PBF 数据块，lzma / lz4 / zstd 压缩的文件请先用 "
+                                     "osmium cat 转换")
+            if data is not None:
+                yield data
+
+
+def parse_dense_nodes(buf, strings, granularity, lat_offset, lon_offset, node_tag_keys):
+    """
+    解析 DenseNodes
+    :param node_tag_keys: 需要保留的节点标签键（set of str）；只为带有这些标签的节点生成标签字典
+    :return: (ids, lons, lats, tags)：tags 为 dict：节点 id -> {键: 值}
+    """
+    ids = lats = lons = np.empty(0, dtype=np.int64)
+    keys_vals = None
+    for field, value in iter_fields(buf):
+        if field == 1:
+            ids = decode_packed_sint64(value, delta=True)
+        elif field == 8:
+            lats = decode_packed_sint64(value, delta=True)
+        elif field == 9:
+            lons = decode_packed_sint64(value, delta=True)
+        elif field == 10:
+            keys_vals = value
+    lons = to_coordinates(lon_offset, granularity, lons)
+    lats = to_coordinates(lat_offset, granularity, lats)
+
+    tags = {}
+    if keys_vals is not None and node_tag_keys:
+        # keys_vals：依次为每个节点的 (键, 值) 字符串索引，以 0 分隔不同节点
+        key_ids = {index for index, string in enumerate(strings) if string in node_tag_keys}
+        if key_ids:
+            kv = decode_packed_varints(keys_vals).astype(np.int64)
+            is_separator = kv == 0
+            node_index = np.cumsum(is_separator) - is_separator
+            segment_start = np.flatnonzero(np.r_[True, is_separator[:-1]])
+            offset = np.arange(kv.size) - np.repeat(segment_start, np.diff(np.r_[segment_start, kv.size]))
+            is_key = ~is_separator & (offset % 2 == 0)
+            positions = np.flatnonzero(is_key & np.isin(kv, list(key_ids)))
+            for position in positions.tolist():
+                node_id = int(ids[node_index[position]])
+                tags.setdefault(node_id, {})[strings[kv[position]]] = strings[kv[position + 1]]
+    return ids, lons, lats, tags
+
+
+def parse_node(buf, strings, node_tag_keys):
+    """
+    解析（非 Dense 格式的）Node
+    :return: (id, lon, lat, tags)：经纬度为未还原的整数（由调用方按数据块统一还原）
+    """
+    node_id, lat, lon, keys, vals = 0, 0, 0, [], []
+    for field, value in iter_fields(buf):
+        if field == 1:
+            node_id = (value >> 1) ^ -(value & 1)
+        elif field == 2:
+            keys = decode_packed_uint32(value)
+        elif field == 3:
+            vals = decode_packed_uint32(value)
+        elif field == 8:
+            lat = (value >> 1) ^ -(value & 1)
+        elif field == 9:
+            lon = (value >> 1) ^ -(value & 1)
+    tags = {strings[k]: strings[v] for k, v in zip(keys, vals) if strings[k] in node_tag_keys}
+    return node_id, lon, lat, tags
+
+
+def decode_delta_segments(buffers):
+    """
+    批量解码多个打包的差分 sint64 数组（例如一个数据块中所有 way 的节点列表），只调用一次 numpy 解码
+    :param buffers: 打包数据列表（均不为空）
+    :return: np.int64 数组列表，与 buffers 一一对应
+    """
+    if not buffers:
+        return []
+    data = b"".join(buffers)
+    values = decode_packed_sint64(data)
+    lengths = np.fromiter((len(buffer) for buffer in buffers), dtype=np.int64, count=len(buffers))
+    byte_starts = np.cumsum(lengths) - lengths
+    counts = np.add.reduceat((np.frombuffer(data, dtype=np.uint8) < 0x80).astype(np.int64), byte_starts)
+    # 全局累加后减去每段起点之前的累加值，即为各段内的差分还原
+    totals = np.cumsum(values)
+    starts = np.cumsum(counts) - counts
+    totals -= np.repeat(np.r_[0, totals][starts], counts)
+    return np.split(totals, np.cumsum(counts)[:-1])
+
+
+def parse_way(buf, strings, way_filter):
+    """
+    解析 Way；先解码标签，不满足 way_filter 时不再处理节点列表
+    :param way_filter: 可调用对象 (tags) -> bool，None 表示保留全部
+    :return: (id, 打包的节点列表, tags)，不满足筛选条件或没有节点时返回 None
+    """
+    way_id, keys, vals, refs = 0, [], [], None
+    for field, value in iter_fields(buf):
+        if field == 1:
+            way_id = value
+        elif field == 2:
+            keys = decode_packed_uint32(value)
+        elif field == 3:
+            vals = decode_packed_uint32(value)
+        elif field == 8:
+            refs = value
+    if not refs:
+        return None
+    tags = {strings[k]: strings[v] for k, v in zip(keys, vals)}
+    if way_filter is not None and not way_filter(tags):
+        return None
+    return way_id, refs, tags
+
+
+def iter_pbf_elements(filepath, way_filter=None, node_tag_keys=()):
+    """
+    流式读取 PBF 文件中的节点与 way（忽略 relation）
+    :param filepath: .osm.pbf 文件路径
+    :param way_filter: 可调用对象 (tags) -> bool，只返回满足条件的 way
+    :param node_tag_keys: 需要保留的节点标签键
+    :return: 按数据块生成 ("nodes", (ids, lons, lats, tags)) 或 ("ways", [(id, refs, tags), ...])
+    """
+    node_tag_keys = set(node_tag_keys)
+    for block in iter_pbf_blobs(filepath):
+        strings, groups = [], []
+        granularity, lat_offset, lon_offset = 100, 0, 0
+        for field, value in iter_fields(block):
+            if field == 1:
+                strings = [bytes(s).decode("utf-8") for f, s in iter_fields(value) if f == 1]
+            elif field == 2:
+                groups.append(value)
+            elif field == 17:
+                granularity = value
+            elif field == 19:
+                lat_offset = to_int64(value)
+            elif field == 20:
+                lon_offset = to_int64(value)
+
+        for group in groups:
+            plain_nodes, ways = [], []
+            for field, value in iter_fields(group):
+                if field == 2:
+                    yield "nodes", parse_dense_nodes(value, strings, granularity, lat_offset, lon_offset,
+                                                     node_tag_keys)
+                elif field == 1:
+                    plain_nodes.append(parse_node(value, strings, node_tag_keys))
+                elif field == 3:
+                    way = parse_way(value, strings, way_filter)
+                    if way is not None:
+                        ways.append(way)
+            if plain_nodes:
+                ids, lons, lats, tags = zip(*plain_nodes)
+                yield "nodes", (np.array(ids, dtype=np.int64), to_coordinates(lon_offset, granularity, lons),
+                                to_coordinates(lat_offset, granularity, lats),
+                                {node_id: tag for node_id, tag in zip(ids, tags) if tag})
+            if ways:
+                refs = decode_delta_segments([packed_refs for _, packed_refs, _ in ways])
+                yield "ways", [(way_id, way_refs, tags) for (way_id, _, tags), way_refs in zip(ways, refs)]
@@ -0,0 +1,580 @@
+import os
+import io
+import hashlib
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+import rasterio
+import rasterio.features
+import rasterio.windows
+import shapely
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, ExitStack
+from rasterio.windows import Window
+
+from config.settings import DATA_CITY_PATH, POPULATION_TIF_TEMPLATE, POPULATION_COG_TEMPLATE, MASK_CACHE_PATH, \
+    MASK_CACHE_MAX_BYTES, GDAL_CONFIG
+from .cache_utils import atomic_write_bytes, touch, evict_lru
+
+# GDAL 在首次读取时才初始化块缓存等配置，因此在模块导入时设置即可生效
+for _key, _value in GDAL_CONFIG.items():
+    os.environ.setdefault(_key, _value)
+
+
+class SharedDataset:
+    """
+    多个线程共享的只读数据集句柄：元数据（坐标系、仿射变换、宽高、nodata、分块大小、金字塔）在打开时读取一次，
+    之后只有 read 需要访问 GDAL 句柄。rasterio 数据集本身不是线程安全的，因此只在 read 期间持有锁，
+    掩膜计算、块求和、瓦片着色等其余处理可以在多个线程中并行。
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._lock = threading.Lock()
+        self.name = dataset.name
+        self.crs = dataset.crs
+        self.transform = dataset.transform
+        self.width = dataset.width
+        self.height = dataset.height
+        self.nodata = dataset.nodata
+        self.block_shapes = dataset.block_shapes
+        self._overviews = {bidx: dataset.overviews(bidx) for bidx in dataset.indexes}
+
+    def overviews(self, bidx):
+        return list(self._overviews[bidx])
+
+    def window_transform(self, window):
+        return rasterio.windows.transform(window, self.transform)
+
+    def read(self, *args, **kwargs):
+        with self._lock:
+            return self._dataset.read(*args, **kwargs)
+
+    def close(self):
+        with self._lock:
+            self._dataset.close()
+
+
+class RasterReaderPool:
+    """
+    进程级栅格数据集句柄池：每个文件只打开（解析文件头与分块索引）一次，之后所有会话共享同一个句柄与 GDAL 块缓存。
+    句柄为 SharedDataset，只有读取像素时才加锁。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._readers = {}  # tif_filepath -> SharedDataset
+
+    def _get(self, tif_filepath):
+        with self._lock:
+            if tif_filepath not in self._readers:
+                self._readers[tif_filepath] = SharedDataset(rasterio.open(tif_filepath))
+            return self._readers[tif_filepath]
+
+    @contextmanager
+    def open(self, tif_filepath):
+        """
+        获取数据集句柄（上下文管理器，退出时不关闭数据集）
+        """
+        yield self._get(tif_filepath)
+
+    @contextmanager
+    def open_many(self, tif_filepaths):
+        """
+        同时获取多个数据集句柄
+        :return: 与 tif_filepaths 顺序一致的数据集列表
+        """
+        yield [self._get(path) for path in tif_filepaths]
+
+    def reset(self):
+        """
+        丢弃所有句柄（不关闭）。用于 fork 之后的子进程：继承自父进程的 GDAL 句柄不能跨进程共享。
+        """
+        self._lock = threading.Lock()
+        self._readers = {}
+
+    def close_all(self):
+        """
+        关闭并移除所有句柄
+        """
+        with self._lock:
+            for dataset in self._readers.values():
+                dataset.close()
+            self._readers = {}
+
+
+RASTER_READER_POOL = RasterReaderPool()
+os.register_at_fork(after_in_child=RASTER_READER_POOL.reset)
+
+
+def open_raster(tif_filepath):
+    """
+    从进程级句柄池中获取数据集句柄（上下文管理器）。用法：with open_raster(path) as src: ...
+    """
+    return RASTER_READER_POOL.open(tif_filepath)
+
+
+def open_rasters(tif_filepaths):
+    """
+    从进程级句柄池中同时获取多个数据集句柄（上下文管理器）。用法：with open_rasters(paths) as srcs: ...
+    """
+    return RASTER_READER_POOL.open_many(tif_filepaths)
+
+
+def raster_has_overviews(tif_filepath):
+    """
+    数据集是否带有金字塔（overview），例如转换后的 COG 文件；WorldPop 原始文件没有金字塔
+    """
+    with open_raster(tif_filepath) as src:
+        return bool(src.overviews(1))
+
+
+def warm_up_rasters(tif_filepaths):
+    """
+    预热句柄池：打开数据集，并读取最小一级金字塔（overview），使文件头、分块索引与概览分块进入缓存。
+    没有金字塔的文件跳过：整幅降采样读取需要读取全部分块，代价与预热的收益不相称。
+    :param tif_filepaths: GeoTIFF 文件路径列表
+    """
+    for tif_filepath in tif_filepaths:
+        if not raster_has_overviews(tif_filepath):
+            continue
+        with open_raster(tif_filepath) as src:
+            factor = src.overviews(1)[-1]
+            src.read(1, out_shape=(max(1, src.height // factor), max(1, src.width // factor)))
+
+
+def find_population_tif_filepath(year):
+    """
+    查找指定年份人口数据文件：优先使用转换后的 COG 文件，否则使用 WorldPop 原始文件。
+    :param year: 年份
+    :return: 文件路径；如果两者均不存在，返回 None
+    """
+    for template in (POPULATION_COG_TEMPLATE, POPULATION_TIF_TEMPLATE):
+        tif_filepath = os.path.join(DATA_CITY_PATH, template.format(year=year))
+        if os.path.exists(tif_filepath):
+            return tif_filepath
+    return None
+
+
+def geometries_window(src, geometries):
+    """
+    计算恰好覆盖所有几何形状的栅格窗口（已与数据集范围求交）。
+    :param src: rasterio 数据集
+    :param geometries: 与数据集坐标系一致的几何形状序列
+    :return: Window；如果几何形状与栅格没有交集，返回 None
+    """
+    try:
+        window = rasterio.features.geometry_window(src, geometries)
+    except rasterio.errors.WindowError:
+        return None
+    full_window = Window(0, 0, src.width, src.height)
+    try:
+        window = window.intersection(full_window)
+    except rasterio.errors.WindowError:
+        return None
+    # 向外取整为整数窗口
+    row_start, col_start = int(np.floor(window.row_off)), int(np.floor(window.col_off))
+    row_stop = int(np.ceil(window.row_off + window.height))
+    col_stop = int(np.ceil(window.col_off + window.width))
+    return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+
+def block_aligned_window(src, window):
+    """
+    将窗口向外扩展到数据集内部分块（block / tile）的边界，使一次读取恰好覆盖若干完整分块。
+    :param src: rasterio 数据集
+    :param window: 原始窗口（整数偏移与长度）
+    :return: 与分块对齐、且不超出数据集范围的 Window
+    """
+    block_rows, block_cols = src.block_shapes[0]
+    row_start = int(window.row_off) // block_rows * block_rows
+    col_start = int(window.col_off) // block_cols * block_cols
+    row_stop = -(-int(window.row_off + window.height) // block_rows) * block_rows  # 向上取整到分块边界
+    col_stop = -(-int(window.col_off + window.width) // block_cols) * block_cols
+    row_stop = min(row_stop, src.height)
+    col_stop = min(col_stop, src.width)
+    return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+
+def read_window(src, window):
+    """
+    按分块对齐读取第一个波段，再截取出目标窗口部分。
+    :param src: rasterio 数据集
+    :param window: 目标窗口（整数偏移与长度）
+    :return: 2D float32 数组
+    """
+    aligned_window = block_aligned_window(src, window)
+    aligned_data = src.read(1, window=aligned_window, out_dtype="float32")
+    row_start = int(window.row_off - aligned_window.row_off)
+    col_start = int(window.col_off - aligned_window.col_off)
+    return aligned_data[row_start:row_start + int(window.height), col_start:col_start + int(window.width)]
+
+
+def raster_grid_signature(src):
+    """
+    计算数据集网格签名（坐标系、仿射变换、宽高）。网格发生变化时签名随之变化，对应的掩膜缓存自动失效。
+    :param src: rasterio 数据集
+    :return: 16 位十六进制字符串
+    """
+    grid = (src.crs.to_wkt() if src.crs else "", tuple(src.transform)[:6], src.width, src.height)
+    return hashlib.sha1(repr(grid).encode("utf-8")).hexdigest()[:16]
+
+
+def geometries_digest(geometries):
+    """
+    几何形状摘要（WKB 的 8 字节 blake2b）。边界数据更新（DataV 缓存过期重新获取、重建边界库）后摘要随之变化。
+    :param geometries: 几何形状序列
+    :return: 16 位十六进制字符串
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for wkb in shapely.to_wkb(np.asarray(list(geometries), dtype=object)):
+        digest.update(wkb if wkb is not None else b"")
+    return digest.hexdigest()
+
+
+def mask_cache_filepath(src, geometries, cache_key, all_touched):
+    """
+    掩膜缓存文件路径：MASK_CACHE_PATH/{网格签名}/{cache_key}_{几何形状摘要}_{all_touched}.npz
+    """
+    filename = f"{cache_key}_{geometries_digest(geometries)}_{int(all_touched)}.npz"
+    return os.path.join(MASK_CACHE_PATH, raster_grid_signature(src), filename)
+
+
+def load_cached_mask(src, geometries, cache_key, all_touched):
+    """
+    从磁盘读取缓存的窗口与掩膜。
+    :return: (window, inside)；如果缓存不存在或已损坏，返回 None
+    """
+    filepath = mask_cache_filepath(src, geometries, cache_key, all_touched)
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with np.load(filepath) as cached:
+            col_off, row_off, width, height = (int(v) for v in cached["window"])
+            inside = np.unpackbits(cached["packed_mask"], count=width * height).reshape(height, width).astype(bool)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"掩膜缓存读取失败，将重新计算: {e}")
+        return None
+    touch(filepath)
+    return Window(col_off, row_off, width, height), inside
+
+
+def save_cached_mask(src, geometries, cache_key, all_touched, window, inside):
+    """
+    将窗口偏移与位压缩（bit-packed）的掩膜原子写入磁盘，并按 LRU 控制缓存总大小。
+    """
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        window=np.array([window.col_off, window.row_off, window.width, window.height], dtype=np.int64),
+        packed_mask=np.packbits(inside, axis=None)
+    )
+    atomic_write_bytes(mask_cache_filepath(src, geometries, cache_key, all_touched), buffer.getvalue())
+    evict_lru(MASK_CACHE_PATH, MASK_CACHE_MAX_BYTES)
+
+
+def geometries_mask(src, geometries, all_touched=True, cache_key=None):
+    """
+    计算覆盖几何形状的窗口，以及窗口内每个像素是否位于几何形状内部的掩膜。
+    提供 cache_key（例如 adcode）时，结果按 (cache_key, 几何形状摘要, 网格签名) 缓存在磁盘上，
+    后续只需一次窗口读取与布尔索引；边界数据更新后不会读取到旧的掩膜。
+    :param src: rasterio 数据集
+    :param geometries: 与数据集坐标系一致的几何形状序列
+    :param all_touched: True：多边形边界触及的像素均保留；False：仅像素中心在多边形内部时保留
+    :param cache_key: 缓存键；为 None 时不使用缓存
+    :return: (window, inside)：整数窗口，以及 2D bool 数组（True 表示像素位于几何形状内部）
+    """
+    if cache_key is not None:
+        cached = load_cached_mask(src, geometries, cache_key, all_touched)
+        if cached is not None:
+            return cached
+
+    window = geometries_window(src, geometries)
+    if window is None:
+        raise ValueError("Input shapes do not overlap raster.")
+    inside = rasterio.features.geometry_mask(
+        geometries,
+        out_shape=(int(window.height), int(window.width)),
+        transform=src.window_transform(window),
+        all_touched=all_touched,
+        invert=True  # True 表示像素位于几何形状内部
+    )
+
+    if cache_key is not None:
+        save_cached_mask(src, geometries, cache_key, all_touched, window, inside)
+    return window, inside
+
+
+def read_masked_window(src, geometries, all_touched=True, cache_key=None):
+    """
+    仅读取覆盖几何形状的分块，并将几何形状之外以及 nodata 的像素置为 NaN。
+    与 rasterio.mask.mask(crop=True) 的结果一致，但读取量只与目标区域大小相关，而与整个数据集大小无关。
+    :param src: rasterio 数据集
+    :param geometries: 与数据集坐标系一致的几何形状序列
+    :param all_touched: True：多边形边界触及的像素均保留；False：仅像素中心在多边形内部时保留
+    :param cache_key: 掩膜缓存键（例如 adcode）；为 None 时不使用缓存
+    :return: (array, transform)：2D float32 数组，以及该数组对应的仿射变换
+    """
+    window, inside = geometries_mask(src, geometries, all_touched=all_touched, cache_key=cache_key)
+    data = read_window(src, window)
+    transform = src.window_transform(window)
+
+    data = np.where(inside, data, np.nan).astype(np.float32, copy=False)
+    if src.nodata is not None and not np.isnan(src.nodata):
+        data[data == src.nodata] = np.nan
+    return data, transform
+
+
+def read_masked_window_stack(srcs, geometries, all_touched=True, cache_key=None):
+    """
+    使用同一个窗口与同一张掩膜，从多个网格一致的数据集（例如不同年份的人口栅格）中一次性裁剪数据。
+    掩膜只计算一次，每个数据集只读取一次覆盖几何形状的分块窗口。
+    :param srcs: rasterio 数据集列表（网格必须一致）
+    :param geometries: 与数据集坐标系一致的几何形状序列
+    :param all_touched: True：多边形边界触及的像素均保留；False：仅像素中心在多边形内部时保留
+    :param cache_key: 掩膜缓存键（例如 adcode）；为 None 时不使用缓存
+    :return: (stack, transform)：3D float32 数组 (len(srcs), height, width)，以及对应的仿射变换
+    """
+    first = srcs[0]
+    for src in srcs[1:]:
+        if (src.crs, src.transform, src.width, src.height) != (first.crs, first.transform, first.width, first.height):
+            raise ValueError(f"Raster grids do not match: {first.name} / {src.name}")
+
+    window, inside = geometries_mask(first, geometries, all_touched=all_touched, cache_key=cache_key)
+    transform = first.window_transform(window)
+
+    stack = np.full((len(srcs), int(window.height), int(window.width)), np.nan, dtype=np.float32)
+    for i, src in enumerate(srcs):
+        data = read_window(src, window)
+        if src.nodata is not None and not np.isnan(src.nodata):
+            data[data == src.nodata] = np.nan
+        stack[i][inside] = data[inside]
+    return stack, transform
+
+
+def zonal_statistics(tif_filepath, geometries, all_touched=True):
+    """
+    单次读取栅格，计算多个区域的分区统计（总和、有效网格数量、最小值、最大值）。
+    做法：读取覆盖所有区域的窗口 -> 在各区域自己的子窗口内计算掩膜并统计。每个区域的窗口与掩膜与
+    read_masked_window 单独裁剪该区域时完全相同，相邻区域共享的边界像素分别计入各个区域。
+    :param tif_filepath: GeoTIFF 文件路径
+    :param geometries: 区域几何形状（GeoSeries，需带有 crs）
+    :param all_touched: True：多边形边界触及的像素均参与统计；False：仅像素中心在多边形内部时参与统计
+    :return: pd.DataFrame，行顺序与 geometries 一致，包含 'sum', 'count', 'min', 'max' 四列
+    """
+    n_zones = len(geometries)
+    sums, counts = np.zeros(n_zones), np.zeros(n_zones, dtype=np.int64)
+    mins, maxs = np.full(n_zones, np.nan), np.full(n_zones, np.nan)
+    result = pd.DataFrame({"sum": sums, "count": counts, "min": mins, "max": maxs})
+
+    with open_raster(tif_filepath) as src:
+        # 统一坐标系
+        if geometries.crs != src.crs:
+            geometries = geometries.to_crs(src.crs)
+
+        window = geometries_window(src, geometries)
+        if window is None:
+            return result
+        data = read_window(src, window)
+        zone_windows = [
+            geometries_window(src, [geom]) if geom is not None and not geom.is_empty else None
+            for geom in geometries
+        ]
+        zone_transforms = [src.window_transform(w) if w is not None else None for w in zone_windows]
+
+    # 过滤掉无数据 (NaN / nodata 负值) 和人口为 0 的像素
+    has_population = data > 0
+    for i, (geom, zone_window, zone_transform) in enumerate(zip(geometries, zone_windows, zone_transforms)):
+        if zone_window is None:
+            continue
+        row_start = int(zone_window.row_off - window.row_off)
+        col_start = int(zone_window.col_off - window.col_off)
+        rows = slice(row_start, row_start + int(zone_window.height))
+        cols = slice(col_start, col_start + int(zone_window.width))
+        inside = rasterio.features.geometry_mask(
+            [geom],
+            out_shape=(int(zone_window.height), int(zone_window.width)),
+            transform=zone_transform,
+            all_touched=all_touched,
+            invert=True
+        )
+        values = data[rows, cols][inside & has_population[rows, cols]].astype(np.float64)
+        if values.size == 0:
+            continue
+        sums[i], counts[i], mins[i], maxs[i] = values.sum(), values.size, values.min(), values.max()
+    return pd.DataFrame({"sum": sums, "count": counts, "min": mins, "max": maxs})
+
+
+def block_sum(array, factor):
+    """
+    将 2D 人口矩阵按 factor x factor 的块求和（NaN 与负值视为 0，边缘不足一块的部分补 0）。
+    :param array: 2D 人口矩阵
+    :param factor: 聚合倍数
+    :return: 聚合后的 2D float64 矩阵
+    """
+    height, width = array.shape
+    padded = np.zeros((-(-height // factor) * factor, -(-width // factor) * factor), dtype=np.float64)
+    padded[:height, :width] = np.where(array > 0, array, 0.0)
+    return padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor).sum(axis=(1, 3))
+
+
+def iter_chunk_windows(window, chunk_size):
+    """
+    将一个大窗口切分为若干 chunk_size x chunk_size 的子窗口（边缘子窗口可能更小）。
+    :param window: 整数窗口
+    :param chunk_size: 子窗口边长（像素）
+    :return: 生成器，依次产出子窗口
+    """
+    for row_off in range(0, int(window.height), chunk_size):
+        for col_off in range(0, int(window.width), chunk_size):
+            yield Window(
+                int(window.col_off) + col_off,
+                int(window.row_off) + row_off,
+                min(chunk_size, int(window.width) - col_off),
+                min(chunk_size, int(window.height) - row_off)
+            )
+
+
+def create_population_process_pool(max_workers=None):
+    """
+    创建分块处理使用的进程池：使用 forkserver（不支持时使用 spawn）启动子进程，不 fork 多线程的 Streamlit 服务进程。
+    进程池应在进程内复用（例如通过 st.cache_resource），而不是每次请求都重新创建。
+    :param max_workers: 进程池大小，默认为 CPU 核数
+    :return: ProcessPoolExecutor
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+def aggregate_chunk(tif_filepath, geometry_wkb, chunk_window, factors, all_touched=True):
+    """
+    处理一个子窗口（在子进程中运行）：读取窗口、按几何形状掩膜，计算部分统计量与各聚合层级的块求和结果。
+    内存占用只与子窗口大小相关。
+    :param tif_filepath: GeoTIFF 文件路径
+    :param geometry_wkb: 已裁剪到子窗口范围内的目标区域几何形状（WKB，与栅格坐标系一致）
+    :param chunk_window: 子窗口
+    :param factors: 聚合倍数列表（子窗口边长需为各倍数的整数倍，保证聚合块不跨越子窗口）
+    :param all_touched: True：多边形边界触及的像素均保留；False：仅像素中心在多边形内部时保留
+    :return: dict，包含 'sum', 'count', 'min', 'max' 以及 'levels'：{factor: (rows, cols, values)}，
+             其中 rows / cols 为该层级在子窗口所属数据集网格中的块坐标
+    """
+    result = {"sum": 0.0, "count": 0, "min": np.inf, "max": -np.inf, "levels": {}}
+    with open_raster(tif_filepath) as src:
+        chunk_transform = src.window_transform(chunk_window)
+        data = read_window(src, chunk_window)
+        nodata = src.nodata
+
+    inside = rasterio.features.geometry_mask(
+        [shapely.from_wkb(geometry_wkb)],
+        out_shape=data.shape,
+        transform=chunk_transform,
+        all_touched=all_touched,
+        invert=True
+    )
+    valid = inside & (data > 0)
+    if nodata is not None and not np.isnan(nodata):
+        valid &= data != nodata
+    values = data[valid]
+    if values.size == 0:
+        return result
+    result.update({
+        "sum": float(values.sum(dtype=np.float64)),
+        "count": int(values.size),
+        "min": float(values.min()),
+        "max": float(values.max())
+    })
+
+    masked = np.where(valid, data, 0.0)
+    for factor in factors:
+        aggregated = block_sum(masked, factor)
+        rows, cols = np.nonzero(aggregated > 0)
+        result["levels"][factor] = (
+            rows + int(chunk_window.row_off) // factor,
+            cols + int(chunk_window.col_off) // factor,
+            aggregated[rows, cols].astype(np.float32)
+        )
+    return result
+
+
+def iter_chunk_geometries(geometry, window, chunk_size, transform):
+    """
+    在主进程中将区域几何形状裁剪到各个子窗口：先裁剪到每一行子窗口组成的条带，再裁剪到条带内的各个子窗口，
+    避免对完整的几何形状重复裁剪；与几何形状没有交集的子窗口直接跳过。
+    :return: 生成 (子窗口, 裁剪后的几何形状 WKB)
+    """
+    strip_window = None
+    strip_geometry = None
+    for chunk_window in iter_chunk_windows(window, chunk_size):
+        if strip_window is None or chunk_window.row_off != strip_window.row_off:
+            strip_window = Window(window.col_off, chunk_window.row_off, window.width, chunk_window.height)
+            strip_geometry = shapely.clip_by_rect(geometry, *rasterio.windows.bounds(strip_window, transform))
+        if strip_geometry.is_empty:
+            continue
+        chunk_geometry = shapely.clip_by_rect(strip_geometry, *rasterio.windows.bounds(chunk_window, transform))
+        if not chunk_geometry.is_empty:
+            yield chunk_window, shapely.to_wkb(chunk_geometry)
+
+
+def chunked_population_aggregate(tif_filepath, geometries, factors, chunk_size, executor=None, max_workers=None):
+    """
+    分块并行处理大范围区域（省级 / 全国）：将区域窗口切分为子窗口，在进程池中分别处理后合并部分聚合结果。
+    每个任务只携带裁剪到其子窗口范围内的几何形状。
+    :param tif_filepath: GeoTIFF 文件路径
+    :param geometries: 区域几何形状（GeoSeries，需带有 crs）
+    :param factors: 需要输出的聚合倍数列表，chunk_size 需为各倍数的整数倍
+    :param chunk_size: 子窗口边长（像素）
+    :param executor: 复用的进程池（create_population_process_pool 创建）；为 None 时临时创建一个
+    :param max_workers: 临时创建进程池时的进程数，默认为 CPU 核数
+    :return: dict，包含 'sum', 'count', 'min', 'max'，'transform'（数据集网格的仿射变换）
+             以及 'levels'：{factor: (rows, cols, values)}；如果区域与栅格没有交集，返回 None
+    """
+    if any(chunk_size % factor for factor in factors):
+        raise ValueError(f"chunk_size {chunk_size} must be a multiple of every factor in {factors}")
+
+    with open_raster(tif_filepath) as src:
+        if geometries.crs != src.crs:
+            geometries = geometries.to_crs(src.crs)
+        window = geometries_window(src, geometries)
+        transform = src.transform
+    if window is None:
+        return None
+
+    # 子窗口起点对齐到数据集网格中 chunk_size 的整数倍，保证聚合块在全局网格中对齐
+    aligned_col_off = int(window.col_off) // chunk_size * chunk_size
+    aligned_row_off = int(window.row_off) // chunk_size * chunk_size
+    window = Window(
+        aligned_col_off, aligned_row_off,
+        int(window.col_off + window.width) - aligned_col_off,
+        int(window.row_off + window.height) - aligned_row_off
+    )
+    geometry = shapely.union_all(geometries.to_numpy())
+
+    merged = {"sum": 0.0, "count": 0, "min": np.inf, "max": -np.inf, "transform": transform, "levels": {}}
+    partial_levels = {factor: [] for factor in factors}
+    with ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(create_population_process_pool(max_workers))
+        futures = [
+            executor.submit(aggregate_chunk, tif_filepath, chunk_wkb, chunk_window, factors)
+            for chunk_window, chunk_wkb in iter_chunk_geometries(geometry, window, chunk_size, transform)
+        ]
+        for future in as_completed(futures):
+            partial = future.result()
+            if partial["count"] == 0:
+                continue
+            merged["sum"] += partial["sum"]
+            merged["count"] += partial["count"]
+            merged["min"] = min(merged["min"], partial["min"])
+            merged["max"] = max(merged["max"], partial["max"])
+            for factor, level in partial["levels"].items():
+                partial_levels[factor].append(level)
+
+    for factor, levels in partial_levels.items():
+        if levels:
+            merged["levels"][factor] = tuple(np.concatenate(parts) for parts in zip(*levels))
+        else:
+            merged["levels"][factor] = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32))
+    if merged["count"] == 0:
+        merged["min"] = merged["max"] = np.nan
+    return merged
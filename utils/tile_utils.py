@@ -0,0 +1,279 @@
+import os
+import io
+import re
+import base64
+import hashlib
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image
+from rasterio.enums import Resampling
+from rasterio.windows import Window
+
+from config.settings import TILE_CACHE_PATH, TILE_CACHE_MAX_BYTES, TILE_CACHE_EVICT_INTERVAL, POPULATION_TILE_SIZE, \
+    POPULATION_TILE_VMAX, POPULATION_TILE_COLOR_RANGE, POPULATION_TILE_MIN_ZOOM, POPULATION_TILE_RAW_MIN_ZOOM
+from .coor_convert_utils import LngLatTransfer
+from .cache_utils import atomic_write_bytes, touch, evict_lru
+from .raster_utils import open_raster, find_population_tif_filepath, raster_has_overviews
+
+WEB_MERCATOR_HALF_SIZE = 20037508.342789  # Web 墨卡托投影平面半边长（米）
+WEB_MERCATOR_MAX_LAT = 85.0511287798  # Web 墨卡托可表示的最大纬度
+
+_transfer = LngLatTransfer()
+_write_count = 0
+_write_count_lock = threading.Lock()
+
+
+def population_colormap(color_range=POPULATION_TILE_COLOR_RANGE):
+    """
+    生成 256 级 RGBA 色表：在起始颜色与结束颜色之间线性插值（与热力图色阶一致）
+    :param color_range: [start_rgba, end_rgba]
+    :return: (256, 4) uint8 数组
+    """
+    start_rgba, end_rgba = (np.array(c, dtype=np.float64) for c in color_range)
+    return np.linspace(start_rgba, end_rgba, 256).round().astype(np.uint8)
+
+
+POPULATION_COLORMAP = population_colormap()
+# 色表摘要：瓦片缓存按样式区分，修改色阶后不会读到旧颜色的瓦片
+POPULATION_COLORMAP_DIGEST = hashlib.blake2b(POPULATION_COLORMAP.tobytes(), digest_size=4).hexdigest()
+
+
+def encode_png(rgba):
+    """
+    将 (H, W, 4) uint8 数组编码为 PNG bytes
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, mode="RGBA").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+EMPTY_TILE = encode_png(np.zeros((POPULATION_TILE_SIZE, POPULATION_TILE_SIZE, 4), dtype=np.uint8))
+
+
+def lonlat_to_tile(lng, lat, zoom):
+    """
+    计算经纬度所在的 XYZ 瓦片编号
+    :return: (x, y)
+    """
+    lat = min(max(lat, -WEB_MERCATOR_MAX_LAT), WEB_MERCATOR_MAX_LAT)
+    mx, my = _transfer.WGS84_to_WebMercator(lng, lat)
+    n = 2 ** zoom
+    x = int((mx + WEB_MERCATOR_HALF_SIZE) / (2 * WEB_MERCATOR_HALF_SIZE) * n)
+    y = int((WEB_MERCATOR_HALF_SIZE - my) / (2 * WEB_MERCATOR_HALF_SIZE) * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_mercator_bounds(zoom, x, y):
+    """
+    计算瓦片在 Web 墨卡托平面上的范围
+    :return: (min_x, min_y, max_x, max_y)，单位：米
+    """
+    tile_span = 2 * WEB_MERCATOR_HALF_SIZE / 2 ** zoom
+    min_x = -WEB_MERCATOR_HALF_SIZE + x * tile_span
+    max_y = WEB_MERCATOR_HALF_SIZE - y * tile_span
+    return min_x, max_y - tile_span, min_x + tile_span, max_y
+
+
+def tile_lonlat_bounds(zoom, x, y):
+    """
+    计算瓦片的经纬度范围，顺序与 PyDeck BitmapLayer 的 bounds 参数一致
+    :return: [west, south, east, north]
+    """
+    min_x, min_y, max_x, max_y = tile_mercator_bounds(zoom, x, y)
+    west, south = _transfer.WebMercator_to_WGS84(min_x, min_y)
+    east, north = _transfer.WebMercator_to_WGS84(max_x, max_y)
+    return [west, south, east, north]
+
+
+def tiles_for_bounds(bounds, zoom):
+    """
+    列出覆盖经纬度外包框的所有瓦片
+    :param bounds: [[min_lon, min_lat], [max_lon, max_lat]]
+    :param zoom: 缩放级别
+    :return: list of (x, y)
+    """
+    (min_lon, min_lat), (max_lon, max_lat) = bounds
+    min_x, min_y = lonlat_to_tile(min_lon, max_lat, zoom)
+    max_x, max_y = lonlat_to_tile(max_lon, min_lat, zoom)
+    return [(x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+
+def select_tile_zoom(bounds, min_zoom, max_zoom, tile_budget):
+    """
+    选择覆盖外包框的瓦片数量不超过 tile_budget 的最大缩放级别
+    """
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        if len(tiles_for_bounds(bounds, zoom)) <= tile_budget:
+            return zoom
+    return min_zoom
+
+
+def tile_pixel_lonlat(zoom, x, y, tile_size=POPULATION_TILE_SIZE):
+    """
+    计算瓦片内各像素中心的经纬度。Web 墨卡托投影下经度只与列有关、纬度只与行有关，因此分别返回一维数组。
+    :return: (lon, lat)：长度均为 tile_size
+    """
+    min_x, min_y, max_x, max_y = tile_mercator_bounds(zoom, x, y)
+    pixel_span = (max_x - min_x) / tile_size
+    offsets = (np.arange(tile_size) + 0.5) * pixel_span
+    lon, lat = _transfer.WebMercator_to_WGS84_batch(min_x + offsets, max_y - offsets)
+    return lon, lat
+
+
+def render_population_tile(tif_filepath, zoom, x, y, tile_size=POPULATION_TILE_SIZE, vmax=POPULATION_TILE_VMAX):
+    """
+    从人口栅格（EPSG:4326，北向上）渲染一张 Web 墨卡托 XYZ 瓦片。
+    只读取瓦片范围内的栅格窗口；窗口远大于瓦片时按降采样（平均值）读取，可直接利用 COG 的金字塔。
+    没有金字塔的文件低于 POPULATION_TILE_RAW_MIN_ZOOM 时不读取（降采样需要读取窗口内的全部原始网格），返回空瓦片。
+    颜色按网格人口的对数值映射，人口为 0 或 nodata 的像素透明。
+    :param tif_filepath: 人口数据文件路径
+    :param zoom: 缩放级别
+    :param x: 瓦片列号
+    :param y: 瓦片行号
+    :param tile_size: 瓦片边长（像素）
+    :param vmax: 颜色饱和时的网格人口
+    :return: PNG bytes
+    """
+    lon, lat = tile_pixel_lonlat(zoom, x, y, tile_size)
+    with open_raster(tif_filepath) as src:
+        if zoom < POPULATION_TILE_RAW_MIN_ZOOM and not src.overviews(1):
+            return EMPTY_TILE
+        transform = src.transform
+        cols = (lon - transform.c) / transform.a
+        rows = (lat - transform.f) / transform.e
+
+        col_start, col_stop = max(int(np.floor(cols.min())), 0), min(int(np.ceil(cols.max())) + 1, src.width)
+        row_start, row_stop = max(int(np.floor(rows.min())), 0), min(int(np.ceil(rows.max())) + 1, src.height)
+        if col_start >= col_stop or row_start >= row_stop:
+            return EMPTY_TILE
+        window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        out_shape = (min(int(window.height), 2 * tile_size), min(int(window.width), 2 * tile_size))
+        data = src.read(
+            1, window=window, out_shape=out_shape, resampling=Resampling.average, masked=True, out_dtype="float32"
+        ).filled(np.nan)
+
+    # 瓦片像素 -> 降采样数组下标
+    col_index = np.floor((cols - col_start) * out_shape[1] / window.width).astype(np.int64)
+    row_index = np.floor((rows - row_start) * out_shape[0] / window.height).astype(np.int64)
+    col_valid = (col_index >= 0) & (col_index < out_shape[1])
+    row_valid = (row_index >= 0) & (row_index < out_shape[0])
+    values = data[np.clip(row_index, 0, out_shape[0] - 1)[:, None], np.clip(col_index, 0, out_shape[1] - 1)[None, :]]
+    values[~(row_valid[:, None] & col_valid[None, :])] = np.nan
+
+    populated = np.isfinite(values) & (values > 0)
+    if not populated.any():
+        return EMPTY_TILE
+    level = np.zeros(values.shape, dtype=np.int64)
+    level[populated] = np.clip(np.log1p(values[populated]) / np.log1p(vmax), 0, 1) * 255
+    rgba = POPULATION_COLORMAP[level]
+    rgba[~populated] = 0
+    return encode_png(rgba)
+
+
+def population_tile_min_zoom(year):
+    """
+    指定年份人口瓦片可用的最小缩放级别：有 COG 时为 POPULATION_TILE_MIN_ZOOM，只有原始文件时不低于
+    POPULATION_TILE_RAW_MIN_ZOOM
+    """
+    tif_filepath = find_population_tif_filepath(year)
+    if tif_filepath is None or raster_has_overviews(tif_filepath):
+        return POPULATION_TILE_MIN_ZOOM
+    return max(POPULATION_TILE_MIN_ZOOM, POPULATION_TILE_RAW_MIN_ZOOM)
+
+
+def population_tile_cache_filepath(tif_filepath, zoom, x, y, vmax=POPULATION_TILE_VMAX):
+    """
+    瓦片缓存文件路径：TILE_CACHE_PATH/{人口数据文件名}/{vmax}_{色表摘要}/{z}/{x}/{y}.png
+    """
+    name = os.path.splitext(os.path.basename(tif_filepath))[0]
+    style = f"{vmax:g}_{POPULATION_COLORMAP_DIGEST}"
+    return os.path.join(TILE_CACHE_PATH, name, style, str(zoom), str(x), f"{y}.png")
+
+
+def get_population_tile(year, zoom, x, y):
+    """
+    获取人口瓦片：优先读取磁盘缓存，否则渲染并原子写入缓存；缓存按 LRU 控制总大小。
+    :param year: 年份
+    :return: PNG bytes；如果该年份人口数据文件不存在，返回 None
+    """
+    tif_filepath = find_population_tif_filepath(year)
+    if tif_filepath is None:
+        return None
+    filepath = population_tile_cache_filepath(tif_filepath, zoom, x, y)
+    try:
+        with open(filepath, "rb") as f:
+            data = f.read()
+        touch(filepath)
+        return data
+    except OSError:
+        pass
+
+    data = render_population_tile(tif_filepath, zoom, x, y)
+    atomic_write_bytes(filepath, data)
+
+    # 瓦片文件小而多，每写入一定数量的瓦片才扫描一次缓存目录
+    global _write_count
+    with _write_count_lock:
+        _write_count += 1
+        should_evict = _write_count % TILE_CACHE_EVICT_INTERVAL == 0
+    if should_evict:
+        evict_lru(TILE_CACHE_PATH, TILE_CACHE_MAX_BYTES)
+    return data
+
+
+def get_population_tile_uri(year, zoom, x, y):
+    """
+    获取人口瓦片的 data URI，用于不启动瓦片服务时直接嵌入地图图层
+    :return: data URI 字符串；如果人口数据文件不存在或瓦片内没有人口，返回 None
+    """
+    data = get_population_tile(year, zoom, x, y)
+    if data is None or data == EMPTY_TILE:
+        return None
+    return "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+
+class PopulationTileHandler(BaseHTTPRequestHandler):
+    """
+    人口瓦片请求处理：GET /{year}/{z}/{x}/{y}.png
+    """
+    path_pattern = re.compile(r"^/(\d{4})/(\d{1,2})/(\d+)/(\d+)\.png$")
+
+    def do_GET(self):
+        match = self.path_pattern.match(self.path.split("?", 1)[0])
+        if match is None:
+            self.send_error(404)
+            return
+        year, zoom, x, y = (int(v) for v in match.groups())
+        if x >= 2 ** zoom or y >= 2 ** zoom:
+            self.send_error(404)
+            return
+        try:
+            data = get_population_tile(year, zoom, x, y)
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.send_header("Access-Control-Allow-Origin", "*")  # 地图在 Streamlit 页面中跨域加载瓦片
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tile_server(host, port):
+    """
+    在后台守护线程中启动本地人口瓦片服务
+    :return: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((host, port), PopulationTileHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="population-tile-server", daemon=True).start()
+    return server
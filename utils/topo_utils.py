@@ -0,0 +1,215 @@
+import zlib
+import numpy as np
+import shapely
+
+# TopoJSON 风格的共享弧段编码：
+# - 坐标按固定步长（quantum，单位：度）量化为整数，弧段内逐点差分后压缩保存
+# - 多边形的环在交汇点（junction）处切分为弧段，相邻区域的公共边界只保存一次
+# - 几何形状只保存弧段编号：非负数 i 表示第 i 条弧段，负数 ~i 表示第 i 条弧段的反向
+
+
+def quantize_ring(coordinates, quantum):
+    """
+    量化一个环（或线）的坐标，并去除量化后连续重复的点
+    :param coordinates: (N, 2) 浮点坐标
+    :param quantum: 量化步长（度）
+    :return: (M, 2) int64 坐标
+    """
+    quantized = np.round(np.asarray(coordinates, dtype=np.float64)[:, :2] / quantum).astype(np.int64)
+    if len(quantized) > 1:
+        keep = np.ones(len(quantized), dtype=bool)
+        keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+        quantized = quantized[keep]
+    return quantized
+
+
+def point_keys(points):
+    """
+    将量化坐标编码为单个 int64，便于比较与查找
+    """
+    return points[:, 0] * (1 << 32) + (points[:, 1] + (1 << 31))
+
+
+def find_junctions(rings):
+    """
+    查找交汇点：同一个点在不同的环中（或同一个环的不同位置）与不同的相邻点相连，说明公共边界在此处开始或结束
+    :param rings: 量化后的环列表（首尾不重复）
+    :return: 交汇点 key 的有序数组
+    """
+    if not rings:
+        return np.empty(0, dtype=np.int64)
+    rows = []
+    for ring in rings:
+        keys = point_keys(ring)
+        previous_keys, next_keys = np.roll(keys, 1), np.roll(keys, -1)
+        rows.append(np.stack([keys, np.minimum(previous_keys, next_keys), np.maximum(previous_keys, next_keys)], axis=1))
+    neighbours = np.unique(np.concatenate(rows), axis=0)
+    keys, counts = np.unique(neighbours[:, 0], return_counts=True)
+    return keys[counts > 1]
+
+
+class ArcCollector:
+    """
+    收集弧段并去重：正向或反向完全相同的弧段只保存一次
+    """
+
+    def __init__(self, arc_id_start=0):
+        self.arc_id_start = arc_id_start
+        self.arcs = []
+        self._index = {}
+
+    def add(self, arc):
+        """
+        :param arc: (N, 2) int64 量化坐标
+        :return: 弧段引用（反向时为 ~arc_id）
+        """
+        forward = point_keys(arc).tobytes()
+        if forward in self._index:
+            return self._index[forward]
+        backward = point_keys(arc[::-1]).tobytes()
+        if backward in self._index:
+            return ~self._index[backward]
+        arc_id = self.arc_id_start + len(self.arcs)
+        self.arcs.append(arc)
+        self._index[forward] = arc_id
+        return arc_id
+
+    def add_ring(self, ring, junction_keys):
+        """
+        将一个环在交汇点处切分为弧段
+        :param ring: 量化后的环（首尾不重复）
+        :param junction_keys: 交汇点 key 的有序数组
+        :return: 弧段引用列表
+        """
+        keys = point_keys(ring)
+        positions = np.flatnonzero(np.isin(keys, junction_keys))
+        if positions.size == 0:
+            # 没有交汇点的环（例如独立的岛屿或被完全包围的飞地）：旋转到最小点开始，使相同的环得到相同的弧段
+            start = int(np.argmin(keys))
+            closed = np.roll(ring, -start, axis=0)
+            return [self.add(np.concatenate([closed, closed[:1]]))]
+
+        rotated = np.roll(ring, -positions[0], axis=0)
+        closed = np.concatenate([rotated, rotated[:1]])
+        cuts = np.append(positions - positions[0], len(ring))
+        return [self.add(closed[cuts[i]:cuts[i + 1] + 1]) for i in range(len(cuts) - 1)]
+
+
+def polygon_rings(polygon, quantum):
+    """
+    量化多边形的外环与内环，去掉首尾重复点；退化（少于 3 个点）的环被丢弃
+    """
+    rings = []
+    for ring in [polygon.exterior, *polygon.interiors]:
+        quantized = quantize_ring(shapely.get_coordinates(ring), quantum)
+        if len(quantized) > 1 and np.array_equal(quantized[0], quantized[-1]):
+            quantized = quantized[:-1]
+        if len(quantized) >= 3:
+            rings.append(quantized)
+    return rings
+
+
+def build_topology(geometries, quantum, arc_id_start=0):
+    """
+    将一组几何形状（通常是同一上级行政区下的所有区域）编码为共享弧段拓扑
+    :param geometries: shapely 几何形状列表
+    :param quantum: 量化步长（度）
+    :param arc_id_start: 第一条弧段的编号（多组拓扑写入同一张表时保证编号全局唯一）
+    :return: (arcs, shapes)：弧段列表（(N, 2) int64 量化坐标），以及与 geometries 一一对应的拓扑形状字典
+    """
+    polygons_by_geometry = []
+    for geometry in geometries:
+        if geometry.geom_type == "Polygon":
+            polygons_by_geometry.append([polygon_rings(geometry, quantum)])
+        elif geometry.geom_type == "MultiPolygon":
+            polygons_by_geometry.append([polygon_rings(polygon, quantum) for polygon in geometry.geoms])
+        else:
+            polygons_by_geometry.append(None)
+    junction_keys = find_junctions([
+        ring for polygons in polygons_by_geometry if polygons for rings in polygons for ring in rings
+    ])
+
+    collector = ArcCollector(arc_id_start)
+    shapes = []
+    for geometry, polygons in zip(geometries, polygons_by_geometry):
+        if geometry.geom_type == "Polygon":
+            shapes.append({"type": "Polygon", "arcs": [
+                collector.add_ring(ring, junction_keys) for ring in polygons[0]
+            ]})
+        elif geometry.geom_type == "MultiPolygon":
+            shapes.append({"type": "MultiPolygon", "arcs": [
+                [collector.add_ring(ring, junction_keys) for ring in rings] for rings in polygons if rings
+            ]})
+        elif geometry.geom_type == "LineString":
+            shapes.append({"type": "LineString", "arcs": [
+                collector.add(quantize_ring(shapely.get_coordinates(geometry), quantum))
+            ]})
+        elif geometry.geom_type == "MultiLineString":
+            shapes.append({"type": "MultiLineString", "arcs": [
+                [collector.add(quantize_ring(shapely.get_coordinates(line), quantum))] for line in geometry.geoms
+            ]})
+        else:
+            # 其余几何类型（点等）不参与弧段编码，直接保存坐标
+            shapes.append(shapely.geometry.mapping(geometry))
+    return collector.arcs, shapes
+
+
+def encode_arc(arc):
+    """
+    弧段编码：首点保存绝对坐标，其余点保存与前一点的差值，以 int32 压缩保存
+    """
+    deltas = np.diff(arc, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return zlib.compress(deltas.astype("<i4").tobytes())
+
+
+def decode_arc(data, quantum):
+    """
+    弧段解码
+    :return: (N, 2) 浮点坐标，按量化步长对应的小数位数取整（减少序列化后的字符数）
+    """
+    deltas = np.frombuffer(zlib.decompress(data), dtype="<i4").reshape(-1, 2).astype(np.int64)
+    decimals = max(0, int(round(-np.log10(quantum))))
+    return np.round(np.cumsum(deltas, axis=0) * quantum, decimals)
+
+
+def shape_arc_ids(shape):
+    """
+    列出拓扑形状引用的所有弧段编号
+    """
+    def walk(refs):
+        for ref in refs:
+            if isinstance(ref, list):
+                yield from walk(ref)
+            else:
+                yield ref if ref >= 0 else ~ref
+    return set(walk(shape.get("arcs", [])))
+
+
+def arc_coordinates(ref, arcs):
+    """
+    按引用取出弧段坐标（负数引用取反向）
+    """
+    return arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+
+
+def shape_to_geometry(shape, arcs):
+    """
+    将拓扑形状解码为 GeoJSON geometry
+    :param shape: build_topology 生成的拓扑形状
+    :param arcs: dict：弧段编号 -> decode_arc 解码后的坐标（至少包含该形状引用的弧段）
+    :return: GeoJSON geometry 字典
+    """
+    def ring(refs):
+        parts = [arc_coordinates(ref, arcs) for ref in refs]
+        return np.concatenate([parts[0]] + [part[1:] for part in parts[1:]]).tolist()
+
+    geom_type = shape["type"]
+    if geom_type == "Polygon":
+        return {"type": "Polygon", "coordinates": [ring(refs) for refs in shape["arcs"]]}
+    if geom_type == "MultiPolygon":
+        return {"type": "MultiPolygon", "coordinates": [[ring(refs) for refs in rings] for rings in shape["arcs"]]}
+    if geom_type == "LineString":
+        return {"type": "LineString", "coordinates": ring(shape["arcs"])}
+    if geom_type == "MultiLineString":
+        return {"type": "MultiLineString", "coordinates": [ring(refs) for refs in shape["arcs"]]}
+    return shape